@@ -25,14 +25,31 @@ THE SOFTWARE.
 """
 
 import os
+import re
 import json
 import time
-import pause
-from time import sleep
+import logging
+import threading
 from lendingclub import LendingClub, LendingClubError
 from lendingclub.filters import *
 from lcinvestor import util
+from lcinvestor import control
+from lcinvestor import handoff
+from lcinvestor import market
+from lcinvestor.clock import Clock
+from lcinvestor.cache import PortfolioCache
+from lcinvestor.circuit import CircuitBreaker, CircuitOpenError, ENDPOINTS
+from lcinvestor.history import CycleHistory
+from lcinvestor.inventory import LoanInventory
+from lcinvestor.journal import OrderJournal, PLACED, find_order
+from lcinvestor.ladder import SearchStats
+from lcinvestor.memory import MemoryMonitor
+from lcinvestor.portfolio import Portfolio
+from lcinvestor.profiling import CycleProfiler
+from lcinvestor.phases import PhaseTimer, PhaseTimeoutError, call_with_timeout, next_deadline
+from lcinvestor.sessions import SessionStore, get_session_state, set_session_state
 from lcinvestor.settings import Settings
+from lcinvestor.watcher import CashWatcher
 
 
 class AutoInvestor:
@@ -46,32 +63,122 @@ class AutoInvestor:
     verbose = False
     auto_execute = True
     settings = None
+    cycle_settings = None  # The settings snapshot the current, or last, cycle ran with
     loop = False
     app_dir = None
+    circuits = None
+    phase_timer = None
+    portfolio_cache = None
+    inventory = None
+    log_file = None  # Write logs to this file, instead of the console, when running
+    clock = None
+    simulated = False  # True when running against a simulated market (nothing is saved or served)
+
+    # Loop state, changed by commands from the control socket
+    paused = False
+    in_cycle = False
+    cycle_requested = False
+    reload_requested = False
+    restart_requested = False
+    wake = None
+    stopping = None  # Set by stop(), so waits end right away
+    control_server = None
+    control_fd = None  # The control socket handed off by the process this one replaced
+
+    # Warm-ups run the steps before the balance check ahead of scheduled cycles (see warm_up)
+    warmed_up = None  # When the last warm-up finished, until a cycle uses it
+    warmed_for = None  # The scheduled cycle the last warm-up was for
+    warm_up_grace = 60  # Seconds past warm_up_seconds a warm-up is still good for
+
+    # Live state, reported by the 'status' command
+    phase = 'starting'
+    next_cycle = None
+    last_cycle_start = None
+    last_cycle_latency = None
+    last_investment = None
 
     # The file that the summary from the last investment is saved to
     last_investment_file = 'last_investment.json'
 
-    def __init__(self, verbose=False, auto_execute=True):
+    # The file that the amounts searched for portfolios, for each investing profile, are saved to
+    search_stats_file = 'search_stats.json'
+    search_stats = None
+
+    # The number of loans fetched to fingerprint the listing
+    fingerprint_size = 1000
+    listing_complete = False  # True when this cycle's listing search put every matching loan in the inventory
+
+    # A call to LendingClub that timed out but is still running on its own thread (see timed())
+    abandoned_call = None
+
+    # The database every cycle is recorded to, for the 'stats' command
+    history_file = 'history.db'
+    history = None
+    cycle_record = None
+    last_outcome = None  # How the last cycle ended (see history.OUTCOMES)
+
+    # The file that the hours cash tends to arrive in are saved to
+    cash_watch_file = 'cash_watch.json'
+    cash_watcher = None
+
+    # The file that reports on what memory grew are added to, every memory_check_cycles cycles
+    memory_report_file = 'memory.log'
+    memory_monitor = None
+
+    # The directory profiles of investment cycles are written to, while profile_cycles() is on (--profile)
+    profile_dir = 'profiles'
+    profiler = None
+
+    # The file every order sent to LendingClub is recorded in, before it's sent, so none is sent twice
+    order_journal_file = 'orders.json'
+    order_journal = None
+
+    # The file the LendingClub session is saved to between --run-once runs, for each account, with keep_session (--keep-session)
+    keep_session = False
+    session_file = 'session.{0}.dat'
+    session_store = None
+
+    # Restarting in place (see restart())
+    restart_command = None  # The command line that starts lcinvestor, without arguments, or None if this investor can't restart
+    resumed = False  # True if this process took over from one that restarted
+    pidfile_path = None  # The daemon's PID lockfile (see bin/lcinvestor)
+
+    def __init__(self, verbose=False, auto_execute=True, lc=None, clock=None, app_dir=None):
         """
         Create an AutoInvestor instance
          - Set verbose to True if you want to see debugging logs
+         - lc and clock replace the LendingClub client and the wall clock (i.e. for simulations and tests)
+         - app_dir replaces the ~/.lcinvestor directory that settings and state are saved to
         """
         self.verbose = verbose
         self.auto_execute = auto_execute
         self.logger = util.create_logger(verbose)
-        self.app_dir = util.get_app_directory()
-        self.lc = LendingClub()
+        self.app_dir = app_dir if app_dir is not None else util.get_app_directory()
+        self.lc = lc if lc is not None else LendingClub()
+        self.clock = clock if clock is not None else Clock()
 
         # Set logger on lc
         if self.verbose:
-            self.lc.set_logger(self.logger)
+            self.lc.set_logger(logging.getLogger('investor.lendingclub'))
 
         # Create settings object
         self.settings = Settings(investor=self, settings_dir=self.app_dir, logger=self.logger, verbose=self.verbose)
 
         self.settings.investor = self  # create a link back to this instance
 
+        self.create_circuits()
+        self.phase_timer = PhaseTimer(self.settings['phase_timeouts'], self.settings['phase_budgets'], clock=self.clock.time, logger=self.logger)
+        self.inventory = LoanInventory()
+        self.portfolio_cache = PortfolioCache(self.settings['portfolio_cache_size'], self.settings['portfolio_cache_minutes'] * 60, clock=self.clock.time)
+
+        self.memory_monitor = MemoryMonitor(self.settings['memory_check_cycles'], self.settings['memory_report_top'],
+            os.path.join(self.app_dir, self.memory_report_file), logger=self.logger)
+
+        self.state_lock = threading.Lock()
+        self.wake = threading.Event()
+        self.stopping = threading.Event()
+        self.started = self.clock.time()
+
     def version(self):
         """
         Return the version number of the Lending Club Investor tool
@@ -143,8 +250,27 @@ class AutoInvestor:
         Alias for investment_loop.
         This is used by python-runner
         """
+        self.setup_logging()
         self.investment_loop()
 
+    def setup_logging(self):
+        """
+        Start the logging thread (again, if we've been forked into a daemon), open the
+        log file, if there is one, and apply the per-module log levels from the user settings
+        """
+        util.start_logging()
+
+        if self.log_file:
+            util.log_to_file(self.log_file,
+                max_bytes=int(self.settings['log_max_size'] * 1024 * 1024),
+                interval=int(self.settings['log_rotate_hours'] * 3600),
+                backup_count=self.settings['log_backups'])
+
+        try:
+            util.set_log_levels(self.settings['log_levels'])
+        except ValueError as e:
+            self.logger.warning('Could not set the log levels: {0}'.format(str(e)))
+
     def run_once(self):
         """
         Try to invest, based on your settings, and then end the program.
@@ -157,30 +283,376 @@ class AutoInvestor:
             attempts += 1
             if attempts % 5 == 0:
                 self.logger.warn('LendingClub is not responding. Trying again in 10 seconds...')
-            sleep(10)
+            if self.sleep(10):
+                return
+
+        # Pick up the session the last run left, instead of logging in again
+        restored = self.keep_session and self.restore_session()
 
         # Invest
-        self.attempt_to_invest()
+        profiler = self.start_profile()
+        self.start_cycle_record()
+        try:
+            self.attempt_to_invest(restored)
+        finally:
+            self.phase_timer.end()
+            self.save_cycle_record()
+            if profiler is not None:
+                self.end_profile(profiler)
+            if self.keep_session:
+                self.save_session()
+
+    def get_session_store(self):
+        """
+        Return the SessionStore for this account's session file, or None if sessions can't be saved
+        """
+        if self.session_store is None:
+            try:
+                file_name = re.sub(r'[^\w@.-]', '_', self.settings.auth['email'] or 'none')
+                self.session_store = SessionStore(os.path.join(self.app_dir, self.session_file.format(file_name)))
+            except Exception as e:
+                self.logger.warning('The LendingClub session can\'t be saved between runs: {0}'.format(str(e)))
+                self.keep_session = False
+        return self.session_store
+
+    def restore_session(self):
+        """
+        Reuse the LendingClub session saved by the last run, if LendingClub still accepts it.
+        Returns False if the cycle needs to log in.
+        """
+        store = self.get_session_store()
+        if store is None:
+            return False
+
+        self.set_phase('restoring session', 'auth')
+        try:
+            if not store.restore(self.lc.session, self.settings.auth['email'], self.settings.auth['pass']):
+                return False
+            self.timed(self.lc.get_cash_balance)  # Fails if LendingClub has ended the session
+        except Exception as e:
+            self.logger.info('The saved session can\'t be used, logging in: {0}'.format(str(e)))
+            return False
+        finally:
+            self.set_phase('starting')
+
+        self.authed = True
+        self.logger.info('Reusing the saved LendingClub session')
+        return True
+
+    def save_session(self):
+        """
+        Save the LendingClub session for the next run
+        """
+        store = self.get_session_store()
+        if store is None or not self.authed:
+            return
+        try:
+            store.save(self.lc.session)
+        except Exception as e:
+            self.logger.warning('Couldn\'t save the LendingClub session (this warning can be ignored). {0}'.format(str(e)))
 
     def stop(self):
         """
         Called when the investment loop should end.
-        If the loop is currently attempting to invest cash, this will not be canceled.
+        Waits end right away, but an order that has been sent is seen through (see place_order).
         """
         self.loop = False
         self.logger.info("Stopping investor...")
+        self.stopping.set()
+        self.wake.set()
+
+    def sleep(self, seconds):
+        """
+        Wait a number of seconds, or until the investor is stopped.
+        Returns True if it was stopped.
+        """
+        return self.clock.wait(self.stopping, seconds)
+
+    def profile_cycles(self, cycles):
+        """
+        Profile the next number of investment cycles (see CycleProfiler), or stop profiling with 0
+        """
+        if cycles > 0:
+            self.profiler = CycleProfiler(os.path.join(self.app_dir, self.profile_dir), cycles)
+            self.logger.info('Profiling the next {0} investment cycle(s)'.format(cycles))
+        else:
+            self.profiler = None
+            self.logger.info('Profiling stopped')
+
+    def start_profile(self):
+        """
+        Start profiling the cycle about to run, if profile_cycles() asked for it. Returns the profiler, or None.
+        """
+        profiler = self.profiler
+        if profiler is not None:
+            profiler.start()
+        return profiler
+
+    def end_profile(self, profiler):
+        """
+        Stop profiling the cycle that just ran and write its profile
+        """
+        try:
+            paths = profiler.stop(self.last_outcome or 'cycle')
+            self.logger.info('Profile of this cycle written to {0}'.format(', '.join(paths)))
+        except Exception as e:
+            self.logger.warning('Could not write the profile of this cycle: {0}'.format(str(e)))
+
+        if profiler.remaining <= 0 and self.profiler is profiler:
+            self.profiler = None
+            self.logger.info('Done profiling')
+
+    def invest_now(self):
+        """
+        Ask the investment loop to run an investment cycle right away.
+        Returns False if a cycle is already running (the request is folded into it)
+        """
+        self.state_lock.acquire()
+        try:
+            if self.in_cycle:
+                return False
+            self.cycle_requested = True
+        finally:
+            self.state_lock.release()
+
+        self.wake.set()
+        return True
+
+    def pause_investing(self):
+        """
+        Stop running scheduled investment cycles until resume_investing() is called
+        """
+        self.paused = True
+        self.logger.info('Investing paused')
+        self.wake.set()
+
+    def resume_investing(self):
+        """
+        Resume running scheduled investment cycles
+        """
+        self.paused = False
+        self.logger.info('Investing resumed')
+        self.wake.set()
+
+    def reload_settings(self):
+        """
+        Ask the investment loop to reload the settings files before its next cycle
+        """
+        self.reload_requested = True
+        self.wake.set()
+
+    def request_restart(self):
+        """
+        Ask the investment loop to restart in place after the current cycle (see restart()).
+        Returns False if this investor can't.
+        """
+        if self.restart_command is None:
+            return False
+        self.restart_requested = True
+        self.wake.set()
+        return True
+
+    def apply_reload(self):
+        """
+        Reload the settings files. Called by the loop, between investment cycles.
+        """
+        self.reload_requested = False
+        try:
+            self.settings.reload()
+            self.apply_settings()
+            if not self.simulated:
+                self.memory_monitor.start()
+            util.set_log_levels(self.settings['log_levels'])
+            self.logger.info('Settings reloaded')
+        except Exception as e:
+            self.logger.error('Could not reload the settings: {0}'.format(str(e)))
+
+    def apply_settings(self):
+        """
+        Apply the user settings to the circuits, phase timer, portfolio cache and memory monitor
+        """
+        for circuit in self.circuits.values():
+            circuit.threshold = max(1, int(self.settings['circuit_threshold']))
+            circuit.cooldown = self.settings['circuit_cooldown'] * 60
+        self.phase_timer.timeouts = self.settings['phase_timeouts'] or {}
+        self.phase_timer.budgets = self.settings['phase_budgets'] or {}
+        self.portfolio_cache.max_entries = self.settings['portfolio_cache_size']
+        self.portfolio_cache.max_age = self.settings['portfolio_cache_minutes'] * 60
+        self.memory_monitor.every = self.settings['memory_check_cycles']
+        self.memory_monitor.top = self.settings['memory_report_top']
+
+    def handle_command(self, command):
+        """
+        Handle a command from the control socket and return a response dict
+        """
+        if command == 'invest-now':
+            if self.invest_now():
+                return {'result': 'success', 'message': 'Investment cycle queued'}
+            return {'result': 'success', 'message': 'An investment cycle is already running'}
+        elif command == 'pause':
+            self.pause_investing()
+            return {'result': 'success', 'message': 'Paused'}
+        elif command == 'resume':
+            self.resume_investing()
+            return {'result': 'success', 'message': 'Resumed'}
+        elif command == 'reload':
+            self.reload_settings()
+            return {'result': 'success', 'message': 'Settings will be reloaded'}
+        elif command == 'restart':
+            if not self.request_restart():
+                return {'result': 'error', 'message': 'This investor can\'t restart in place, stop and start it instead'}
+            if self.in_cycle:
+                return {'result': 'success', 'message': 'Restarting after the current investment cycle'}
+            return {'result': 'success', 'message': 'Restarting'}
+        elif command == 'stop':
+            self.stop()
+            return {'result': 'success', 'message': 'Stopping'}
+        elif command == 'status':
+            return {'result': 'success', 'message': self.phase, 'status': self.get_status()}
+        elif command == 'profile' or command.startswith('profile '):
+            try:
+                cycles = int(command[len('profile'):].strip() or 1)
+            except ValueError:
+                return {'result': 'error', 'message': 'The number of cycles to profile must be a number'}
+            self.profile_cycles(cycles)
+            if cycles <= 0:
+                return {'result': 'success', 'message': 'Profiling stopped'}
+            return {'result': 'success', 'message': 'Profiling the next {0} investment cycle(s), to {1}'.format(cycles, self.profiler.directory)}
+
+        return {'result': 'error', 'message': 'Unknown command \'{0}\''.format(command)}
+
+    def set_phase(self, phase, timed=None):
+        """
+        Record what the investor is doing right now (reported by the 'status' command)
+         - timed is the name of the phase budget to time this against (site, auth, balance, search or order)
+        """
+        self.phase = phase
+        if timed is not None:
+            self.phase_timer.start(timed)
+        else:
+            self.phase_timer.end()
+
+    def timed(self, fn, *args, **kwargs):
+        """
+        Call fn, giving up if it goes past the current phase's timeout or budget.
+        A call that was given up on still has the LendingClub session, which isn't thread-safe,
+        so the next call waits for it to finish (within its own timeout).
+        """
+        timeout = self.phase_timer.get_timeout()
+        if self.simulated:
+            timeout = None  # Simulated calls can't hang
+        if self.profiler is not None:
+            fn = self.profiler.wrap(fn)
+
+        if self.abandoned_call is not None:
+            started = time.time()
+            self.abandoned_call.join(timeout)
+            if self.abandoned_call.is_alive():
+                raise PhaseTimeoutError('Still waiting for an earlier call to LendingClub to finish')
+            self.abandoned_call = None
+            if timeout is not None:
+                timeout = max(timeout - (time.time() - started), 0)
+
+        try:
+            return call_with_timeout(fn, timeout, *args, **kwargs)
+        except PhaseTimeoutError as e:
+            self.abandoned_call = e.thread
+            raise
+
+    def is_site_available(self):
+        """
+        Returns True if LendingClub responds within the current phase's timeout
+        """
+        try:
+            return self.timed(self.lc.is_site_available)
+        except PhaseTimeoutError:
+            return False
+
+    def get_status(self):
+        """
+        Return a dict describing the live state of the investor
+        """
+        last_investment = None
+        if self.last_investment:
+            last_investment = self.last_investment.copy()
+            last_investment['summary'] = self.get_order_summary(last_investment['investment'])
+            del last_investment['investment']
+
+        return {
+            'pid': os.getpid(),
+            'started': self.started,
+            'phase': self.phase,
+            'paused': self.paused,
+            'in_cycle': self.in_cycle,
+            'next_cycle': self.next_cycle,
+            'warmed_up': self.warmed_up,
+            'last_cycle_start': self.last_cycle_start,
+            'last_cycle_latency': self.last_cycle_latency,
+            'queue_depth': int(self.cycle_requested) + int(self.reload_requested) + int(self.restart_requested),
+            'circuits': self.get_circuit_status(),
+            'phases': self.phase_timer.status(),
+            'portfolio_cache': self.portfolio_cache.status(),
+            'listed_loans': len(self.inventory),
+            'profiling': self.profiler.status() if self.profiler is not None else None,
+            'orders': self.order_journal.status() if self.order_journal is not None else None,
+            'cash_watch': self.get_cash_watcher().status() if self.settings['cash_watch'] else None,
+            'memory': self.memory_monitor.status(),
+            'last_investment': last_investment
+        }
+
+    def start_control_server(self):
+        """
+        Listen for commands on the control socket in the app directory
+        """
+        if not control.is_supported():
+            return
+
+        try:
+            self.control_server = control.ControlServer(self, control.get_socket_path(self.app_dir), self.control_fd)
+            self.control_fd = None
+            self.control_server.start()
+            self.logger.debug('Listening for commands on {0}'.format(self.control_server.path))
+        except Exception as e:
+            self.control_server = None
+            self.logger.warning('Could not open the control socket: {0}'.format(str(e)))
+
+    def stop_control_server(self):
+        """
+        Stop listening on the control socket
+        """
+        if self.control_server is not None:
+            self.control_server.stop()
+            self.control_server = None
+
+    def create_circuits(self):
+        """
+        Create a circuit breaker for each class of LendingClub calls (auth, balance, search, order)
+        """
+        threshold = self.settings['circuit_threshold']
+        cooldown = self.settings['circuit_cooldown'] * 60
+
+        self.circuits = {}
+        for name in ENDPOINTS:
+            self.circuits[name] = CircuitBreaker(name, threshold, cooldown, logger=self.logger, clock=self.clock.time)
+
+    def get_circuit_status(self):
+        """
+        Return a list of dicts describing the state of each circuit breaker
+        """
+        return [self.circuits[name].status() for name in ENDPOINTS]
 
     def get_order_summary(self, portfolio):
         """
         Log a summary of the investment portfolio which was ordered
         """
-        summary = 'Investment portfolio summary: {0} loan notes ('.format(portfolio['numberOfLoans'])
+        summary = 'Investment portfolio summary: {0} loan notes ('.format(len(portfolio))
 
         breakdown = []
-        for grade in ['a', 'aa', 'b', 'c', 'd', 'e', 'f', 'g']:
-            if portfolio[grade] > 0.0:
-                percent = int(round(portfolio[grade]))
-                breakdown.append('{0}:{1}%'.format(grade.upper(), percent))
+        grades = portfolio.get_grade_percents()
+        for grade in sorted(grades.keys()):
+            if grades[grade] > 0.0:
+                percent = int(round(grades[grade]))
+                breakdown.append('{0}:{1}%'.format(grade, percent))
 
         if len(breakdown) > 0:
             summary += ', '.join(breakdown)
@@ -188,106 +660,177 @@ class AutoInvestor:
 
         return summary
 
-    def attempt_to_invest(self):
+    def attempt_to_invest(self, warm=False):
         """
         Attempt an investment if there is enough available cash and matching investment option
         Returns true if money was invested
+         - warm is True if a warm-up (or a session saved by the last run) has just logged in and loaded the saved filter
         """
 
+        self.set_phase('checking circuits')
+
+        # Fail fast, without touching the network, while LendingClub calls are failing
+        blocked = [self.circuits[name] for name in ENDPOINTS if not self.circuits[name].allow()]
+        if len(blocked) > 0:
+            for circuit in blocked:
+                self.logger.warning('Skipping this round: {0}'.format(CircuitOpenError(circuit).value))
+            self.note_cycle(outcome='blocked')
+            return False
+
         # Authenticate
+        if warm:
+            self.logger.info('Authenticated by the warm-up')
+        else:
+            self.set_phase('authenticating', 'auth')
+            try:
+                self.circuits['auth'].call(self.timed, self.authenticate)
+                self.logger.info('Authenticated')
+            except Exception as e:
+                self.logger.error('Could not authenticate: {0}'.format(getattr(e, 'value', str(e))))
+                self.note_cycle(outcome='error', phase=self.phase, error=str(e))
+                return False
+
+        # Every setting this cycle uses, compiled once for each change to them
+        settings = self.cycle_settings = self.settings.get_snapshot()
+
+        # Don't invest while it's unknown if an earlier order went through
         try:
-            self.authenticate()
-            self.logger.info('Authenticated')
+            if not self.check_orders():
+                self.note_cycle(outcome='error', phase=self.phase, error='An earlier order hasn\'t been settled')
+                return False
         except Exception as e:
-            self.logger.error('Could not authenticate: {0}'.format(e.value))
+            self.logger.error('Could not check the earlier orders: {0}'.format(str(e)))
+            self.note_cycle(outcome='error', phase=self.phase, error=str(e))
             return False
 
         # Try to invest
         self.logger.info('Checking for funds to invest...')
+        self.set_phase('checking balance', 'balance')
         try:
 
             # Get current cash balance
-            cash = self.lc.get_investable_balance()
-            if cash > 0 and cash >= self.settings['min_cash']:
+            cash = self.circuits['balance'].call(self.timed, self.lc.get_investable_balance)
+            self.note_cycle(cash=cash)
+            self.get_cash_watcher().observe(self.clock.time(), cash)
+            self.save_cash_watcher()
+            if cash > 0 and cash >= settings.min_cash:
 
                 # Invest
                 self.logger.info(" $ $ $ $ $ $ $ $ $ $")  # Create break in logs
 
                 try:
+                    self.set_phase('searching', 'search')
+
                     # Refresh saved filter
-                    filters = self.settings['filters']
-                    if type(filters) is SavedFilter:
-                        filters.reload()
+                    filters = settings.filters
+                    if type(filters) is SavedFilter and not warm:
+                        self.circuits['search'].call(self.timed, filters.reload)
 
-                    # Find investment portfolio, starting will all your cash,
-                    # down to the minimum you're willing to invest
+                    # Find investment portfolio, starting with the most cash that has found
+                    # portfolios before (or all your cash), down to the minimum you're willing to invest
                     # No more than 10 searches
-                    i = 0
                     portfolio = False
-                    decrement = None
-                    while portfolio is False and cash >= self.settings['min_cash'] and i < 10:
-                        i += 1
+                    complete = True
+                    available = cash
+                    attempts = 0
+                    cached = 0
+                    stats = self.get_search_stats(settings)
+                    version = self.get_listing_version(settings, stats)
+
+                    # Nothing would be found if no loans have been listed or funded since the last search for this cash
+                    if version is not None and stats.last_failure == [version, available]:
+                        self.logger.info('The listed loans haven\'t changed since no portfolio was found for ${0} -- Trying again in {1} minutes'.format(available, settings.frequency))
+                        self.note_cycle(outcome='unchanged')
+                        return False
+
+                    # No portfolio can spread more cash than this across the loans with room for a note
+                    capacity = self.get_listed_capacity()
+                    per_note = int(settings.max_per_note) - (int(settings.max_per_note) % 25)
+
+                    for cash in stats.get_ladder(cash, settings.min_cash):
+                        if self.stopping.is_set():
+                            complete = False
+                            break
+
+                        # Don't ask LendingClub for a portfolio the listed loans can't make
+                        if capacity is not None and per_note >= 25 and market.get_note_count(cash, per_note) > capacity:
+                            self.logger.info('Only {0} listed loans have room for a note, not enough for ${1}'.format(capacity, cash))
+                            continue
 
                         # Try to find a portfolio
                         try:
 
-                            self.logger.info('Searching for a portfolio for ${0}'.format(cash))
-                            portfolio = self.lc.build_portfolio(cash,
-                                max_per_note=self.settings['max_per_note'],
-                                min_percent=self.settings['min_percent'],
-                                max_percent=self.settings['max_percent'],
-                                filters=filters,
-                                do_not_clear_staging=True)
+                            # The same search against the same listing has the same result,
+                            # but a cached portfolio isn't staged, so only use it to invest automatically
+                            portfolio = self.portfolio_cache.get((cash, stats.key), version)
+                            from_cache = portfolio is not None and (not portfolio or self.auto_execute)
+                            attempts += 1
+                            if from_cache:
+                                cached += 1
+                                self.logger.info('Using the last search for ${0}, the listed loans haven\'t changed'.format(cash))
+                            else:
+                                portfolio = False
+                                self.logger.info('Searching for a portfolio for ${0}'.format(cash))
+                                portfolio = self.circuits['search'].call(self.timed, self.lc.build_portfolio, cash,
+                                    max_per_note=settings.max_per_note,
+                                    min_percent=settings.min_percent,
+                                    max_percent=settings.max_percent,
+                                    filters=filters,
+                                    do_not_clear_staging=True)
+                                self.portfolio_cache.put((cash, stats.key), version, portfolio)
+                                stats.record(cash, portfolio)
 
                         except LendingClubError as e:
-                            pass
+                            self.logger.warning('Portfolio search for ${0} failed: {1}'.format(cash, e.value))
+                            complete = False
+                        except (CircuitOpenError, PhaseTimeoutError) as e:
+                            self.logger.warning(e.value)
+                            complete = False
+                            break
+
+                        if portfolio:
+                            portfolio = Portfolio.from_dict(portfolio)
+                            break
 
                         # Try a lower amount of cash to invest
-                        if not portfolio:
-                            self.logger.info('Could not find any matching portfolios for ${0}'.format(cash))
-
-                            # Create decrement value that will search up to 5 more times
-                            if decrement is None:
-                                delta = cash - self.settings['min_cash']
-
-                                if delta < 25:
-                                    break
-                                elif delta <= 100:
-                                    decrement = 25
-                                else:
-                                    decrement = delta / 4
-
-                            # Just to be safe, shouldn't decrement in $10 increments
-                            if decrement < 10:
-                                break
-
-                            # We are at our lowest
-                            if cash <= self.settings['min_cash']:
-                                break
-
-                            # New amount to search for
-                            cash -= decrement
-                            if cash < self.settings['min_cash']:
-                                cash = self.settings['min_cash']
-                            else:
-                                cash = util.nearest_25(cash)
+                        self.logger.info('Could not find any matching portfolios for ${0}'.format(cash))
+
+                    # Remember a search that found nothing, to skip it while the listing stays the same
+                    if portfolio:
+                        stats.last_failure = None
+                    elif complete:
+                        stats.last_failure = [version, available]
+                    self.save_search_stats()
+                    self.note_cycle(outcome='no_match', attempts=attempts, cached=cached)
 
                     if portfolio:
                         # Invest
-                        assign_to = self.settings['portfolio']
+                        assign_to = settings.portfolio
 
+                        self.set_phase('ordering', 'order')
                         order = self.lc.start_order()
-                        order.add_batch(portfolio['loan_fractions'])
+                        for loan_id, amount in portfolio.get_fractions():
+                            order.add(loan_id, amount)
 
                         if self.auto_execute:
-                            self.logger.info('Auto investing ${0} at {1}%...'.format(cash, portfolio['percentage']))
-                            sleep(5)  # last chance to cancel
-
-                            order._Order__already_staged = True  # Don't try this at home kids
-                            order._Order__i_know_what_im_doing = True  # Seriously, don't do it
-                            order_id = order.execute(portfolio_name=assign_to)
+                            self.logger.info('Auto investing ${0} at {1}%...'.format(cash, portfolio.percentage))
+                            if self.sleep(5):  # last chance to cancel
+                                self.logger.info('Stopped, the order was not placed')
+                                self.note_cycle(outcome='stopped')
+                                return False
+
+                            # Orders change the loans and cash available, so past searches no longer apply
+                            self.portfolio_cache.clear()
+
+                            # The search staged the portfolio, unless it came from the cache
+                            if not from_cache:
+                                order._Order__already_staged = True  # Don't try this at home kids
+                                order._Order__i_know_what_im_doing = True  # Seriously, don't do it
+                            order_id = self.place_order(order, portfolio, cash, assign_to)
+                            portfolio.set_order_id(order_id)
                         else:
                             self.logger.info('Order staged but not completed, please to go LendingClub website to complete the order. (see the "--no-auto-execute" command flag)')
+                            self.note_cycle(outcome='staged')
                             return False
 
                         # Success! Show summary and save the order
@@ -295,37 +838,166 @@ class AutoInvestor:
                         self.logger.info(summary)
                         self.logger.info('Done\n')
 
+                        self.note_cycle(outcome='invested', invested=portfolio.get_invested())
+                        self.get_cash_watcher().spent(portfolio.get_invested())
+                        self.save_cash_watcher()
                         self.save_last_investment(cash, portfolio, order_id, portfolio_name=assign_to)
                     else:
-                        self.logger.warning('No investment portfolios matched your filters at this time -- Trying again in {2} minutes'.format(self.settings['min_percent'], self.settings['max_percent'], self.settings['frequency']))
+                        self.logger.warning('No investment portfolios matched your filters at this time -- Trying again in {2} minutes'.format(settings.min_percent, settings.max_percent, settings.frequency))
 
                 except Exception as e:
                     self.logger.exception('Failed trying to invest: {0}'.format(str(e)))
+                    self.note_cycle(outcome='error', phase=self.phase, error=str(e))
 
             else:
-                self.logger.info('Only ${0} available for investing (of your ${1} balance)'.format(cash, self.lc.get_cash_balance()))
+                self.note_cycle(outcome='low_cash')
+                self.logger.info('Only ${0} available for investing (of your ${1} balance)'.format(cash, self.circuits['balance'].call(self.timed, self.lc.get_cash_balance)))
                 return False
 
         except Exception as e:
             self.logger.error(str(e))
+            self.note_cycle(outcome='error', phase=self.phase, error=str(e))
 
         return False
 
+    def get_order_journal(self):
+        """
+        Return the order journal, reading the order journal file the first time.
+        Simulations keep it in memory.
+        """
+        if self.order_journal is None:
+            file_path = None if self.simulated else os.path.join(self.app_dir, self.order_journal_file)
+            try:
+                self.order_journal = OrderJournal(file_path, clock=self.clock.time)
+            except Exception as e:
+                # It could be hiding an order that went through, so don't invest without it
+                raise AutoInvestorError('Couldn\'t read the order journal, {0}: {1}'.format(file_path, str(e)))
+        return self.order_journal
+
+    def place_order(self, order, portfolio, cash, portfolio_name=None):
+        """
+        Send the order to LendingClub, recorded in the order journal so it's never sent twice.
+        If it fails, or LendingClub doesn't answer, it's only sent again (up to order_retries times)
+        once the account's recent orders show it didn't go through.
+        Returns the order ID, or raises the last error.
+        """
+        journal = self.get_order_journal()
+        record = journal.start(cash, portfolio, portfolio_name)
+
+        def execute():
+            try:
+                order.execute(portfolio_name=portfolio_name)
+            except Exception as e:
+                if not order.order_id:
+                    raise
+                self.logger.warning('Order #{0} was placed, but: {1}'.format(order.order_id, str(e)))
+            return order.order_id
+
+        while True:
+            try:
+                return self.circuits['order'].call(self.timed, journal.run, record, execute)
+            except Exception as e:
+                error = e
+
+            # It was never sent
+            if record['attempts'] == 0:
+                journal.settle(record)
+                raise error
+
+            self.logger.warning('The order may not have gone through, checking your recent orders: {0}'.format(str(error)))
+            stopped = self.sleep(self.settings['order_retry_seconds'])
+
+            # Even when stopping, find out if it went through, so it's recorded
+            order_id = self.reconcile_order(record)
+            if order_id:
+                return order_id
+            if order_id is None or stopped or record['attempts'] > self.settings['order_retries'] or not self.circuits['order'].allow():
+                if order_id is False:
+                    journal.settle(record)
+                raise error
+
+            self.logger.info('The order didn\'t go through, sending it again')
+            order._Order__already_staged = False  # Stage the loans again, in case LendingClub dropped them
+
+    def reconcile_order(self, record):
+        """
+        Find out if a journaled order went through, from the account's most recent orders.
+        Returns the order ID, False if it didn't go through, or None if that can't be told (yet).
+        """
+        journal = self.get_order_journal()
+
+        # The call to LendingClub could still be going, after giving up on it
+        remaining = self.phase_timer.remaining()
+        if not journal.wait(record, remaining if remaining is not None else 0):
+            return None
+        if record['state'] == PLACED:
+            return record['order_id']
+
+        try:
+            notes = self.circuits['balance'].call(self.timed, self.lc.my_notes, sort_by='orderId', sort_dir='desc')
+        except Exception as e:
+            self.logger.warning('Could not check your recent orders: {0}'.format(str(e)))
+            return None
+        if notes.get('result') != 'success':
+            return None
+
+        order_id = find_order(record, notes['loans'])
+        if order_id is None:
+            return False
+        journal.settle(record, order_id)
+        return order_id
+
+    def check_orders(self):
+        """
+        Settle the orders in the journal that may or may not have gone through (i.e. the process
+        stopped while one was being sent). Returns False if that still can't be told for one.
+        """
+        journal = self.get_order_journal()
+        pending = journal.get_pending()
+        if len(pending) == 0:
+            return True
+
+        self.set_phase('checking orders', 'order')
+        for record in pending:
+            order_id = self.reconcile_order(record)
+            created = time.ctime(record['created'])
+            if order_id is None:
+                self.logger.warning('Not investing until it\'s known if the ${0} order from {1} went through'.format(record['invested'], created))
+                return False
+            elif order_id is False:
+                journal.settle(record)
+                self.logger.info('The ${0} order from {1} didn\'t go through'.format(record['invested'], created))
+            else:
+                self.logger.info('The ${0} order from {1} went through after all, as order #{2}'.format(record['invested'], created, order_id))
+                portfolio = Portfolio.load(record['portfolio'])
+                portfolio.set_order_id(order_id)
+                self.portfolio_cache.clear()
+                self.get_cash_watcher().spent(record['invested'])
+                self.save_cash_watcher()
+                self.save_last_investment(record['cash'], portfolio, order_id, portfolio_name=record['portfolio_name'])
+        return True
+
     def save_last_investment(self, cash, portfolio, order_id, portfolio_name=None):
         """"
         Save a log of the last investment to the last_investment file
         """
         try:
             last_invested = {
-                'timestamp': int(time.time()),
+                'timestamp': int(self.clock.time()),
                 'order_id': order_id,
                 'portfolio': portfolio_name,
                 'cash': cash,
                 'investment': portfolio
             }
 
+            self.last_investment = last_invested
+            if self.simulated:
+                return
+
             # Convert to JSON
-            json_out = json.dumps(last_invested)
+            saved = last_invested.copy()
+            saved['investment'] = portfolio.dump()
+            json_out = json.dumps(saved)
             self.logger.debug('Saving last investment file with JSON: {0}'.format(json_out))
 
             # Save
@@ -350,34 +1022,506 @@ class AutoInvestor:
                 f.close()
 
                 # Convert to dictionary and return
-                return json.loads(json_str)
+                last_investment = json.loads(json_str)
+                last_investment['investment'] = Portfolio.load(last_investment['investment'])
+                return last_investment
 
         except Exception as e:
             self.logger.warning('Couldn\'t read the last investment file. {0}'.format(str(e)))
 
         return None
 
+    def get_listing_version(self, settings, stats):
+        """
+        Return the version of the loans listed on LendingClub, which changes when loans that match
+        your filters show up or are funded. It's a fingerprint of the loans found by one search, or if that search
+        fails, the last time new loans were released.
+        Portfolio searches are only cached, or skipped, while it stays the same.
+        """
+        self.listing_complete = False
+        try:
+            listed = self.circuits['search'].call(self.timed, self.get_listed_loan_ids, settings.filters)
+            if listed is not None:
+                loan_ids, self.listing_complete = listed
+                return stats.update_listing(loan_ids)
+        except Exception as e:
+            self.logger.debug('Could not fingerprint the listed loans: {0}'.format(str(e)))
+
+        slot = util.get_release_slot(self.clock.time(), settings.listing_release_hours)
+        if slot is None:
+            return None
+        return 'release:{0}'.format(slot)
+
+    def get_listed_loan_ids(self, filters=None):
+        """
+        Search for the loans that match your filters, update the inventory with them and return their IDs,
+        and whether that was all of them, as (loan_ids, complete). None if LendingClub returned loans that don't match them.
+        """
+        try:
+            results = self.lc.search(filters, limit=self.fingerprint_size)
+        except FilterValidationError:
+            return None
+        if not results:
+            return None
+
+        # Loans past the first page might still be listed
+        complete = len(results['loans']) >= results.get('totalRecords', 0)
+        added, changed, removed = self.inventory.sync(results['loans'], complete=complete)
+        self.logger.debug('Listing: {0} new, {1} changed and {2} funded loans'.format(added, changed, removed))
+
+        return ([loan['loan_id'] for loan in results['loans']], complete)
+
+    def get_listed_capacity(self):
+        """
+        Return the number of listed loans that match your filters and still have room for a note,
+        from the inventory, or None if this cycle's listing search didn't find all of them
+        """
+        if not self.listing_complete:
+            return None
+        return len(self.inventory.select(min_unfunded=25))
+
+    def get_search_stats(self, settings):
+        """
+        Return the portfolio search statistics for the investing profile of a settings snapshot.
+        They start over when the investment settings change.
+        """
+        if self.search_stats is None:
+            self.search_stats = self.load_search_stats()
+
+        stats = self.search_stats.get(settings.profile)
+        if stats is None or stats.key != settings.key:
+            stats = SearchStats(settings.key)
+            self.search_stats[settings.profile] = stats
+        return stats
+
+    def load_search_stats(self):
+        """
+        Return the search statistics saved to the search_stats file, by investing profile
+        """
+        stats = {}
+        try:
+            file_path = os.path.join(self.app_dir, self.search_stats_file)
+            if os.path.exists(file_path):
+                f = open(file_path, 'r')
+                saved = json.loads(f.read())
+                f.close()
+
+                for profile, profile_stats in saved.iteritems():
+                    stats[profile] = SearchStats.from_dict(profile_stats)
+
+        except Exception as e:
+            self.logger.warning('Couldn\'t read the search stats file. {0}'.format(str(e)))
+
+        return stats
+
+    def save_search_stats(self):
+        """
+        Save the search statistics to the search_stats file
+        """
+        if self.simulated or self.search_stats is None:
+            return
+
+        try:
+            saved = dict([(profile, stats.to_dict()) for profile, stats in self.search_stats.iteritems()])
+            file_path = os.path.join(self.app_dir, self.search_stats_file)
+            f = open(file_path, 'w')
+            f.write(json.dumps(saved))
+            f.close()
+        except Exception as e:
+            self.logger.warning('Couldn\'t save the search stats to file (this warning can be ignored). {0}'.format(str(e)))
+
+    def get_history(self):
+        """
+        Return the cycle history, opening the history file the first time.
+        Simulations don't have a history unless they're given one.
+        """
+        if self.history is None and not self.simulated:
+            try:
+                self.history = CycleHistory(os.path.join(self.app_dir, self.history_file))
+            except Exception as e:
+                self.logger.warning('Couldn\'t open the history file (this warning can be ignored). {0}'.format(str(e)))
+        return self.history
+
+    def start_cycle_record(self):
+        """
+        Start recording a cycle to the history
+        """
+        self.phase_timer.take_timings()
+        self.cycle_record = {
+            'started': self.clock.time(),
+            'outcome': 'skipped',
+            'cash': None,
+            'invested': 0,
+            'attempts': 0,
+            'cached': 0,
+            'phase': None,
+            'error': None
+        }
+
+    def note_cycle(self, **values):
+        """
+        Add to the record of the current cycle (i.e. outcome='invested', invested=500)
+        """
+        if self.cycle_record is not None:
+            self.cycle_record.update(values)
+
+    def save_cycle_record(self):
+        """
+        Save the current cycle to the history
+        """
+        record = self.cycle_record
+        self.cycle_record = None
+        if record is None:
+            return
+        self.last_outcome = record['outcome']
+
+        history = self.get_history()
+        if history is None:
+            return
+
+        try:
+            account = self.settings['email'] or 'none'
+            started = record.pop('started')
+            history.record_cycle(account, started, self.clock.time() - started, phases=self.phase_timer.take_timings(), **record)
+        except Exception as e:
+            self.logger.warning('Couldn\'t save the cycle to the history file (this warning can be ignored). {0}'.format(str(e)))
+
+    def get_cash_watcher(self):
+        """
+        Return the cash watcher, loading it from the cash_watch file the first time
+        """
+        if self.cash_watcher is None:
+            self.cash_watcher = CashWatcher()
+            try:
+                file_path = os.path.join(self.app_dir, self.cash_watch_file)
+                if not self.simulated and os.path.exists(file_path):
+                    f = open(file_path, 'r')
+                    self.cash_watcher = CashWatcher.from_dict(json.loads(f.read()))
+                    f.close()
+            except Exception as e:
+                self.logger.warning('Couldn\'t read the cash watch file. {0}'.format(str(e)))
+        return self.cash_watcher
+
+    def save_cash_watcher(self):
+        """
+        Save the cash watcher to the cash_watch file
+        """
+        if self.simulated or self.cash_watcher is None:
+            return
+
+        try:
+            file_path = os.path.join(self.app_dir, self.cash_watch_file)
+            f = open(file_path, 'w')
+            f.write(json.dumps(self.cash_watcher.to_dict()))
+            f.close()
+        except Exception as e:
+            self.logger.warning('Couldn\'t save the cash watch file (this warning can be ignored). {0}'.format(str(e)))
+
+    def get_watched_cycle(self):
+        """
+        When to check for cash next, while there isn't enough to invest: soon during the hours cash
+        tends to arrive in, and less often on days it doesn't. None to keep to the usual schedule.
+        """
+        if not self.settings['cash_watch'] or self.last_outcome not in ['low_cash', 'invested']:
+            return None
+        return self.get_cash_watcher().get_next_check(self.clock.time(),
+            self.settings['frequency'] * 60,
+            self.settings['cash_watch_fast_minutes'] * 60,
+            self.settings['cash_watch_slow_minutes'] * 60)
+
     def investment_loop(self):
         """
         Start the investment loop
         Check the account every so often (default is every 60 minutes) for funds to invest
         The frequency is defined by the 'frequency' value in the ~/.lcinvestor/settings.yaml file
+
+        Commands from the control socket (invest-now, pause, resume, reload, restart, stop) wake the loop
+        right away, instead of waiting for the next cycle.
+        """
+        self.loop = not self.stopping.is_set()  # Stopped before it started
+        if not self.simulated:
+            self.last_investment = self.get_last_investment()
+            self.start_control_server()
+            self.memory_monitor.start()
+
+        try:
+            if self.resumed:
+                self.logger.info('Restarted as lcinvestor {0}, carrying on from the last process'.format(self.version()))
+            else:
+                self.next_cycle = self.clock.time()
+            while self.loop:
+
+                # Only returns if the new process couldn't be started
+                if self.restart_requested:
+                    self.restart()
+
+                if self.reload_requested:
+                    self.set_phase('reloading')
+                    self.apply_reload()
+
+                # Time for a cycle?
+                if self.cycle_requested or (not self.paused and self.clock.time() >= self.next_cycle):
+                    self.run_cycle()
+                    self.schedule_next_cycle()
+                    self.check_memory()
+                    continue
+
+                # Time to warm up for the next one?
+                warm_up_at = self.get_warm_up_time()
+                if not self.paused and warm_up_at is not None and self.clock.time() >= warm_up_at:
+                    self.warmed_for = self.next_cycle
+                    self.warm_up()
+                    continue
+
+                # Wait until the next cycle or a command (or stop()) wakes us up.
+                # (waits have a timeout, so signals, like CTRL+C, are handled while waiting)
+                timeout = 60
+                if self.paused:
+                    self.set_phase('paused')
+                else:
+                    self.set_phase('sleeping')
+                    wake_at = warm_up_at if warm_up_at is not None else self.next_cycle
+                    timeout = min(timeout, max(0, wake_at - self.clock.time()))
+                self.clock.wait(self.wake, timeout)
+                self.wake.clear()
+
+        finally:
+            self.set_phase('stopped')
+            self.stop_control_server()
+
+    def restart(self):
         """
-        self.loop = True
-        frequency = self.settings.user_settings['frequency']
-        while self.loop:
+        Replace this process with a new one, running the lcinvestor installed now (i.e. after an upgrade).
+        The new process takes over the session, schedule, caches, circuits and control socket (see take_over),
+        so it doesn't log in again or miss a cycle. Called by the loop, between cycles.
+        Returns False if the new process couldn't be started, and this one carries on.
+        """
+        self.restart_requested = False
+        self.set_phase('restarting')
+        self.logger.info('Restarting...')
+
+        try:
+            state, secrets = self.get_handoff()
+            fds = handoff.write_handoff(state, secrets)
+        except Exception as e:
+            self.logger.error('Could not restart: {0}'.format(str(e)))
+            self.resume_control_server()
+            return False
+
+        # Nothing buffered in this process survives the exec
+        if self.history is not None:
+            self.history.close()
+            self.history = None
+        util.stop_logging()
+        logging.shutdown()
+
+        try:
+            os.execv(self.restart_command[0], self.restart_command + ['--handoff', fds])
+        except OSError as e:
+            handoff.discard_handoff(fds)
+            self.setup_logging()
+            self.logger.error('Could not restart: {0}'.format(str(e)))
+            self.resume_control_server()
+            return False
 
+    def get_handoff(self):
+        """
+        Return the state (as a dict) and the secrets (the password and session) this investor
+        hands to the process that replaces it, when it restarts
+        """
+        self.save_search_stats()
+        self.save_cash_watcher()
+
+        session = None
+        if self.authed:
+            session = get_session_state(self.lc.session)
+
+        state = {
+            'lcinvestor': self.version(),
+            'verbose': self.verbose,
+            'auto_execute': self.auto_execute,
+            'app_dir': self.app_dir,
+            'log_file': self.log_file,
+            'pidfile_path': self.pidfile_path,
+            'started': self.started,
+            'settings': self.settings.get_handoff(),
+            'schedule': {
+                'next_cycle': self.next_cycle,
+                'paused': self.paused,
+                'cycle_requested': self.cycle_requested,
+                'reload_requested': self.reload_requested,
+                'warmed_up': self.warmed_up,
+                'warmed_for': self.warmed_for,
+                'last_cycle_start': self.last_cycle_start,
+                'last_cycle_latency': self.last_cycle_latency
+            },
+            'circuits': self.get_circuit_status(),
+            'portfolio_cache': self.portfolio_cache.to_dict(),
+            'inventory': self.inventory.to_dict(),
+            'control_fd': self.control_server.hand_off() if self.control_server is not None else None
+        }
+        secrets = {
+            'email': self.settings.auth['email'],
+            'pass': self.settings.auth['pass'],
+            'session': session
+        }
+        return (state, secrets)
+
+    def take_over(self, state, secrets):
+        """
+        Carry on from the investor that handed off this state and secrets (see restart())
+        """
+        self.log_file = state['log_file']
+        self.started = state['started']
+        self.settings.take_over(state['settings'])
+        self.settings.auth['email'] = secrets['email']
+        self.settings.auth['pass'] = secrets['pass']
+        self.apply_settings()
+
+        for name, value in state['schedule'].iteritems():
+            setattr(self, name, value)
+        for status in state['circuits']:
+            if status['name'] in self.circuits:
+                self.circuits[status['name']].restore(status)
+        self.portfolio_cache.load_dict(state['portfolio_cache'])
+        self.inventory = LoanInventory.from_dict(state['inventory'])
+        self.control_fd = state['control_fd']
+
+        # The session is still logged in, so the next cycle doesn't have to
+        if secrets['session'] is not None:
+            set_session_state(self.lc.session, secrets['session'], secrets['pass'])
+            self.authed = True
+
+        self.resumed = True
+
+    def resume_control_server(self):
+        """
+        Serve the control socket again, after it was handed off to a restart that failed
+        """
+        if self.control_server is not None and self.control_server.thread is None:
+            self.control_server.start()
+
+    def get_warm_up_time(self):
+        """
+        When to warm up for the next scheduled cycle, or None if it's turned off or has already run
+        """
+        seconds = self.settings['warm_up_seconds']
+        if not seconds or self.warmed_for == self.next_cycle:
+            return None
+        return self.next_cycle - seconds
+
+    def check_memory(self):
+        """
+        Count a cycle for the memory monitor, which reports what grew every memory_check_cycles cycles
+        """
+        if self.simulated:
+            return
+
+        try:
+            self.memory_monitor.cycle_done()
+        except Exception as e:
+            self.logger.warning('Couldn\'t check the memory (this warning can be ignored). {0}'.format(str(e)))
+
+    def schedule_next_cycle(self):
+        """
+        Move the next cycle to the next deadline on the schedule.
+        Deadlines are every `frequency` minutes from when the loop started, no matter how long
+        each cycle takes, so cycles don't drift later. Deadlines a cycle runs past are skipped.
+        """
+        period = self.settings['frequency'] * 60
+        self.next_cycle, missed = next_deadline(self.next_cycle, period, self.clock.time())
+
+        if missed > 1 and self.last_cycle_latency > period:
+            self.logger.warning('The last cycle took {0:.0f} seconds, longer than the {1} minute frequency. Skipped {2} scheduled cycle(s).'.format(self.last_cycle_latency, self.settings['frequency'], missed - 1))
+
+        # Check for cash on the cash watcher's schedule, while there's not enough to invest
+        watched = self.get_watched_cycle()
+        if watched is not None:
+            self.next_cycle = watched
+
+    def warm_up(self):
+        """
+        Run the steps of a cycle that don't depend on the cash or the listed loans ahead of the next one:
+        check the site is up, log in (which opens the connection the cycle reuses), compile the settings
+        and reload the saved filter. Returns True if the next cycle can skip them.
+        """
+        self.warmed_up = None
+        if len([name for name in ENDPOINTS if not self.circuits[name].allow()]) > 0:
+            return False
+
+        try:
+            self.set_phase('warming up', 'site')
+            if not self.is_site_available():
+                self.logger.info('LendingClub is not responding, the next cycle will wait for it')
+                return False
+
+            self.set_phase('warming up', 'auth')
+            self.circuits['auth'].call(self.timed, self.authenticate)
+
+            self.set_phase('warming up', 'search')
+            settings = self.settings.get_snapshot()
+            if type(settings.filters) is SavedFilter:
+                self.circuits['search'].call(self.timed, settings.filters.reload)
+        except Exception as e:
+            self.logger.warning('Could not warm up, the next cycle will start from the beginning: {0}'.format(str(e)))
+            return False
+        finally:
+            self.set_phase('sleeping')
+
+        self.warmed_up = self.clock.time()
+        self.logger.debug('Warmed up for the next cycle')
+        return True
+
+    def is_warm(self):
+        """
+        True if a warm-up ran recently enough for the next cycle to skip the steps it did
+        """
+        if self.warmed_up is None:
+            return False
+        return self.clock.time() - self.warmed_up <= (self.settings['warm_up_seconds'] or 0) + self.warm_up_grace
+
+    def run_cycle(self):
+        """
+        Run one investment cycle from the loop
+        """
+        self.state_lock.acquire()
+        self.cycle_requested = False
+        self.in_cycle = True
+        self.state_lock.release()
+
+        # A warm-up is only used by the cycle after it
+        warm = self.is_warm()
+        self.warmed_up = None
+
+        self.last_cycle_start = self.clock.time()
+        profiler = self.start_profile()
+        self.start_cycle_record()
+        try:
             # Make sure the site is available (network could be reconnecting after sleep)
+            self.set_phase('waiting for site', 'site')
             attempts = 0
-            while not self.lc.is_site_available() and self.loop:
+            while self.loop and not warm and not self.is_site_available():
                 attempts += 1
+                remaining = self.phase_timer.remaining()
+                if remaining is not None and remaining <= 10:
+                    self.logger.warning('LendingClub is not responding. Skipping this cycle.')
+                    self.note_cycle(outcome='site_down')
+                    return
                 if attempts % 5 == 0:
                     self.logger.warn('LendingClub is not responding. Trying again in 10 seconds...')
-                sleep(10)
+                if self.sleep(10):
+                    break
 
             # Invest
-            self.attempt_to_invest()
-            pause.minutes(frequency)
+            if self.loop:
+                self.attempt_to_invest(warm)
+        finally:
+            self.phase_timer.end()
+            self.in_cycle = False
+            self.last_cycle_latency = self.clock.time() - self.last_cycle_start
+            self.save_cycle_record()
+            if profiler is not None:
+                self.end_profile(profiler)
 
 
 class AutoInvestorError(Exception):
@@ -0,0 +1,134 @@
+#!/usr/bin/env python
+
+#
+# Caches portfolio search results while the listed loans stay the same
+#
+
+"""
+The MIT License (MIT)
+
+Copyright (c) 2013 Jeremy Gillick
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+import time
+import hashlib
+
+
+def get_listing_fingerprint(loan_ids):
+    """
+    A short hash of a set of listed loan IDs
+    """
+    return hashlib.md5(str(sorted(loan_ids))).hexdigest()[:16]
+
+
+class PortfolioCache:
+    """
+    A least recently used cache of build_portfolio results, including False for no portfolio.
+
+    Each result is stored with the version of the listing it was found in, and is only
+    returned while the listing has the same version (and it's no older than max_age seconds).
+    """
+
+    def __init__(self, max_entries=128, max_age=None, clock=time.time):
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self.clock = clock
+
+        self.entries = {}  # key: [version, stored at, last used, result]
+        self.tick = 0
+
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key, version):
+        """
+        Return the cached result for key, or None if there isn't one for this listing version
+        """
+        entry = self.entries.get(key)
+        if entry is not None and (entry[0] != version or self.is_expired(entry)):
+            del self.entries[key]
+            self.invalidations += 1
+            entry = None
+
+        if entry is None or version is None:
+            self.misses += 1
+            return None
+
+        self.tick += 1
+        entry[2] = self.tick
+        self.hits += 1
+        if not entry[3]:
+            self.negative_hits += 1
+        return entry[3]
+
+    def put(self, key, version, result):
+        """
+        Cache a result. Nothing is cached without a listing version.
+        """
+        if version is None or self.max_entries <= 0:
+            return
+
+        if key not in self.entries and len(self.entries) >= self.max_entries:
+            oldest = min(self.entries, key=lambda k: self.entries[k][2])
+            del self.entries[oldest]
+            self.evictions += 1
+
+        self.tick += 1
+        self.entries[key] = [version, self.clock(), self.tick, result]
+
+    def is_expired(self, entry):
+        return self.max_age is not None and self.clock() - entry[1] > self.max_age
+
+    def clear(self):
+        """
+        Drop all results (i.e. after an order, which changes the loans and cash available)
+        """
+        self.invalidations += len(self.entries)
+        self.entries = {}
+
+    def to_dict(self):
+        return {'entries': [[list(key)] + entry for key, entry in self.entries.iteritems()], 'tick': self.tick}
+
+    def load_dict(self, saved):
+        """
+        Load the results saved by to_dict(). The keys are (cash, settings key) tuples.
+        """
+        self.entries = dict([(tuple(entry[0]), entry[1:]) for entry in saved['entries']])
+        self.tick = saved['tick']
+
+    def status(self):
+        """
+        Return a dict with the cache size and hit rate
+        """
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self.entries),
+            'lookups': lookups,
+            'hits': self.hits,
+            'misses': self.misses,
+            'negative_hits': self.negative_hits,
+            'hit_rate': (self.hits * 100.0 / lookups) if lookups > 0 else None,
+            'evictions': self.evictions,
+            'invalidations': self.invalidations
+        }
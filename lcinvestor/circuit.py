@@ -0,0 +1,184 @@
+#!/usr/bin/env python
+
+#
+# Circuit breakers that stop the investor from hammering LendingClub while it's failing
+#
+
+"""
+The MIT License (MIT)
+
+Copyright (c) 2013 Jeremy Gillick
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+import time
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half-open'
+
+# The groups of LendingClub calls that each get their own breaker
+ENDPOINTS = ['auth', 'balance', 'search', 'order']
+
+
+class CircuitBreaker:
+    """
+    Tracks consecutive failures for one class of LendingClub calls.
+
+    closed    -- Calls go through normally
+    open      -- `threshold` calls in a row have failed. Calls fail fast, without
+                 touching the network, until `cooldown` seconds have passed.
+    half-open -- The cooldown is over. The next call is a trial: success closes
+                 the circuit again, failure re-opens it for another cooldown.
+    """
+
+    name = None
+    state = CLOSED
+    threshold = 3
+    cooldown = 900
+    failures = 0
+    opened_at = None
+    last_error = None
+    logger = None
+
+    def __init__(self, name, threshold=3, cooldown=900, logger=None, clock=time.time):
+        """
+        name -- The endpoint class this breaker guards (auth, balance, search, order)
+        threshold -- How many failures in a row before the circuit opens
+        cooldown -- Seconds to wait, while open, before allowing a trial call
+        """
+        self.name = name
+        self.threshold = max(1, int(threshold))
+        self.cooldown = cooldown
+        self.logger = logger
+        self.clock = clock
+        self.reset()
+
+    def reset(self):
+        """
+        Close the circuit and forget all failures
+        """
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self.last_error = None
+
+    def retry_at(self):
+        """
+        The timestamp when an open circuit will allow a trial call, or None if it isn't open
+        """
+        if self.state != OPEN:
+            return None
+        return self.opened_at + self.cooldown
+
+    def allow(self):
+        """
+        Returns True if a call can be made right now.
+        An open circuit moves to half-open once its cooldown has passed.
+        """
+        if self.state == OPEN:
+            if self.clock() < self.retry_at():
+                return False
+            self.__set_state(HALF_OPEN)
+        return True
+
+    def success(self):
+        """
+        Record a successful call
+        """
+        self.failures = 0
+        self.last_error = None
+        if self.state != CLOSED:
+            self.__set_state(CLOSED)
+
+    def failure(self, error=None):
+        """
+        Record a failed call
+        """
+        self.failures += 1
+        if error is not None:
+            self.last_error = str(error)
+
+        if self.state == HALF_OPEN or self.failures >= self.threshold:
+            self.opened_at = self.clock()
+            self.__set_state(OPEN)
+
+    def call(self, fn, *args, **kwargs):
+        """
+        Run fn(*args, **kwargs) through the breaker.
+        Raises CircuitOpenError, without calling fn, if the circuit is open.
+        """
+        if not self.allow():
+            raise CircuitOpenError(self)
+
+        try:
+            result = fn(*args, **kwargs)
+        except Exception as e:
+            self.failure(e)
+            raise
+
+        self.success()
+        return result
+
+    def status(self):
+        """
+        Return a dict describing the breaker, for monitoring
+        """
+        return {
+            'name': self.name,
+            'state': self.state,
+            'failures': self.failures,
+            'threshold': self.threshold,
+            'cooldown': self.cooldown,
+            'opened_at': self.opened_at,
+            'retry_at': self.retry_at(),
+            'last_error': self.last_error
+        }
+
+    def restore(self, status):
+        """
+        Pick up where the breaker that returned this status() left off (i.e. in the process it handed off to)
+        """
+        self.state = status['state']
+        self.failures = status['failures']
+        self.opened_at = status['opened_at']
+        self.last_error = status['last_error']
+
+    def __set_state(self, state):
+        if state == self.state:
+            return
+
+        if self.logger:
+            if state == OPEN:
+                self.logger.warning('Circuit "{0}" is open after {1} failures. Skipping these calls for {2} seconds'.format(self.name, self.failures, self.cooldown))
+            else:
+                self.logger.info('Circuit "{0}" is {1}'.format(self.name, state))
+
+        self.state = state
+
+
+class CircuitOpenError(Exception):
+
+    def __init__(self, circuit):
+        self.circuit = circuit
+        self.value = 'The "{0}" circuit is open until {1}'.format(circuit.name, time.ctime(circuit.retry_at()))
+
+    def __str__(self):
+        return repr(self.value)
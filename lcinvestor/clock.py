@@ -0,0 +1,57 @@
+#!/usr/bin/env python
+
+#
+# The clock the investor uses to tell time and wait
+#
+
+"""
+The MIT License (MIT)
+
+Copyright (c) 2013 Jeremy Gillick
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+import time
+
+
+class Clock:
+    """
+    Wall clock time. The simulation swaps this out for a clock that runs on simulated time.
+    """
+
+    def time(self):
+        """
+        Return the current timestamp, in seconds
+        """
+        return time.time()
+
+    def sleep(self, seconds):
+        """
+        Wait for a number of seconds
+        """
+        time.sleep(seconds)
+
+    def wait(self, event, timeout):
+        """
+        Wait up to timeout seconds for a threading.Event to be set.
+        Returns True if the event was set.
+        """
+        event.wait(timeout)
+        return event.is_set()
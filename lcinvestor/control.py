@@ -0,0 +1,221 @@
+#!/usr/bin/env python
+
+#
+# Local control socket, used to send commands to a running investor
+#
+
+"""
+The MIT License (MIT)
+
+Copyright (c) 2013 Jeremy Gillick
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+import os
+import json
+import time
+import socket
+import threading
+import SocketServer
+
+# The socket file, in the app directory
+socket_file = 'control.sock'
+
+# Commands the investor accepts over the socket
+COMMANDS = ['invest-now', 'pause', 'resume', 'reload', 'restart', 'stop', 'status', 'profile']
+
+
+def is_supported():
+    """
+    Returns True if this system supports unix-domain sockets
+    """
+    return hasattr(socket, 'AF_UNIX')
+
+
+def get_socket_path(app_dir):
+    """
+    Return the path to the control socket in the app directory
+    """
+    return os.path.join(app_dir, socket_file)
+
+
+def send_command(path, command, timeout=5):
+    """
+    Send a command to the investor listening on the control socket at path.
+    Returns the response dict, or raises ControlError if nobody is listening.
+    """
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(timeout)
+    try:
+        try:
+            sock.connect(path)
+            sock.sendall('{0}\n'.format(command))
+
+            response = ''
+            while not response.endswith('\n'):
+                chunk = sock.recv(4096)
+                if not chunk:
+                    break
+                response += chunk
+
+        except socket.error as e:
+            raise ControlError('Could not talk to the investor at {0}: {1}'.format(path, str(e)))
+    finally:
+        sock.close()
+
+    try:
+        return json.loads(response)
+    except ValueError:
+        raise ControlError('Invalid response from the investor: {0}'.format(response))
+
+
+def is_listening(path):
+    """
+    Returns True if an investor is listening on the control socket at path
+    """
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(1)
+    try:
+        sock.connect(path)
+        return True
+    except socket.error:
+        return False
+    finally:
+        sock.close()
+
+
+class ControlRequestHandler(SocketServer.StreamRequestHandler):
+    """
+    Reads one command per line and writes back a JSON response line
+    """
+
+    def handle(self):
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                break
+
+            command = line.strip()
+            if command == '':
+                continue
+
+            try:
+                response = self.server.investor.handle_command(command)
+            except Exception as e:
+                response = {'result': 'error', 'message': str(e)}
+
+            self.wfile.write(json.dumps(response) + '\n')
+            self.wfile.flush()
+
+
+class ControlServer(SocketServer.ThreadingMixIn, SocketServer.UnixStreamServer):
+    """
+    Listens on a unix-domain socket and passes commands to AutoInvestor.handle_command()
+    """
+
+    investor = None
+    thread = None
+    daemon_threads = True
+
+    def __init__(self, investor, path, fd=None):
+        """
+        fd is the socket handed off by the process this one replaced (see hand_off()), to serve instead of opening a new one
+        """
+        self.investor = investor
+        self.path = path
+        self.handling = 0  # Connections being handled
+        self.handled = threading.Condition()
+
+        if fd is not None:
+            SocketServer.UnixStreamServer.__init__(self, path, ControlRequestHandler, bind_and_activate=False)
+            self.socket.close()
+            self.socket = socket.fromfd(fd, socket.AF_UNIX, socket.SOCK_STREAM)
+            os.close(fd)
+            return
+
+        # Another investor is already listening
+        if os.path.exists(path):
+            if is_listening(path):
+                raise ControlError('An investor is already listening on {0}'.format(path))
+            os.unlink(path)
+
+        SocketServer.UnixStreamServer.__init__(self, path, ControlRequestHandler)
+        os.chmod(path, 0600)
+
+    def start(self):
+        """
+        Serve requests in a background thread
+        """
+        self.thread = threading.Thread(target=self.serve_forever, name='lcinvestor-control')
+        self.thread.daemon = True
+        self.thread.start()
+
+    def process_request_thread(self, request, client_address):
+        self.handled.acquire()
+        self.handling += 1
+        self.handled.release()
+        try:
+            SocketServer.ThreadingMixIn.process_request_thread(self, request, client_address)
+        finally:
+            self.handled.acquire()
+            self.handling -= 1
+            self.handled.notify_all()
+            self.handled.release()
+
+    def hand_off(self, timeout=5):
+        """
+        Stop serving, but keep the socket open, and return its file descriptor for the process replacing
+        this one to serve. Commands sent in between wait for it. Waits up to timeout seconds for the
+        commands being handled to be answered.
+        """
+        if self.thread is not None:
+            self.shutdown()
+            self.thread = None
+
+        deadline = time.time() + timeout
+        self.handled.acquire()
+        try:
+            while self.handling > 0 and time.time() < deadline:
+                self.handled.wait(deadline - time.time())
+        finally:
+            self.handled.release()
+        return self.socket.fileno()
+
+    def stop(self):
+        """
+        Stop serving and remove the socket file
+        """
+        try:
+            if self.thread is not None:
+                self.shutdown()
+                self.thread = None
+            self.server_close()
+        finally:
+            if os.path.exists(self.path):
+                os.unlink(self.path)
+
+
+class ControlError(Exception):
+
+    def __init__(self, value):
+        self.value = value
+
+    def __str__(self):
+        return repr(self.value)
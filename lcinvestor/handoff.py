@@ -0,0 +1,121 @@
+#!/usr/bin/env python
+
+#
+# Hands the investor's state to the process that replaces it, when it restarts in place
+#
+
+"""
+The MIT License (MIT)
+
+Copyright (c) 2013 Jeremy Gillick
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+
+import os
+import json
+import tempfile
+
+# The format of the state written here. The new process refuses state in a format it doesn't know,
+# so bump this when the state changes in a way older code can't read.
+HANDOFF_FORMAT = 1
+
+# The secrets (password and session cookies) go through a pipe, so they're never written to disk.
+# Everything has to fit in the pipe's buffer, since it's written before the exec that reads it.
+MAX_SECRETS_SIZE = 16384
+
+
+def write_handoff(state, secrets):
+    """
+    Write the state and secrets for the next process to file descriptors that stay open across exec.
+    Returns them as 'STATE_FD,SECRETS_FD', to pass on the new process's command line.
+    """
+    state = dict(state, format=HANDOFF_FORMAT)
+    secrets = json.dumps(secrets)
+    if len(secrets) > MAX_SECRETS_SIZE:
+        raise HandoffError('The secrets are too big to hand off ({0} bytes)'.format(len(secrets)))
+
+    # The state can be big (i.e. the listed loans), so it's written to a temp file with no name
+    f = tempfile.TemporaryFile(prefix='lcinvestor-handoff-')
+    try:
+        f.write(json.dumps(state))
+        f.flush()
+        state_fd = os.dup(f.fileno())  # A copy that isn't closed on exec
+    finally:
+        f.close()
+    os.lseek(state_fd, 0, os.SEEK_SET)
+
+    secrets_fd, write_fd = os.pipe()
+    try:
+        while secrets:
+            secrets = secrets[os.write(write_fd, secrets):]
+    finally:
+        os.close(write_fd)
+
+    return '{0},{1}'.format(state_fd, secrets_fd)
+
+
+def read_handoff(fds):
+    """
+    Read the state and secrets from the file descriptors write_handoff() returned (as 'STATE_FD,SECRETS_FD')
+    and close them. Returns (state, secrets) or raises HandoffError.
+    """
+    try:
+        state_fd, secrets_fd = [int(fd) for fd in fds.split(',')]
+    except ValueError:
+        raise HandoffError('\'{0}\' isn\'t a pair of file descriptors'.format(fds))
+
+    try:
+        state = json.loads(read_fd(state_fd))
+        secrets = json.loads(read_fd(secrets_fd))
+    except (OSError, ValueError) as e:
+        raise HandoffError('Could not read the state handed off: {0}'.format(str(e)))
+
+    if state.get('format') != HANDOFF_FORMAT:
+        raise HandoffError('The state handed off is in format {0}, this version of lcinvestor reads format {1}'.format(state.get('format'), HANDOFF_FORMAT))
+    return (state, secrets)
+
+
+def discard_handoff(fds):
+    """
+    Close the file descriptors write_handoff() returned, if the new process couldn't be started
+    """
+    for fd in fds.split(','):
+        try:
+            os.close(int(fd))
+        except OSError:
+            pass
+
+
+def read_fd(fd):
+    f = os.fdopen(fd, 'r')
+    try:
+        return f.read()
+    finally:
+        f.close()
+
+
+class HandoffError(Exception):
+
+    def __init__(self, value):
+        self.value = value
+
+    def __str__(self):
+        return repr(self.value)
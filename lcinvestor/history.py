@@ -0,0 +1,294 @@
+#!/usr/bin/env python
+
+#
+# Records every investment cycle, and reports on them
+#
+
+"""
+The MIT License (MIT)
+
+Copyright (c) 2013 Jeremy Gillick
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+import json
+import math
+import sqlite3
+import threading
+
+DAY = 86400
+
+# Latencies are counted in buckets that each cover 10% more time than the last, starting at 1ms,
+# so percentiles come from a few hundred counters instead of every cycle
+BUCKET_MIN = 0.001
+BUCKET_GROWTH = 1.1
+
+# How each cycle ended
+OUTCOMES = ['invested', 'no_match', 'unchanged', 'low_cash', 'staged', 'blocked', 'site_down', 'error', 'skipped', 'stopped']
+
+SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS cycles (
+        id INTEGER PRIMARY KEY,
+        account TEXT NOT NULL,
+        started REAL NOT NULL,
+        latency REAL,
+        outcome TEXT NOT NULL,
+        phase TEXT,
+        error TEXT,
+        cash REAL,
+        invested REAL,
+        remaining REAL,
+        attempts INTEGER,
+        cached INTEGER,
+        phases TEXT
+    )""",
+    'CREATE INDEX IF NOT EXISTS cycles_account_started ON cycles (account, started)',
+
+    # Daily totals for each account (cycles, outcome:*, attempts:*, idle_seconds, ...)
+    """CREATE TABLE IF NOT EXISTS daily (
+        account TEXT NOT NULL,
+        day INTEGER NOT NULL,
+        name TEXT NOT NULL,
+        value REAL NOT NULL,
+        PRIMARY KEY (account, day, name)
+    )""",
+
+    # Daily latency histograms for each phase
+    """CREATE TABLE IF NOT EXISTS latency (
+        account TEXT NOT NULL,
+        day INTEGER NOT NULL,
+        phase TEXT NOT NULL,
+        bucket INTEGER NOT NULL,
+        count INTEGER NOT NULL,
+        PRIMARY KEY (account, day, phase, bucket)
+    )"""
+]
+
+
+def get_bucket(seconds):
+    """
+    Return the latency bucket for a number of seconds
+    """
+    if seconds <= BUCKET_MIN:
+        return 0
+    return int(math.ceil(math.log(seconds / BUCKET_MIN, BUCKET_GROWTH)))
+
+
+def get_bucket_seconds(bucket):
+    """
+    Return the most seconds a latency bucket holds
+    """
+    return BUCKET_MIN * (BUCKET_GROWTH ** bucket)
+
+
+def get_percentile(histogram, percent):
+    """
+    Return the seconds at a percentile of a {bucket: count} histogram
+    """
+    total = sum(histogram.values())
+    if total == 0:
+        return None
+
+    needed = total * (percent / 100.0)
+    seen = 0
+    for bucket in sorted(histogram.keys()):
+        seen += histogram[bucket]
+        if seen >= needed:
+            return get_bucket_seconds(bucket)
+    return get_bucket_seconds(max(histogram.keys()))
+
+
+class CycleHistory:
+    """
+    A SQLite database of every investment cycle.
+
+    Each cycle is saved as a row, and also added to daily totals and latency histograms,
+    so reports over months of cycles only read a few rows per day.
+    """
+
+    def __init__(self, file_path):
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(file_path, timeout=10, check_same_thread=False)
+        for statement in SCHEMA:
+            self.db.execute(statement)
+        self.db.commit()
+
+    def close(self):
+        self.db.close()
+
+    def record_cycle(self, account, started, latency, outcome, cash=None, invested=0, attempts=0, cached=0, phase=None, error=None, phases=None):
+        """
+        Save a cycle.
+
+        cash     -- The cash available to invest when the cycle started (None if it wasn't checked)
+        invested -- The cash that was invested
+        attempts -- The portfolio searches it took (including ones answered from the cache)
+        cached   -- How many of those searches were answered from the cache
+        phase    -- The phase that failed, and the error it failed with
+        phases   -- The seconds each phase took, i.e. {'auth': 1.2, 'search': 5.3}
+        """
+        phases = phases or {}
+        day = int(started // DAY)
+
+        self.lock.acquire()
+        try:
+            # The cash left after the last cycle sat idle until this one
+            last = self.db.execute('SELECT started, remaining FROM cycles WHERE account = ? ORDER BY started DESC LIMIT 1', (account,)).fetchone()
+            idle_seconds = 0.0
+            idle_cash_seconds = 0.0
+            remaining = None
+            if last is not None and last[1] is not None:
+                elapsed = max(0.0, started - last[0])
+                idle_cash_seconds = last[1] * elapsed
+                if last[1] >= 25:
+                    idle_seconds = elapsed
+                remaining = last[1]
+            if cash is not None:
+                remaining = max(0.0, cash - invested)
+
+            self.db.execute('INSERT INTO cycles (account, started, latency, outcome, phase, error, cash, invested, remaining, attempts, cached, phases) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (account, started, latency, outcome, phase, error, cash, invested, remaining, attempts, cached, json.dumps(phases)))
+
+            totals = {
+                'cycles': 1,
+                'outcome:{0}'.format(outcome): 1,
+                'invested': invested or 0,
+                'idle_seconds': idle_seconds,
+                'idle_cash_seconds': idle_cash_seconds,
+                'searches': attempts - cached,
+                'cached_searches': cached
+            }
+            if outcome == 'invested':
+                totals['attempts:{0}'.format(attempts)] = 1
+            if error is not None:
+                totals['failed:{0}'.format(phase)] = 1
+            for name, value in totals.iteritems():
+                self.add(self.db, 'daily', (account, day, name), 'value', value)
+
+            phases['cycle'] = latency
+            for name, seconds in phases.iteritems():
+                if seconds is not None:
+                    self.add(self.db, 'latency', (account, day, name, get_bucket(seconds)), 'count', 1)
+
+            self.db.commit()
+        finally:
+            self.lock.release()
+
+    def add(self, db, table, key, column, value):
+        """
+        Add value to a counter row, creating it if it doesn't exist
+        """
+        key_columns = {'daily': ['account', 'day', 'name'], 'latency': ['account', 'day', 'phase', 'bucket']}[table]
+        where = ' AND '.join(['{0} = ?'.format(c) for c in key_columns])
+        updated = db.execute('UPDATE {0} SET {1} = {1} + ? WHERE {2}'.format(table, column, where), (value,) + key)
+        if updated.rowcount == 0:
+            db.execute('INSERT INTO {0} ({1}, {2}) VALUES ({3})'.format(table, ', '.join(key_columns), column, ', '.join(['?'] * (len(key) + 1))), key + (value,))
+
+    def get_stats(self, since=None, account=None):
+        """
+        Return a dict of stats for the cycles since a timestamp (or all of them), for every account
+        or just one: totals for each account, and latency percentiles for each phase.
+        """
+        day = int(since // DAY) if since is not None else 0
+        where = 'day >= ?'
+        args = [day]
+        if account is not None:
+            where += ' AND account = ?'
+            args.append(account)
+
+        self.lock.acquire()
+        try:
+            daily = self.db.execute('SELECT account, name, SUM(value) FROM daily WHERE {0} GROUP BY account, name'.format(where), args).fetchall()
+            latency = self.db.execute('SELECT phase, bucket, SUM(count) FROM latency WHERE {0} GROUP BY phase, bucket'.format(where), args).fetchall()
+
+            accounts = {}
+            for name, key, value in daily:
+                accounts.setdefault(name, {})[key] = value
+
+            # When the first and last cycles started
+            for name, totals in accounts.iteritems():
+                totals['first'], totals['last'] = self.db.execute('SELECT MIN(started), MAX(started) FROM cycles WHERE account = ? AND started >= ?', (name, day * DAY)).fetchone()
+        finally:
+            self.lock.release()
+
+        histograms = {}
+        for phase, bucket, count in latency:
+            histograms.setdefault(phase, {})[bucket] = count
+
+        phases = {}
+        for phase, histogram in histograms.iteritems():
+            phases[phase] = {
+                'count': sum(histogram.values()),
+                'p50': get_percentile(histogram, 50),
+                'p95': get_percentile(histogram, 95),
+                'p99': get_percentile(histogram, 99)
+            }
+
+        return {'accounts': accounts, 'phases': phases}
+
+
+def get_report(stats):
+    """
+    Return the stats as a printable report
+    """
+    if len(stats['accounts']) == 0:
+        return 'No investment cycles have been recorded yet'
+
+    lines = []
+    for account in sorted(stats['accounts'].keys()):
+        totals = stats['accounts'][account]
+        span = max(totals['last'] - totals['first'], 1)
+        days = span / float(DAY)
+        cycles = int(totals.get('cycles', 0))
+        invested_cycles = int(totals.get('outcome:invested', 0))
+
+        lines.append('{0}: {1} cycles over {2:.1f} days, ${3:,.2f} invested in {4} of them'.format(account, cycles, days, totals.get('invested', 0), invested_cycles))
+
+        # Cash drag
+        idle_hours = totals.get('idle_seconds', 0) / 3600.0
+        lines.append('  Idle cash: ${0:,.2f} on average, $25 or more sat idle for {1:,.1f} hours ({2:.0f}% of the time)'.format(
+            totals.get('idle_cash_seconds', 0) / span, idle_hours, (totals.get('idle_seconds', 0) * 100.0) / span))
+
+        # Searches it took to invest
+        if invested_cycles > 0:
+            attempts = sorted([(int(k.split(':')[1]), int(v)) for k, v in totals.iteritems() if k.startswith('attempts:')])
+            average = sum([a * c for a, c in attempts]) / float(invested_cycles)
+            spread = ', '.join(['{0} search{1}: {2}'.format(a, '' if a == 1 else 'es', c) for a, c in attempts])
+            lines.append('  Searches to invest: {0:.1f} on average ({1})'.format(average, spread))
+        searches = int(totals.get('searches', 0))
+        cached = int(totals.get('cached_searches', 0))
+        lines.append('  Portfolio searches: {0} sent, {1} answered from the cache'.format(searches, cached))
+
+        # How the cycles ended
+        outcomes = ['{0} {1}'.format(int(totals['outcome:' + o]), o.replace('_', ' ')) for o in OUTCOMES if totals.get('outcome:' + o)]
+        lines.append('  Outcomes: {0}'.format(', '.join(outcomes)))
+        failed = sorted([(k.split(':', 1)[1], int(v)) for k, v in totals.iteritems() if k.startswith('failed:')])
+        if failed:
+            lines.append('  Failures by phase: {0}'.format(', '.join(['{0} {1}'.format(c, p) for p, c in failed])))
+        lines.append('')
+
+    # Phase latencies
+    lines.append('Latency (seconds)    p50      p95      p99   cycles')
+    order = ['cycle', 'site', 'auth', 'balance', 'search', 'order']
+    for phase in sorted(stats['phases'].keys(), key=lambda p: order.index(p) if p in order else len(order)):
+        latency = stats['phases'][phase]
+        lines.append('  {0:<12} {1:>8.2f} {2:>8.2f} {3:>8.2f} {4:>8}'.format(phase, latency['p50'], latency['p95'], latency['p99'], latency['count']))
+
+    return '\n'.join(lines)
@@ -0,0 +1,243 @@
+#!/usr/bin/env python
+
+#
+# A local inventory of the loans listed on LendingClub, kept in columns
+#
+
+"""
+The MIT License (MIT)
+
+Copyright (c) 2013 Jeremy Gillick
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+from array import array
+from lendingclub.filters import Filter, FilterValidationError
+from lcinvestor.portfolio import grade_to_code, code_to_grade
+from lcinvestor.settings import CompiledFilter
+
+
+class LoanInventory(object):
+    """
+    The listed loans, one row per loan, in parallel arrays (columns).
+
+    sync() applies a new listing as a diff: only loans that are new, have changed
+    funding or are gone touch the columns. Filters and portfolio builders read the
+    columns directly, by row number. Removing a loan moves the last row into its
+    place, so row numbers are only good until the next update.
+    """
+
+    __slots__ = ['loan_ids', 'grades', 'rates', 'terms', 'requested', 'unfunded', 'invested', 'purposes',
+                 'index', 'version', 'added', 'changed', 'removed']
+
+    def __init__(self):
+        self.loan_ids = array('l')
+        self.grades = array('B')     # See portfolio.grade_to_code
+        self.rates = array('d')
+        self.terms = array('B')      # Months
+        self.requested = array('d')
+        self.unfunded = array('d')
+        self.invested = array('B')   # 1 if you've already invested in this loan
+        self.purposes = []
+
+        self.index = {}  # Loan ID to row
+        self.version = 0  # Goes up each time new loans are added
+
+        # Totals of the updates applied
+        self.added = 0
+        self.changed = 0
+        self.removed = 0
+
+    @classmethod
+    def from_loans(cls, loans):
+        """
+        Create an inventory from a list of loans, in the format of LendingClub.search() results
+        """
+        inventory = cls()
+        inventory.sync(loans)
+        return inventory
+
+    def to_dict(self):
+        return {'loans': self.loans(), 'version': self.version}
+
+    @classmethod
+    def from_dict(cls, saved):
+        inventory = cls.from_loans(saved['loans'])
+        inventory.version = saved['version']
+        return inventory
+
+    def __len__(self):
+        return len(self.loan_ids)
+
+    def __contains__(self, loan_id):
+        return loan_id in self.index
+
+    def sync(self, loans, complete=True):
+        """
+        Apply the latest listing, a list of loans in the format of LendingClub.search() results.
+        If complete is True, loans that aren't in the list have been funded and are removed.
+        Returns the number of loans (added, changed, removed).
+        """
+        added = []
+        changed = []
+        seen = set()
+        for loan in loans:
+            loan_id = loan['loan_id']
+            seen.add(loan_id)
+            row = self.index.get(loan_id)
+            if row is None:
+                added.append(loan)
+            elif self.unfunded[row] != float(loan['loanUnfundedAmount']) or self.invested[row] != bool(loan.get('alreadyInvestedIn')):
+                changed.append(loan)
+
+        removed = []
+        if complete:
+            removed = [loan_id for loan_id in self.index if loan_id not in seen]
+
+        self.apply(added, changed, removed)
+        return (len(added), len(changed), len(removed))
+
+    def apply(self, added=None, changed=None, removed=None):
+        """
+        Apply a diff: new loans, loans with new funding and the IDs of loans that are gone.
+        LendingClub sends some numbers as strings (the rate is '20.31'), so they're converted here.
+        """
+        for loan_id in removed or []:
+            self.remove(loan_id)
+
+        for loan in changed or []:
+            row = self.index.get(loan['loan_id'])
+            if row is not None:
+                self.unfunded[row] = float(loan['loanUnfundedAmount'])
+                self.invested[row] = bool(loan.get('alreadyInvestedIn'))
+                self.changed += 1
+
+        for loan in added or []:
+            if loan['loan_id'] in self.index:
+                continue
+            self.index[loan['loan_id']] = len(self.loan_ids)
+            self.loan_ids.append(loan['loan_id'])
+            self.grades.append(grade_to_code(loan.get('loanGrade')))
+            self.rates.append(float(loan['loanRate']))
+            self.terms.append(int(loan.get('loanLength', 36)))
+            self.requested.append(float(loan['loanAmountRequested']))
+            self.unfunded.append(float(loan['loanUnfundedAmount']))
+            self.invested.append(bool(loan.get('alreadyInvestedIn')))
+            self.purposes.append(loan.get('purpose', False))
+            self.added += 1
+
+        if added:
+            self.version += 1
+
+    def remove(self, loan_id):
+        """
+        Remove a loan, moving the last row into its place
+        """
+        row = self.index.pop(loan_id, None)
+        if row is None:
+            return
+
+        last = len(self.loan_ids) - 1
+        if row != last:
+            for column in [self.loan_ids, self.grades, self.rates, self.terms, self.requested, self.unfunded, self.invested, self.purposes]:
+                column[row] = column[last]
+            self.index[self.loan_ids[row]] = row
+
+        for column in [self.loan_ids, self.grades, self.rates, self.terms, self.requested, self.unfunded, self.invested, self.purposes]:
+            column.pop()
+        self.removed += 1
+
+    def get_progress(self, row):
+        """
+        The percent of the loan that has been funded
+        """
+        return (1 - (self.unfunded[row] / self.requested[row])) * 100
+
+    def get_loan(self, row):
+        """
+        Return a row as a dict, in the format of LendingClub.search() results
+        """
+        return {
+            'loan_id': self.loan_ids[row],
+            'loanGUID': self.loan_ids[row],
+            'loanGrade': code_to_grade(self.grades[row]),
+            'loanRate': self.rates[row],
+            'loanLength': self.terms[row],
+            'loanAmountRequested': self.requested[row],
+            'loanUnfundedAmount': self.unfunded[row],
+            'alreadyInvestedIn': bool(self.invested[row]),
+            'purpose': self.purposes[row]
+        }
+
+    def loans(self):
+        """
+        Return all the loans as dicts, in the format of LendingClub.search() results
+        """
+        return [self.get_loan(row) for row in xrange(len(self.loan_ids))]
+
+    def select(self, filters=None, min_unfunded=0):
+        """
+        Return the rows of the loans that pass the filters and have at least min_unfunded left to fund.
+        The filter criteria are checked against the columns, like Filter.validate_one() checks a loan dict.
+        """
+        rows = [row for row in xrange(len(self.loan_ids)) if self.unfunded[row] >= min_unfunded]
+        if not filters:
+            return rows
+
+        # Other kinds of filters (i.e. saved filters) get the loan as a dict
+        if type(filters) not in [Filter, CompiledFilter]:
+            return [row for row in rows if self.validate_loan(filters, row)]
+
+        if filters.get('loan_id'):
+            loan_ids = set(str(filters['loan_id']).split(','))
+            rows = [row for row in rows if str(self.loan_ids[row]) in loan_ids]
+
+        grades = filters.get('grades')
+        if grades and grades.get('All') is not True:
+            codes = [grade_to_code(grade + '1') for grade in 'ABCDEFG' if grades.get(grade)]
+            rows = [row for row in rows if self.grades[row] - (self.grades[row] % 5) in codes]
+
+        term = filters.get('term')
+        if term is not None:
+            if term.get('Year3') is False:
+                rows = [row for row in rows if self.terms[row] != 36]
+            if term.get('Year5') is False:
+                rows = [row for row in rows if self.terms[row] != 60]
+
+        if filters.get('funding_progress'):
+            rows = [row for row in rows if self.get_progress(row) >= filters['funding_progress']]
+
+        if filters.get('exclude_existing') is True:
+            rows = [row for row in rows if not self.invested[row]]
+
+        purpose = filters.get('loan_purpose')
+        if purpose:
+            if type(purpose) is not dict:
+                purpose = {purpose: True}
+            if purpose.get('All') is not True:
+                rows = [row for row in rows if self.purposes[row] is False or self.purposes[row] in purpose]
+
+        return rows
+
+    def validate_loan(self, filters, row):
+        try:
+            return filters.validate_one(self.get_loan(row))
+        except FilterValidationError:
+            return False
@@ -0,0 +1,201 @@
+#!/usr/bin/env python
+
+#
+# A journal of the orders sent to LendingClub, so an order is never sent twice
+#
+
+"""
+The MIT License (MIT)
+
+Copyright (c) 2013 Jeremy Gillick
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+
+import os
+import json
+import time
+import uuid
+import threading
+
+# The states of an order in the journal
+PENDING = 'pending'        # Written before the order is sent. It's unknown if it went through until it's settled.
+PLACED = 'placed'          # LendingClub took the order
+NOT_PLACED = 'not_placed'  # The account's orders show it didn't go through
+
+
+def find_order(record, notes):
+    """
+    Return the ID of the order a journal record went through as, from the account's notes
+    (LendingClub.my_notes() results), or None if none of them are from it.
+
+    A note is from the order if it's in one of the order's loans and it came from an order placed
+    after the last one the journal knew of when the record was written. Without an earlier order to
+    go on, any note in the order's loans counts, so an order is never sent twice.
+    """
+    loan_ids = set(record['loan_ids'])
+    for note in notes:
+        if note['loanId'] in loan_ids and note['orderId'] > record['after_order_id']:
+            return note['orderId']
+    return None
+
+
+class OrderJournal:
+    """
+    Every order sent to LendingClub, written to a file before it's sent and settled once its outcome is known.
+
+    If the call to place an order fails or times out, or the process dies before it returns, the order may
+    or may not have gone through. Its record stays pending, and is checked against the account's recent
+    orders before any order is sent again.
+    """
+
+    max_settled = 50  # Settled records to keep, as a log
+
+    def __init__(self, file_path=None, clock=time.time):
+        """
+        file_path -- Where to keep the journal, or None to only keep it in memory (i.e. for simulations)
+        """
+        self.file_path = file_path
+        self.clock = clock
+        self.records = []  # Oldest first
+        self.in_flight = set()  # IDs of the records whose call to LendingClub hasn't returned yet
+        self.changed = threading.Condition()
+
+        if file_path is not None and os.path.exists(file_path):
+            f = open(file_path, 'r')
+            self.records = json.loads(f.read())
+            f.close()
+
+    def start(self, cash, portfolio, portfolio_name=None):
+        """
+        Write a pending record for an order of the portfolio, before it's sent, and return it
+        """
+        record = {
+            'id': uuid.uuid4().hex,
+            'created': self.clock(),
+            'state': PENDING,
+            'cash': cash,
+            'portfolio_name': portfolio_name,
+            'loan_ids': list(portfolio.loan_ids),
+            'invested': portfolio.get_invested(),
+            'portfolio': portfolio.dump(),
+            'after_order_id': self.get_last_order_id(),
+            'order_id': None,
+            'attempts': 0
+        }
+        self.changed.acquire()
+        try:
+            self.records.append(record)
+            self.save()
+        finally:
+            self.changed.release()
+        return record
+
+    def run(self, record, fn, *args, **kwargs):
+        """
+        Send the record's order with fn, which returns the order ID, and settle the record when it returns.
+        Run this on the thread that makes the call, so a call that's given up on still settles its record.
+        """
+        self.changed.acquire()
+        self.in_flight.add(record['id'])
+        record['attempts'] += 1
+        self.changed.release()
+
+        try:
+            order_id = fn(*args, **kwargs)
+            self.settle(record, order_id)
+            return order_id
+        finally:
+            self.changed.acquire()
+            self.in_flight.discard(record['id'])
+            self.changed.notify_all()
+            self.changed.release()
+
+    def settle(self, record, order_id=None):
+        """
+        Record that the order went through as order_id, or didn't go through if order_id is None
+        """
+        self.changed.acquire()
+        try:
+            record['state'] = PLACED if order_id else NOT_PLACED
+            record['order_id'] = order_id or None
+            record['settled'] = self.clock()
+            self.save()
+        finally:
+            self.changed.release()
+
+    def is_in_flight(self, record):
+        return record['id'] in self.in_flight
+
+    def wait(self, record, timeout):
+        """
+        Wait up to timeout seconds for the record's call to LendingClub to return.
+        Returns False if it's still waiting.
+        """
+        deadline = time.time() + max(timeout, 0)
+        self.changed.acquire()
+        try:
+            while self.is_in_flight(record) and time.time() < deadline:
+                self.changed.wait(deadline - time.time())
+            return not self.is_in_flight(record)
+        finally:
+            self.changed.release()
+
+    def get_pending(self):
+        """
+        The records whose orders may or may not have gone through, oldest first
+        """
+        return [record for record in self.records if record['state'] == PENDING]
+
+    def get_last_order_id(self):
+        order_ids = [record['order_id'] for record in self.records if record['state'] == PLACED]
+        return max(order_ids) if order_ids else 0
+
+    def save(self):
+        """
+        Write the journal to its file, dropping the oldest settled records past max_settled.
+        It's on disk, in full, before this returns.
+        """
+        settled = [record for record in self.records if record['state'] != PENDING]
+        for record in settled[:-self.max_settled]:
+            self.records.remove(record)
+
+        if self.file_path is None:
+            return
+
+        temp_path = self.file_path + '.tmp'
+        f = open(temp_path, 'w')
+        try:
+            f.write(json.dumps(self.records))
+            f.flush()
+            os.fsync(f.fileno())
+        finally:
+            f.close()
+        os.rename(temp_path, self.file_path)
+
+    def status(self):
+        """
+        Return a dict describing the journal, for monitoring
+        """
+        return {
+            'pending': len(self.get_pending()),
+            'in_flight': len(self.in_flight),
+            'last_order_id': self.get_last_order_id()
+        }
@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+
+#
+# Learns which amounts of cash find portfolios, to search with those first
+#
+
+"""
+The MIT License (MIT)
+
+Copyright (c) 2013 Jeremy Gillick
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+import json
+import hashlib
+from lcinvestor import util
+from lcinvestor.cache import get_listing_fingerprint
+
+
+def get_settings_key(settings):
+    """
+    A short hash of the investment settings that decide which amounts find a portfolio.
+    Statistics gathered under other settings don't apply.
+    """
+    values = [settings['max_per_note'], settings['min_percent'], settings['max_percent'], settings['filter_id']]
+    filters = settings['filters'] if not settings['filter_id'] else None
+    return hashlib.md5(json.dumps([values, filters], sort_keys=True, default=str)).hexdigest()[:12]
+
+
+class SearchStats:
+    """
+    The amounts of cash recently searched for a portfolio, and whether one was found.
+
+    A portfolio found for an amount suggests smaller amounts would work too, and no portfolio
+    for an amount suggests larger amounts wouldn't. From that, each amount on the ladder gets
+    a chance of finding a portfolio, and the ladder is reordered to search the most cash
+    that is likely to work first.
+    """
+
+    max_outcomes = 50  # Only the most recent searches are kept, since the listings change
+
+    def __init__(self, key=None, outcomes=None, listing=None, last_failure=None):
+        self.key = key
+        self.outcomes = outcomes or []  # [amount, found] pairs, oldest first
+        self.listing = listing  # [version, loan IDs] of the loans that match these settings
+        self.last_failure = last_failure  # [listing version, cash] of the last cycle that found nothing
+
+    def record(self, amount, found):
+        self.outcomes.append([amount, bool(found)])
+        if len(self.outcomes) > self.max_outcomes:
+            del self.outcomes[:-self.max_outcomes]
+
+    def update_listing(self, loan_ids):
+        """
+        Record the loans that match these settings now, and return the listing version.
+        The version changes when loans show up, are funded or are removed.
+        """
+        if self.listing is None or sorted(loan_ids) != self.listing[1]:
+            self.listing = [get_listing_fingerprint(loan_ids), sorted(loan_ids)]
+        return self.listing[0]
+
+    def get_chance(self, amount):
+        """
+        The chance (0 - 1) that searching for this amount finds a portfolio.
+        0.5 when there's nothing to go on.
+        """
+        found = len([a for a, f in self.outcomes if f and a >= amount])
+        missed = len([a for a, f in self.outcomes if not f and a <= amount])
+        return (found + 1.0) / (found + missed + 2.0)
+
+    def get_ladder(self, cash, min_cash, max_steps=10):
+        """
+        Return the amounts to search for a portfolio with, in order. Amounts that are
+        more likely than not to find one come first, most cash first, then the rest
+        from most to least likely. With no history, this is the usual cash ladder.
+        """
+        amounts = list(util.cash_ladder(cash, min_cash, max_steps))
+        if len(self.outcomes) == 0:
+            return amounts
+
+        # Amounts that have found portfolios are worth trying as they are
+        for amount, found in self.outcomes:
+            if found and min_cash <= amount <= cash and amount not in amounts:
+                amounts.append(amount)
+
+        chances = dict([(amount, self.get_chance(amount)) for amount in amounts])
+        likely = sorted([a for a in amounts if chances[a] > 0.5], reverse=True)
+        unlikely = sorted([a for a in amounts if chances[a] <= 0.5], key=lambda a: (chances[a], a), reverse=True)
+        return (likely + unlikely)[:max_steps]
+
+    def to_dict(self):
+        return {'key': self.key, 'outcomes': self.outcomes, 'listing': self.listing, 'last_failure': self.last_failure}
+
+    @classmethod
+    def from_dict(cls, saved):
+        return cls(saved.get('key'), saved.get('outcomes'), saved.get('listing'), saved.get('last_failure'))
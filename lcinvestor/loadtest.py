@@ -0,0 +1,800 @@
+#!/usr/bin/env python
+
+#
+# Load tests a fleet of simulated accounts against a local stub of the LendingClub site
+#
+
+"""
+The MIT License (MIT)
+
+Copyright (c) 2013 Jeremy Gillick
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+
+import os
+import re
+import copy
+import json
+import time
+import yaml
+import random
+import shutil
+import urllib2
+import urlparse
+import tempfile
+import threading
+import SocketServer
+import BaseHTTPServer
+import multiprocessing
+from lendingclub.filters import Filter
+from lcinvestor import market
+from lcinvestor import AutoInvestor
+from lcinvestor.clock import Clock
+from lcinvestor.history import CycleHistory, get_bucket, get_percentile
+from lcinvestor.memory import get_rss
+from lcinvestor.simulation import SyntheticMarket, default_market
+from lcinvestor.supervisor import Supervisor, use_account_files
+
+# The investment settings each account is given one of
+PROFILES = {
+    'conservative': {'min_cash': 500, 'min_percent': 6, 'max_percent': 10, 'max_per_note': 25, 'grades': 'AB'},
+    'balanced': {'min_cash': 250, 'min_percent': 10, 'max_percent': 15, 'max_per_note': 25, 'grades': None},
+    'aggressive': {'min_cash': 100, 'min_percent': 15, 'max_percent': 22, 'max_per_note': 50, 'grades': 'CDEF'}
+}
+
+# How cash comes into each account: a starting balance, and a deposit every this many cycles
+PATTERNS = {
+    'idle': {'cash': 0, 'deposit': 0, 'every': None},
+    'trickle': {'cash': 0, 'deposit': 25, 'every': 1},
+    'payday': {'cash': 0, 'deposit': 1000, 'every': 10},
+    'lump': {'cash': 5000, 'deposit': 0, 'every': None}
+}
+
+PASSWORD = 'loadtest'
+
+# The most portfolio options the stub offers for one search (the stops on the site's slider)
+MAX_OPTIONS = 40
+
+# Names for the stub's pages, in the report
+ENDPOINTS = {
+    '/': 'site',
+    '/account/login.action': 'login',
+    '/browse/cashBalanceAj.action': 'cash',
+    '/browse/browseNotesAj.action': 'search',
+    '/data/portfolioManagement': 'portfolios',
+    '/portfolio/confirmStartNewPortfolio.action': 'clear order',
+    '/portfolio/lendingMatchOptionsV2.action': 'portfolio options',
+    '/portfolio/recommendPortfolio.action': 'pick portfolio',
+    '/data/portfolio': 'portfolio',
+    '/portfolio/placeOrder.action': 'place order',
+    '/portfolio/orderConfirmed.action': 'confirm order',
+    '/account/loansAj.action': 'notes'
+}
+
+
+def get_cpu_seconds(pid=None):
+    """
+    Return the CPU time (user and system) this process, or another one by pid, has used, in seconds.
+    None if it can't be read.
+    """
+    if pid is None or pid == os.getpid():
+        times = os.times()
+        return times[0] + times[1]
+    try:
+        f = open('/proc/{0}/stat'.format(pid), 'r')
+        fields = f.read().rsplit(')', 1)[1].split()
+        f.close()
+        return (int(fields[11]) + int(fields[12])) / float(os.sysconf('SC_CLK_TCK'))
+    except (IOError, OSError, ValueError, IndexError):
+        return None
+
+
+def encode_loan(loan):
+    """
+    Send a loan's numbers the way LendingClub does: the rate as a string, like '20.31', and the amounts in whole dollars
+    """
+    loan['loanRate'] = '{0:.2f}'.format(loan['loanRate'])
+    loan['loanAmountRequested'] = int(loan['loanAmountRequested'])
+    loan['loanUnfundedAmount'] = int(loan['loanUnfundedAmount'])
+    return loan
+
+
+def get_filters(grades):
+    """
+    Return a Filter for loans of these grades (i.e. 'AB'), or any grade
+    """
+    if not grades:
+        return Filter()
+    selected = dict([(grade, grade in grades) for grade in 'ABCDEFG'])
+    selected['All'] = False
+    return Filter({'grades': selected})
+
+
+def parse_filter(search_string):
+    """
+    Return a Filter from the search string the site is sent (see Filter.search_string()), or None for 'default'.
+    Only the loan ID, grade and term criteria are read. Loans that have been invested in aren't excluded.
+    """
+    if not search_string or search_string == 'default':
+        return None
+
+    filters = Filter()
+    filters['exclude_existing'] = False
+    for criteria in json.loads(search_string):
+        values = [value.get('value') for value in (criteria.get('m_value') or [])]
+        if len(values) == 0:
+            continue
+        if criteria['m_id'] == 43:
+            filters['loan_id'] = values[0]
+        elif criteria['m_id'] == 10 and 'All' not in values:
+            filters['grades'] = dict([(grade, grade in values) for grade in 'ABCDEFG'])
+            filters['grades']['All'] = False
+        elif criteria['m_id'] == 39:
+            filters['term'] = {'Year3': 'Year3' in values, 'Year5': 'Year5' in values}
+    return filters
+
+
+class LatencyStats:
+    """
+    Latency histograms, by name, in the same buckets as the cycle history
+    """
+
+    def __init__(self):
+        self.histograms = {}
+        self.maximums = {}
+
+    def add(self, name, seconds):
+        histogram = self.histograms.setdefault(name, {})
+        bucket = get_bucket(seconds)
+        histogram[bucket] = histogram.get(bucket, 0) + 1
+        self.maximums[name] = max(self.maximums.get(name, 0), seconds)
+
+    def get(self, name):
+        """
+        Return the count, p50, p95, p99 and max seconds for a name, or None if nothing was added
+        """
+        histogram = self.histograms.get(name)
+        if not histogram:
+            return None
+        return {
+            'count': sum(histogram.values()),
+            'p50': get_percentile(histogram, 50),
+            'p95': get_percentile(histogram, 95),
+            'p99': get_percentile(histogram, 99),
+            'max': self.maximums[name]
+        }
+
+    def summary(self):
+        return dict([(name, self.get(name)) for name in self.histograms])
+
+
+class StubAccount:
+    """
+    An account on the stub site, with cash coming in by one of the PATTERNS
+    """
+
+    def __init__(self, email, pattern, period, offset=0):
+        self.email = email
+        self.pattern = PATTERNS[pattern]
+        self.period = period
+        self.offset = offset  # Seconds into the first deposit interval the account starts at
+        self.started = time.time()
+
+        self.invested = 0.0
+        self.portfolios = []
+        self.notes = []  # The most recent notes, newest first
+        self.session = None
+
+    def get_cash(self, now):
+        cash = self.pattern['cash']
+        if self.pattern['every']:
+            interval = self.pattern['every'] * self.period
+            cash += self.pattern['deposit'] * int((now - self.started + self.offset) / interval)
+        return cash - self.invested
+
+
+class StubLendingClub:
+    """
+    The pages of the LendingClub site that the investor uses, answering the same requests with the
+    same responses, for a set of accounts. The listed loans come from a synthetic market on the
+    wall clock, and every account invests in the same loans.
+    """
+
+    refresh_interval = 1  # Seconds between updates of the listed loans
+
+    routes = {
+        '/account/loansAj.action': 'get_notes',
+        '/browse/cashBalanceAj.action': 'get_cash_balance',
+        '/browse/browseNotesAj.action': 'search',
+        '/data/portfolioManagement': 'manage_portfolios',
+        '/portfolio/confirmStartNewPortfolio.action': 'clear_order',
+        '/portfolio/lendingMatchOptionsV2.action': 'get_portfolio_options',
+        '/portfolio/recommendPortfolio.action': 'pick_portfolio',
+        '/data/portfolio': 'stage_portfolio',
+        '/portfolio/placeOrder.action': 'place_order',
+        '/portfolio/orderConfirmed.action': 'confirm_order'
+    }
+
+    def __init__(self, accounts, market_config=None, latency=0):
+        self.accounts = dict([(account.email, account) for account in accounts])
+        self.market = SyntheticMarket(market_config, clock=Clock())
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.random = random.Random()
+
+        self.sessions = {}  # Session token to {'email', 'options', 'fractions', 'staged', 'token'}
+        self.next_order_id = 1
+        self.refreshed = 0
+        self.inventory = None
+        self.listings = {}
+        self.responses = {}  # Encoded search results, until the listing is refreshed
+
+        self.requests = LatencyStats()
+        self.counts = {'logins': 0, 'failed_logins': 0, 'orders': 0, 'failed_orders': 0, 'notes': 0, 'invested': 0.0, 'unfilled': 0.0}
+
+    def refresh(self):
+        """
+        Bring the listed loans up to date with the clock, at most every refresh_interval seconds
+        """
+        now = time.time()
+        if now - self.refreshed < self.refresh_interval:
+            return
+        self.refreshed = now
+        self.market.update()
+        self.inventory = self.market.get_inventory()
+        self.listings = dict([(listing['loan_id'], listing) for listing in self.market.listings])
+        self.responses = {}
+
+    def respond(self, method, path, params, token):
+        """
+        Return the (status, headers, body) response to a request
+        """
+        if self.latency:
+            time.sleep(self.latency)
+
+        self.lock.acquire()
+        try:
+            self.refresh()
+            if path == '/':
+                return (200, {}, '')
+            if path == '/loadtest/stats':
+                return self.json(self.get_stats())
+            if path == '/account/login.action':
+                return self.login(params)
+            if path not in self.routes:
+                return (404, {}, 'Not found')
+
+            # Everything else needs you to be logged in
+            session = self.sessions.get(token)
+            if session is None:
+                return (302, {'Location': '/account/login.action'}, '')
+            account = self.accounts[session['email']]
+            return getattr(self, self.routes[path])(session, account, params)
+        finally:
+            self.lock.release()
+
+    def record(self, path, seconds):
+        self.lock.acquire()
+        try:
+            self.requests.add(ENDPOINTS.get(path, path), seconds)
+        finally:
+            self.lock.release()
+
+    def json(self, data):
+        return (200, {'Content-Type': 'application/json'}, json.dumps(data))
+
+    def login(self, params):
+        account = self.accounts.get(params.get('login_email'))
+        if account is None or params.get('login_password') != PASSWORD:
+            self.counts['failed_logins'] += 1
+            return (200, {}, '<html><body><div id="master_error-list">Email or password is invalid</div></body></html>')
+
+        # One session per account, like logging in again on the site
+        self.sessions.pop(account.session, None)
+        account.session = '{0:x}'.format(self.random.getrandbits(64))
+        self.sessions[account.session] = {'email': account.email, 'options': [], 'fractions': [], 'staged': {}, 'token': None}
+        self.counts['logins'] += 1
+        return (302, {'Location': '/account/summary.action', 'Set-Cookie': 'JSESSIONID={0}; Path=/'.format(account.session)}, '')
+
+    def get_notes(self, session, account, params):
+        """
+        The account's notes, newest order first. Only the first page is kept.
+        """
+        start = int(params.get('startindex', 0))
+        notes = account.notes[start:start + int(params.get('pagesize', 100))]
+        return self.json({'result': 'success', 'searchresult': {'loans': notes, 'totalRecords': len(account.notes)}})
+
+    def get_cash_balance(self, session, account, params):
+        return self.json({'result': 'success', 'cashBalance': '${0:,.2f}'.format(account.get_cash(time.time()))})
+
+    def manage_portfolios(self, session, account, params):
+        method = params.get('method')
+        if method == 'getLCPortfolios':
+            return self.json({'result': 'success', 'results': [{'portfolioName': name} for name in account.portfolios]})
+        elif method in ['createLCPortfolio', 'addToLCPortfolio']:
+            name = params.get('lcportfolio_name')
+            if name not in account.portfolios:
+                account.portfolios.append(name)
+            return self.json({'result': 'success', 'portfolioName': name})
+        return self.json({'result': 'error'})
+
+    def search(self, session, account, params):
+        key = (params.get('filter'), params.get('startindex'), params.get('pagesize'))
+        if key not in self.responses:
+            start = int(params.get('startindex') or 0)
+            limit = int(params.get('pagesize') or 100)
+            loans = [encode_loan(self.inventory.get_loan(row)) for row in self.inventory.select(parse_filter(params.get('filter')))]
+            for loan in loans:
+                loan['loanGUID'] = str(loan.pop('loan_id'))  # The client adds loan_id back
+                loan['alreadyInvestedIn'] = False
+            self.responses[key] = self.json({'result': 'success', 'searchresult': {'totalRecords': len(loans), 'loans': loans[start:start + limit]}})
+        return self.responses[key]
+
+    def clear_order(self, session, account, params):
+        session['fractions'] = []
+        session['staged'] = {}
+        return (200, {}, '')
+
+    def get_portfolio_options(self, session, account, params):
+        """
+        The portfolio options for an amount of cash, lowest rate first, like market.build_portfolio() finds them
+        """
+        cash = int(float(params.get('amount') or 0))
+        max_per_note = int(float(params.get('max_per_note') or 25))
+        per_note = max_per_note - (max_per_note % 25)
+        session['options'] = []
+
+        candidates = market.get_candidates(self.inventory, parse_filter(params.get('filter')))
+        note_count = market.get_note_count(cash, per_note)
+        if cash >= 25 and per_note >= 25 and len(candidates) >= note_count:
+            averages = list(market.iter_averages([self.inventory.rates[row] for row in candidates], note_count))
+            step = max(1, len(averages) / MAX_OPTIONS)
+            for i, average in averages[::step]:
+                window = [self.inventory.loan_ids[row] for row in candidates[i:i + note_count]]
+                session['options'].append({'percentage': round(average, 2), 'window': window, 'units': cash / 25, 'per_note': per_note})
+
+        options = [{'percentage': option['percentage'], 'numberOfLoans': note_count} for option in session['options']]
+        return self.json({'result': 'success', 'lmOptions': options, 'numberTicks': len(options)})
+
+    def pick_portfolio(self, session, account, params):
+        session['fractions'] = []
+        point = int(params.get('lending_match_point') or 0)
+        if 0 <= point < len(session['options']):
+            option = session['options'][point]
+            rows = [self.inventory.index[loan_id] for loan_id in option['window'] if loan_id in self.inventory.index]
+            if len(rows) == len(option['window']):
+                portfolio = market.fill_portfolio(self.inventory, rows, option['units'], option['per_note'])
+                if portfolio:
+                    session['fractions'] = portfolio['loan_fractions']
+                    for fraction, row in zip(session['fractions'], rows):
+                        loan = self.inventory.get_loan(row)
+                        for key in ['loanAmountRequested', 'loanUnfundedAmount', 'purpose']:
+                            fraction[key] = loan[key]
+                        fraction['alreadyInvestedIn'] = False
+
+                        # Fractions only have loan_id, and the client sets invest_amount itself
+                        del fraction['loanGUID']
+                        del fraction['invest_amount']
+                        encode_loan(fraction)
+                    session['staged'] = dict([(loan['loan_id'], loan['loanFractionAmount']) for loan in session['fractions']])
+        return (200, {}, '')
+
+    def stage_portfolio(self, session, account, params):
+        method = params.get('method')
+        if method == 'getPortfolio':
+            return self.json({'result': 'success', 'loanFractions': session['fractions']})
+        elif method == 'addToPortfolio':
+            session['staged'][int(params['loan_id'])] = float(params['loan_amount'])
+            return self.json({'result': 'success'})
+        elif method == 'addToPortfolioNew':
+            return self.json({'result': 'success', 'message': '{0} loans added to your order'.format(len(session['staged']))})
+        return self.json({'result': 'error'})
+
+    def place_order(self, session, account, params):
+        session['token'] = '{0:x}'.format(self.random.getrandbits(64))
+        return (200, {}, '<html><body><form><input type="hidden" name="struts.token.name" value="token" />'
+            '<input type="hidden" name="token" value="{0}" /></form></body></html>'.format(session['token']))
+
+    def confirm_order(self, session, account, params):
+        """
+        Invest in the staged loans. Loans that were funded since they were staged are skipped.
+        """
+        staged = session['staged']
+        total = sum(staged.values())
+        failed = (200, {}, '<html><body>Your order could not be placed</body></html>')
+        if params.get('token') != session['token'] or len(staged) == 0 or total > account.get_cash(time.time()):
+            self.counts['failed_orders'] += 1
+            return failed
+        session['token'] = None
+        session['staged'] = {}
+
+        self.market.update()
+        order_id = self.next_order_id
+        invested = 0
+        notes = []
+        for loan_id, amount in staged.iteritems():
+            listing = self.listings.get(loan_id)
+            if listing is None or self.market.get_unfunded(listing) < amount:
+                self.counts['unfilled'] += amount
+                continue
+            listing['ours'] += amount
+            invested += amount
+            notes.append({'loanId': loan_id, 'orderId': order_id, 'noteAmount': amount})
+            self.counts['notes'] += 1
+
+        if invested == 0:
+            self.counts['failed_orders'] += 1
+            return failed
+
+        account.invested += invested
+        account.notes = (notes + account.notes)[:100]  # Only the first page is kept
+        self.counts['orders'] += 1
+        self.counts['invested'] += invested
+        self.next_order_id += 1
+        return (200, {}, '<html><body><input type="hidden" id="order_id" value="{0}" /></body></html>'.format(order_id))
+
+    def get_stats(self):
+        stats = copy.deepcopy(self.counts)
+        stats['requests'] = self.requests.summary()
+        return stats
+
+
+class StubHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    """
+    Hands each request to the server's StubLendingClub
+    """
+
+    protocol_version = 'HTTP/1.1'  # Keep connections open between requests
+    timeout = 10  # Seconds before an idle connection is closed
+
+    def do_HEAD(self):
+        self.handle_request('HEAD')
+
+    def do_GET(self):
+        self.handle_request('GET')
+
+    def do_POST(self):
+        self.handle_request('POST')
+
+    def handle_request(self, method):
+        started = time.time()
+        path, _, query = self.path.partition('?')
+        params = urlparse.parse_qs(query)
+        if method == 'POST':
+            length = int(self.headers.getheader('Content-Length') or 0)
+            params.update(urlparse.parse_qs(self.rfile.read(length)))
+        params = dict([(key, values[-1]) for key, values in params.iteritems()])
+
+        cookie = re.search(r'JSESSIONID=(\w+)', self.headers.getheader('Cookie') or '')
+        stub = self.server.stub
+        status, headers, body = stub.respond(method, path, params, cookie.group(1) if cookie else None)
+
+        self.send_response(status)
+        for name, value in headers.iteritems():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if method != 'HEAD':
+            self.wfile.write(body)
+        stub.record(path, time.time() - started)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubServer(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    """
+    Serves a StubLendingClub on localhost, a thread per connection
+    """
+
+    daemon_threads = True
+    request_queue_size = 128
+
+    def __init__(self, stub, port=0):
+        BaseHTTPServer.HTTPServer.__init__(self, ('127.0.0.1', port), StubHandler)
+        self.stub = stub
+
+    def get_url(self):
+        return 'http://127.0.0.1:{0}/'.format(self.server_address[1])
+
+
+def create_investor(account):
+    """
+    Create the investor for a load test account, pointed at the stub site
+    """
+    investor = AutoInvestor(app_dir=account['app_dir'])
+    investor.lc.session.base_url = account['url']
+    investor.settings.user_settings['frequency'] = account['frequency']
+    investor.settings.user_settings['cash_watch'] = False  # Keep to the supervisor's schedule
+
+    profile = PROFILES[account['profile']]
+    for key in ['min_cash', 'min_percent', 'max_percent', 'max_per_note']:
+        investor.settings.investing[key] = profile[key]
+    investor.settings.investing['filters'] = get_filters(profile['grades'])
+
+    investor.settings['email'] = account['email']
+    investor.settings['pass'] = account['password']
+    use_account_files(investor, account['email'])
+    investor.loop = True
+    return investor
+
+
+class LoadTestSupervisor(Supervisor):
+    """
+    A fleet supervisor that keeps the latency and lag of every cycle
+    """
+
+    def __init__(self, *args, **kwargs):
+        Supervisor.__init__(self, *args, **kwargs)
+        self.cycle_stats = LatencyStats()
+        self.completed = 0
+        self.errors = 0
+
+    def cycle_finished(self, email, latency, error, lag):
+        Supervisor.cycle_finished(self, email, latency, error, lag)
+        if error is not None:
+            self.errors += 1
+        if latency is not None:
+            self.completed += 1
+            self.cycle_stats.add('cycle', latency)
+        if lag is not None:
+            self.cycle_stats.add('lag', lag)
+
+    def get_pids(self):
+        return [os.getpid()] + [worker.process.pid for worker in self.workers.values() if worker.process is not None]
+
+
+class ResourceSampler(threading.Thread):
+    """
+    Samples the CPU time and resident memory of groups of processes every second.
+    get_groups() returns the process IDs in each group, i.e. {'investor': [...], 'stub': [...]}
+    """
+
+    def __init__(self, get_groups, interval=1):
+        threading.Thread.__init__(self, name='lcinvestor-sampler')
+        self.daemon = True
+        self.get_groups = get_groups
+        self.interval = interval
+        self.stopped = threading.Event()
+
+        self.started = time.time()
+        self.sampled = self.started
+        self.baseline = get_cpu_seconds()  # This process has already used some
+        self.cpu = {}   # The last CPU seconds read, by group and pid
+        self.peak_rss = {}
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            self.sample()
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+    def sample(self):
+        for group, pids in self.get_groups().iteritems():
+            rss = 0
+            for pid in pids:
+                cpu = get_cpu_seconds(pid)
+                if cpu is not None:
+                    self.cpu.setdefault(group, {})[pid] = cpu
+                rss += get_rss(pid) or 0
+            self.peak_rss[group] = max(self.peak_rss.get(group, 0), rss)
+        self.sampled = time.time()
+
+    def get_cores(self, group):
+        """
+        The average number of CPU cores a group kept busy
+        """
+        cpu = self.cpu.get(group, {})
+        seconds = sum(cpu.values())
+        if os.getpid() in cpu:
+            seconds -= self.baseline
+        return seconds / max(self.sampled - self.started, 1)
+
+
+class LoadTest:
+    """
+    Runs fleets of simulated accounts, of each size in counts, through the real supervisor, workers and
+    investment cycles, against a stub of the LendingClub site on localhost. Each account gets one of the
+    investment PROFILES and one of the cash flow PATTERNS.
+
+    duration  -- Seconds to run each fleet for
+    frequency -- Minutes between each account's cycles
+    latency   -- Seconds the stub site takes to answer each request
+    """
+
+    def __init__(self, counts, duration=120, workers=None, frequency=0.5, latency=0.05, seed=1, market_config=None):
+        self.counts = counts
+        self.duration = duration
+        self.workers = workers or multiprocessing.cpu_count()
+        self.frequency = frequency
+        self.latency = latency
+        self.seed = seed
+        self.market_config = market_config
+
+    def run(self, on_result=None):
+        """
+        Run a fleet of each size and return a list of results dicts.
+        on_result(results) is called as each one finishes.
+        """
+        results = []
+        for count in self.counts:
+            result = self.run_fleet(count)
+            results.append(result)
+            if on_result is not None:
+                on_result(result)
+        return results
+
+    def create_accounts(self, count, url, app_dir):
+        """
+        Return the fleet file accounts and the stub site's accounts
+        """
+        rand = random.Random(self.seed)
+        period = self.frequency * 60
+        fleet = []
+        stub_accounts = []
+        for i in xrange(count):
+            email = 'account{0}@loadtest.local'.format(i)
+            pattern = rand.choice(sorted(PATTERNS.keys()))
+            every = PATTERNS[pattern]['every'] or 1
+            stub_accounts.append(StubAccount(email, pattern, period, offset=rand.uniform(0, every * period)))
+            fleet.append({
+                'email': email,
+                'password': PASSWORD,
+                'profile': rand.choice(sorted(PROFILES.keys())),
+                'url': url,
+                'app_dir': app_dir,
+                'frequency': self.frequency
+            })
+        return (fleet, stub_accounts)
+
+    def run_fleet(self, count):
+        """
+        Run a fleet of count accounts for the duration and return the results dict
+        """
+        app_dir = tempfile.mkdtemp(prefix='lcinvestor-loadtest-')
+        market_config = copy.deepcopy(self.market_config or default_market)
+        market_config['seed'] = self.seed
+
+        # Start the stub site in its own process, so it doesn't compete with the supervisor for the GIL
+        server = StubServer(None)
+        fleet, stub_accounts = self.create_accounts(count, server.get_url(), app_dir)
+        server.stub = StubLendingClub(stub_accounts, market_config, self.latency)
+        stub = multiprocessing.Process(target=server.serve_forever, name='lcinvestor-stub')
+        stub.daemon = True
+        stub.start()
+        server.socket.close()
+
+        try:
+            fleet_file = os.path.join(app_dir, 'fleet.yaml')
+            f = open(fleet_file, 'w')
+            f.write(yaml.safe_dump({'accounts': fleet}))
+            f.close()
+
+            supervisor = LoadTestSupervisor(fleet_file, workers=self.workers, investor_factory=create_investor, app_dir=app_dir)
+            supervisor.settings.user_settings['frequency'] = self.frequency
+            supervisor.log_file = os.path.join(app_dir, 'loadtest.log')
+
+            sampler = ResourceSampler(lambda: {'investor': supervisor.get_pids(), 'stub': [stub.pid]})
+            timer = threading.Timer(self.duration, supervisor.stop)
+            sampler.start()
+            timer.start()
+            try:
+                supervisor.run()
+            finally:
+                timer.cancel()
+                sampler.stop()
+
+            stub_stats = json.loads(urllib2.urlopen(server.get_url() + 'loadtest/stats', timeout=30).read())
+            history = CycleHistory(os.path.join(app_dir, AutoInvestor.history_file))
+            cycle_history = history.get_stats()
+            history.close()
+        finally:
+            stub.terminate()
+            stub.join()
+            shutil.rmtree(app_dir, ignore_errors=True)
+
+        return self.get_results(count, supervisor, sampler, stub_stats, cycle_history)
+
+    def get_results(self, count, supervisor, sampler, stub_stats, cycle_history):
+        period = self.frequency * 60
+        outcomes = {}
+        for totals in cycle_history['accounts'].values():
+            for name, value in totals.iteritems():
+                if name.startswith('outcome:'):
+                    outcomes[name[8:]] = outcomes.get(name[8:], 0) + int(value)
+
+        return {
+            'accounts': count,
+            'workers': self.workers,
+            'duration': self.duration,
+            'period': period,
+            'cycles': supervisor.completed,
+            'expected_cycles': count * self.duration / period,
+            'cycles_per_second': supervisor.completed / float(self.duration),
+            'cycle': supervisor.cycle_stats.get('cycle'),
+            'lag': supervisor.cycle_stats.get('lag'),
+            'worker_errors': supervisor.errors,
+            'outcomes': outcomes,
+            'phases': cycle_history['phases'],
+            'requests': stub_stats['requests'],
+            'orders': stub_stats['orders'],
+            'failed_orders': stub_stats['failed_orders'],
+            'failed_logins': stub_stats['failed_logins'],
+            'invested': stub_stats['invested'],
+            'cpu': sampler.get_cores('investor'),
+            'stub_cpu': sampler.get_cores('stub'),
+            'rss': sampler.peak_rss.get('investor', 0),
+            'stub_rss': sampler.peak_rss.get('stub', 0)
+        }
+
+
+def get_report(result):
+    """
+    Return the results of one fleet as a printable report
+    """
+    r = result
+    mb = 1024.0 * 1024
+    lines = [
+        '{0} accounts on {1} workers for {2:.0f} seconds, a cycle every {3:.0f} seconds each'.format(r['accounts'], r['workers'], r['duration'], r['period']),
+        '  Throughput: {0:.1f} cycles/second ({1} of ~{2:.0f} scheduled cycles), {3} orders, ${4:,.0f} invested'.format(
+            r['cycles_per_second'], r['cycles'], r['expected_cycles'], r['orders'], r['invested'])
+    ]
+    if r['lag']:
+        lines.append('  Scheduler lag: p50 {0:.2f}s, p95 {1:.2f}s, p99 {2:.2f}s, max {3:.2f}s'.format(r['lag']['p50'], r['lag']['p95'], r['lag']['p99'], r['lag']['max']))
+    if r['cycle']:
+        lines.append('  Cycle time: p50 {0:.2f}s, p95 {1:.2f}s, p99 {2:.2f}s, max {3:.2f}s'.format(r['cycle']['p50'], r['cycle']['p95'], r['cycle']['p99'], r['cycle']['max']))
+    lines.append('  Outcomes: {0}'.format(', '.join(['{0} {1}'.format(c, o.replace('_', ' ')) for o, c in sorted(r['outcomes'].items())]) or 'none recorded'))
+    lines.append('  Failures: {0} cycles crashed, {1} logins and {2} orders failed'.format(r['worker_errors'], r['failed_logins'], r['failed_orders']))
+    lines.append('  CPU: {0:.2f} cores (stub site {1:.2f}), memory: {2:,.0f} MB at most (stub site {3:,.0f} MB)'.format(
+        r['cpu'], r['stub_cpu'], r['rss'] / mb, r['stub_rss'] / mb))
+
+    lines.append('  Requests (ms)         p50      p95      p99    count')
+    order = [ENDPOINTS[path] for path in ['/', '/account/login.action', '/browse/cashBalanceAj.action', '/browse/browseNotesAj.action',
+        '/portfolio/confirmStartNewPortfolio.action', '/portfolio/lendingMatchOptionsV2.action', '/portfolio/recommendPortfolio.action',
+        '/data/portfolio', '/portfolio/placeOrder.action', '/portfolio/orderConfirmed.action', '/data/portfolioManagement', '/account/loansAj.action']]
+    for name in sorted(r['requests'].keys(), key=lambda n: order.index(n) if n in order else len(order)):
+        latency = r['requests'][name]
+        lines.append('    {0:<18} {1:>8.1f} {2:>8.1f} {3:>8.1f} {4:>8}'.format(name, latency['p50'] * 1000, latency['p95'] * 1000, latency['p99'] * 1000, latency['count']))
+
+    return '\n'.join(lines)
+
+
+def get_summary(results):
+    """
+    Return a table comparing the fleets, for capacity planning.
+    Memory per account is what each account added since the last, smaller, fleet.
+    """
+    mb = 1024.0 * 1024
+    lines = ['Accounts  Cycles/s  Done  Lag p95  Cycle p95  CPU cores  Memory MB  MB/account']
+    last = None
+    for r in results:
+        done = (r['cycles'] * 100.0) / r['expected_cycles'] if r['expected_cycles'] else 0
+        per_account = ''
+        if last is not None and r['accounts'] > last['accounts']:
+            per_account = '{0:.2f}'.format((r['rss'] - last['rss']) / mb / (r['accounts'] - last['accounts']))
+        lines.append('{0:>8} {1:>9.1f} {2:>4.0f}% {3:>7.2f}s {4:>9.2f}s {5:>10.2f} {6:>10,.0f} {7:>11}'.format(
+            r['accounts'], r['cycles_per_second'], done,
+            r['lag']['p95'] if r['lag'] else 0, r['cycle']['p95'] if r['cycle'] else 0,
+            r['cpu'], r['rss'] / mb, per_account))
+        last = r
+    return '\n'.join(lines)
@@ -0,0 +1,217 @@
+#!/usr/bin/env python
+
+#
+# Logging pipeline that keeps formatting and file writes off the investing thread
+#
+
+"""
+The MIT License (MIT)
+
+Copyright (c) 2013 Jeremy Gillick
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+import os
+import time
+import json
+import Queue
+import logging
+import threading
+import logging.handlers
+
+
+class QueueHandler(logging.Handler):
+    """
+    Puts log records on a queue, to be formatted and written by a QueueListener.
+    This is all the work done on the thread that logs the message.
+    """
+
+    def __init__(self, queue):
+        logging.Handler.__init__(self)
+        self.queue = queue
+
+    def emit(self, record):
+        try:
+            # Tracebacks can't wait, they're gone once the except block ends
+            if record.exc_info and not record.exc_text:
+                record.exc_text = logging.Formatter().formatException(record.exc_info)
+                record.exc_info = None
+
+            self.queue.put_nowait(record)
+        except Exception:
+            self.handleError(record)
+
+
+class QueueListener:
+    """
+    Takes log records off a queue, in a background thread, and passes them to its handlers
+    """
+
+    _stop = object()  # Put on the queue to end the thread
+
+    def __init__(self, queue, *handlers):
+        self.queue = queue
+        self.handlers = list(handlers)
+        self.thread = None
+        self.pid = None
+
+    def start(self):
+        """
+        Start the background thread
+        """
+        self.pid = os.getpid()
+        self.thread = threading.Thread(target=self.__monitor, name='lcinvestor-logging')
+        self.thread.daemon = True
+        self.thread.start()
+
+    def is_running(self):
+        """
+        Returns True if the thread is running in this process.
+        (threads don't survive a fork, like when the daemon starts)
+        """
+        return self.thread is not None and self.pid == os.getpid() and self.thread.is_alive()
+
+    def stop(self):
+        """
+        Write everything left on the queue and end the thread
+        """
+        if self.is_running():
+            self.queue.put(self._stop)
+            self.thread.join()
+        self.thread = None
+
+    def add_handler(self, handler):
+        """
+        Add a handler, after the records already on the queue have been handled
+        """
+        self.__in_order(self.handlers.append, handler)
+
+    def remove_handler(self, handler):
+        """
+        Remove a handler, after the records already on the queue have been handled
+        """
+        def remove(handler):
+            if handler in self.handlers:
+                self.handlers.remove(handler)
+                handler.close()
+        self.__in_order(remove, handler)
+
+    def __in_order(self, fn, *args):
+        """
+        Call fn on the listener thread, in order with the queued records
+        """
+        if self.is_running():
+            self.queue.put(_Call(fn, args))
+        else:
+            fn(*args)
+
+    def handle(self, record):
+        for handler in list(self.handlers):
+            if record.levelno >= handler.level:
+                handler.handle(record)
+
+    def __monitor(self):
+        while True:
+            record = self.queue.get()
+            if record is self._stop:
+                break
+            elif isinstance(record, _Call):
+                record.fn(*record.args)
+            else:
+                self.handle(record)
+
+
+class _Call:
+    """
+    A function call put on the queue for the listener thread
+    """
+
+    def __init__(self, fn, args):
+        self.fn = fn
+        self.args = args
+
+
+class JSONFormatter(logging.Formatter):
+    """
+    Formats each record as a single line of JSON
+    """
+
+    def format(self, record):
+        entry = {
+            'time': self.formatTime(record),
+            'timestamp': record.created,
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'module': record.module,
+            'line': record.lineno,
+            'thread': record.threadName
+        }
+
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exception'] = record.exc_text
+
+        return json.dumps(entry)
+
+    def formatTime(self, record, datefmt=None):
+        return time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(record.created)) + ('.%03d' % record.msecs)
+
+
+class RotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """
+    Rotates the log file when it grows past max_bytes OR every `interval` seconds,
+    whichever comes first.
+    """
+
+    def __init__(self, filename, max_bytes=0, interval=0, backup_count=0):
+        logging.handlers.RotatingFileHandler.__init__(self, filename, maxBytes=max_bytes, backupCount=backup_count)
+        self.interval = interval
+        self.rollover_at = None
+
+        if self.interval > 0:
+            created = time.time()
+            if os.path.exists(filename):
+                created = os.stat(filename).st_mtime
+            self.rollover_at = created + self.interval
+
+    def shouldRollover(self, record):
+        if self.rollover_at is not None and time.time() >= self.rollover_at:
+            return 1
+        return logging.handlers.RotatingFileHandler.shouldRollover(self, record)
+
+    def doRollover(self):
+        logging.handlers.RotatingFileHandler.doRollover(self)
+        if self.interval > 0:
+            self.rollover_at = time.time() + self.interval
+
+
+def set_levels(levels):
+    """
+    Set the level of each logger in the levels dict.
+    i.e. {'investor': 'INFO', 'investor.lendingclub': 'WARNING'}
+    """
+    for name, level in levels.iteritems():
+        if type(level) is not int:
+            level = logging.getLevelName(str(level).upper())
+            if type(level) is not int:
+                raise ValueError('Unknown log level for \'{0}\''.format(name))
+        logging.getLogger(name).setLevel(level)
@@ -0,0 +1,170 @@
+#!/usr/bin/env python
+
+#
+# Builds LendingClub-style investment portfolios locally, from a list of loan listings
+#
+
+"""
+The MIT License (MIT)
+
+Copyright (c) 2013 Jeremy Gillick
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+from lendingclub.filters import FilterValidationError
+from lcinvestor.inventory import LoanInventory
+
+# The grade keys on a LendingClub portfolio dict
+GRADES = ['a', 'aa', 'b', 'c', 'd', 'e', 'f', 'g']
+
+
+def matches(filters, loan):
+    """
+    Returns True if the loan listing passes the filters (None matches everything)
+    """
+    if not filters:
+        return True
+    try:
+        return filters.validate_one(loan)
+    except FilterValidationError:
+        return False
+
+
+def build_portfolio(loans, cash, max_per_note=25, min_percent=0, max_percent=20, filters=None, rows=None):
+    """
+    Build a diversified portfolio from a list of loan listings, the way LendingClub's
+    lendingMatchOptions does, and return it as the same dict LendingClub.build_portfolio()
+    returns, or False if nothing matched.
+
+    The cash is spread across enough loans that no note is more than max_per_note. Each run of
+    that many loans, ordered by interest rate, is one portfolio option. Like LendingClub, this picks
+    the option with the highest average rate between min_percent and max_percent.
+
+    loans -- A LoanInventory, or a list of dicts in the format of LendingClub.search() results
+             (loan_id, loanGrade, loanRate, loanLength, loanAmountRequested, loanUnfundedAmount, ...)
+    rows  -- The inventory rows that already passed the filters (instead of filtering again)
+    """
+    per_note = int(max_per_note) - (int(max_per_note) % 25)
+    if cash < 25 or per_note < 25:
+        return False
+
+    min_percent = min_percent or 0
+    if max_percent is None or max_percent is False:
+        max_percent = 100
+
+    inventory = loans if isinstance(loans, LoanInventory) else LoanInventory.from_loans(loans)
+    candidates = get_candidates(inventory, filters, rows)
+
+    units = int(cash) / 25
+    note_count = get_note_count(cash, per_note)
+    if len(candidates) < note_count:
+        return False
+
+    # Find the highest average rate window, between the min and max
+    match_index = None
+    for i, average in iter_averages([inventory.rates[row] for row in candidates], note_count):
+        if average > max_percent:
+            break
+        elif average >= min_percent:
+            match_index = i
+
+    if match_index is None:
+        return False
+    return fill_portfolio(inventory, candidates[match_index:match_index + note_count], units, per_note)
+
+
+def get_candidates(inventory, filters=None, rows=None):
+    """
+    Return the inventory rows that match the filters (or the rows given) and still have room
+    for a note, ordered by interest rate
+    """
+    if rows is None:
+        rows = inventory.select(filters, min_unfunded=25)
+    else:
+        rows = [row for row in rows if inventory.unfunded[row] >= 25]
+    return sorted(rows, key=lambda row: inventory.rates[row])
+
+
+def get_note_count(cash, per_note):
+    """
+    The number of notes it takes to invest the cash with no note over per_note
+    """
+    units = int(cash) / 25
+    return (units + (per_note / 25) - 1) / (per_note / 25)
+
+
+def iter_averages(rates, note_count):
+    """
+    Yield (index, average rate) for each run of note_count rates, lowest first
+    """
+    window_sum = sum(rates[:note_count])
+    for i in xrange(0, len(rates) - note_count + 1):
+        if i > 0:
+            window_sum += rates[i + note_count - 1] - rates[i - 1]
+        yield (i, window_sum / note_count)
+
+
+def fill_portfolio(inventory, window, units, per_note):
+    """
+    Spread units of $25 across the loans in the window of inventory rows and return the portfolio dict,
+    or False if the loans can't take all the cash
+    """
+    note_count = len(window)
+    loan_rates = inventory.rates
+    loan_unfunded = inventory.unfunded
+
+    # Spread the cash across the loans, $25 at a time
+    amounts = [0] * note_count
+    limits = [min(per_note, int(loan_unfunded[row]) - (int(loan_unfunded[row]) % 25)) for row in window]
+    while units > 0:
+        placed = False
+        for i in xrange(note_count):
+            if units > 0 and amounts[i] < limits[i]:
+                amounts[i] += 25
+                units -= 1
+                placed = True
+        if not placed:
+            return False  # These loans can't take all the cash
+
+    # Create portfolio dict
+    invested = float(sum(amounts))
+    portfolio = {
+        'percentage': round(sum([loan_rates[window[i]] * amounts[i] for i in xrange(note_count)]) / invested, 2),
+        'numberOfLoans': note_count,
+        'loan_fractions': []
+    }
+    for grade in GRADES:
+        portfolio[grade] = 0.0
+
+    for i in xrange(note_count):
+        loan = inventory.get_loan(window[i])
+        grade = loan['loanGrade'][0].lower()
+        portfolio[grade] += (amounts[i] / invested) * 100
+        portfolio['loan_fractions'].append({
+            'loan_id': loan['loan_id'],
+            'loanGUID': loan['loan_id'],
+            'loanGrade': loan['loanGrade'],
+            'loanRate': loan['loanRate'],
+            'loanLength': loan['loanLength'],
+            'loanFractionAmount': amounts[i],
+            'invest_amount': amounts[i]
+        })
+
+    return portfolio
@@ -0,0 +1,272 @@
+#!/usr/bin/env python
+
+#
+# Watches the memory the investor holds on to, to catch leaks in the long running daemon
+#
+
+"""
+The MIT License (MIT)
+
+Copyright (c) 2013 Jeremy Gillick
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+import gc
+import copy
+import time
+import shutil
+import logging
+import resource
+import tempfile
+
+# tracemalloc is only built in from Python 3.4 (it's the pytracemalloc package before that).
+# Without it, live objects are counted by type instead.
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+
+def get_rss(pid=None):
+    """
+    Return the resident memory of this process (or another one, by pid), in bytes.
+    Where /proc isn't available, this is the most this process has ever used, and None for other processes.
+    """
+    try:
+        f = open('/proc/{0}/statm'.format(pid or 'self'), 'r')
+        pages = int(f.read().split()[1])
+        f.close()
+        return pages * resource.getpagesize()
+    except (IOError, ValueError, IndexError):
+        if pid is not None:
+            return None
+        usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return usage if usage > (1 << 30) else usage * 1024  # Bytes on OS X, kilobytes on Linux
+
+
+def count_objects():
+    """
+    Return the number of live objects that the garbage collector tracks, by type
+    """
+    counts = {}
+    for obj in gc.get_objects():
+        name = getattr(obj, '__class__', type(obj)).__name__
+        counts[name] = counts.get(name, 0) + 1
+    return counts
+
+
+class MemorySnapshot:
+    """
+    The memory held after a number of cycles, with any unreachable objects collected first
+    """
+
+    def __init__(self, cycle):
+        gc.collect()
+        self.cycle = cycle
+        self.taken = time.time()
+        self.rss = get_rss()
+        self.objects = count_objects()
+        self.trace = None
+        if tracemalloc is not None and tracemalloc.is_tracing():
+            self.trace = tracemalloc.take_snapshot()
+
+    def get_size(self):
+        """
+        The memory held: bytes allocated by Python if tracemalloc is running, otherwise live objects
+        """
+        if self.trace is not None:
+            return sum([stat.size for stat in self.trace.statistics('filename')])
+        return sum(self.objects.values())
+
+    def get_growth(self, before, top=10):
+        """
+        Return the lines of code (or object types) that grew the most since an earlier snapshot
+        """
+        if self.trace is not None and before.trace is not None:
+            stats = [s for s in self.trace.compare_to(before.trace, 'lineno') if s.size_diff > 0]
+            return [str(s) for s in stats[:top]]
+
+        growth = [(self.objects[name] - before.objects.get(name, 0), name) for name in self.objects]
+        growth = sorted([g for g in growth if g[0] > 0], reverse=True)
+        return ['{0}: {1} (+{2})'.format(name, self.objects[name], count) for count, name in growth[:top]]
+
+
+class MemoryMonitor:
+    """
+    Takes a memory snapshot every so many investment cycles, and writes what grew since
+    the last one to a report file.
+
+    every       -- Cycles between snapshots (0 for never)
+    top         -- How many of the biggest growers to report
+    report_file -- The file to add reports to
+    """
+
+    def __init__(self, every=0, top=10, report_file=None, logger=None):
+        self.every = every
+        self.top = top
+        self.report_file = report_file
+        self.logger = logger
+
+        self.cycles = 0
+        self.first = None
+        self.last = None
+
+    def start(self):
+        """
+        Start tracing allocations, if tracemalloc is available
+        """
+        if self.every > 0 and tracemalloc is not None and not tracemalloc.is_tracing():
+            tracemalloc.start(5)
+
+    def cycle_done(self):
+        """
+        Count a cycle, and take a snapshot when it's time to
+        """
+        self.cycles += 1
+        if self.every > 0 and self.cycles % self.every == 0:
+            self.check()
+
+    def check(self):
+        """
+        Take a snapshot and report what grew since the last one
+        """
+        snapshot = MemorySnapshot(self.cycles)
+        if self.first is None:
+            self.first = snapshot
+
+        if self.last is not None and self.report_file is not None:
+            report = self.get_report(self.last, snapshot)
+            f = open(self.report_file, 'a')
+            f.write(report + '\n\n')
+            f.close()
+            if self.logger:
+                self.logger.debug('Memory check, {0}'.format(report.split('\n')[0]))
+
+        self.last = snapshot
+        return snapshot
+
+    def get_report(self, before, after):
+        lines = ['{0}: cycles {1} to {2}, RSS {3:,.1f}MB ({4:+,.1f}MB), {5} {6:,} ({7:+,})'.format(
+            time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(after.taken)),
+            before.cycle, after.cycle,
+            after.rss / 1048576.0, (after.rss - before.rss) / 1048576.0,
+            'bytes traced' if after.trace is not None else 'live objects',
+            after.get_size(), after.get_size() - before.get_size())]
+        lines += ['  ' + line for line in after.get_growth(before, self.top)]
+        return '\n'.join(lines)
+
+    def status(self):
+        """
+        Return a dict with the memory held now and when it was first checked
+        """
+        return {
+            'rss': get_rss(),
+            'checks': self.cycles // self.every if self.every > 0 else 0,
+            'first_rss': self.first.rss if self.first is not None else None,
+            'last_rss': self.last.rss if self.last is not None else None
+        }
+
+
+class LeakCheck:
+    """
+    Runs an investor through many cycles against a simulated market, taking memory snapshots
+    along the way, and finds whether the memory it holds on to keeps growing.
+
+    The first warmup share of the cycles are skipped, while caches and the listing fill up.
+    After that, it's leaking if the memory grew across most snapshots and by more than
+    tolerance (a share of the memory held after the warm up) overall.
+
+    The investor keeps its files in a temporary directory, removed when run() is done.
+    """
+
+    warmup = 0.2
+    tolerance = 0.02
+
+    def __init__(self, cycles=2000, samples=10, market_config=None, frequency=60):
+        from lcinvestor import AutoInvestor, simulation
+
+        config = copy.deepcopy(simulation.default_market)
+        config.update({'seed': 1, 'cash': 5000, 'deposits_per_month': 30, 'listings_per_day': 300})
+        config.update(market_config or {})
+
+        self.cycles = cycles
+        self.samples = samples
+        self.frequency = frequency
+        self.market = simulation.SyntheticMarket(config)
+        self.app_dir = tempfile.mkdtemp()
+        self.investor = AutoInvestor(lc=simulation.SimulatedLendingClub(self.market), clock=self.market.clock, app_dir=self.app_dir)
+        self.investor.simulated = True
+        self.investor.loop = True
+        self.investor.settings.investing['min_cash'] = 500
+        self.investor.settings.investing['filters'] = False
+
+        # Only the first and last snapshots are kept, so the check itself doesn't hold more memory
+        self.first = None
+        self.last = None
+        self.sizes = []
+
+    def run(self):
+        """
+        Run the cycles and return the results dict
+        """
+        logger = logging.getLogger('investor')
+        level = logger.level
+        logger.setLevel(logging.CRITICAL)
+
+        tracing = tracemalloc is not None and tracemalloc.is_tracing()
+        if tracemalloc is not None and not tracing:
+            tracemalloc.start(5)
+
+        try:
+            start = int(self.cycles * self.warmup)
+            every = max(1, (self.cycles - start) // self.samples)
+            for cycle in xrange(1, self.cycles + 1):
+                self.investor.run_cycle()
+                self.market.clock.advance(self.frequency * 60)
+                if cycle >= start and (cycle - start) % every == 0:
+                    self.last = None
+                    self.last = MemorySnapshot(cycle)
+                    self.sizes.append(self.last.get_size())
+                    if self.first is None:
+                        self.first = self.last
+        finally:
+            logger.setLevel(level)
+            if tracemalloc is not None and not tracing:
+                tracemalloc.stop()
+            if self.investor.history is not None:
+                self.investor.history.close()
+            shutil.rmtree(self.app_dir, ignore_errors=True)
+
+        return self.get_results()
+
+    def get_results(self):
+        sizes = self.sizes
+        grew = len([i for i in xrange(1, len(sizes)) if sizes[i] > sizes[i - 1]])
+        growth = sizes[-1] - sizes[0]
+        leaking = grew >= (len(sizes) - 1) * 0.8 and growth > sizes[0] * self.tolerance
+
+        return {
+            'cycles': self.cycles,
+            'sizes': sizes,
+            'growth': growth,
+            'growth_per_1000_cycles': growth * 1000.0 / max(1, self.last.cycle - self.first.cycle),
+            'leaking': leaking,
+            'top': self.last.get_growth(self.first)
+        }
@@ -0,0 +1,182 @@
+#!/usr/bin/env python
+
+#
+# Time limits for each phase of an investment cycle
+#
+
+"""
+The MIT License (MIT)
+
+Copyright (c) 2013 Jeremy Gillick
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+import sys
+import time
+import threading
+
+# The timed phases of an investment cycle
+PHASES = ['site', 'auth', 'balance', 'search', 'order']
+
+
+def next_deadline(deadline, period, now):
+    """
+    Return the first deadline, on the schedule of deadline + N * period, that is after now
+    and the number of deadlines that were missed to get there.
+    """
+    if now < deadline:
+        return (deadline, 0)
+    if period <= 0:
+        return (now, 0)
+
+    missed = int((now - deadline) / period) + 1
+    return (deadline + (missed * period), missed)
+
+
+def call_with_timeout(fn, timeout, *args, **kwargs):
+    """
+    Call fn and return its result, or raise PhaseTimeoutError if it takes longer than timeout seconds.
+    The call keeps running on its own thread after a timeout, but its result is thrown away.
+
+    That thread is the error's thread attribute. LendingClub's requests session isn't thread-safe,
+    so nothing else should use it until that thread has finished (AutoInvestor.timed() waits for it).
+    """
+    if timeout is None:
+        return fn(*args, **kwargs)
+
+    result = {}
+
+    def run():
+        try:
+            result['value'] = fn(*args, **kwargs)
+        except BaseException:
+            result['error'] = sys.exc_info()
+
+    thread = threading.Thread(target=run, name='lcinvestor-call')
+    thread.daemon = True
+    thread.start()
+    thread.join(max(timeout, 0))
+
+    if thread.is_alive():
+        raise PhaseTimeoutError('Gave up waiting for LendingClub after {0:.0f} seconds'.format(timeout), thread)
+    if 'error' in result:
+        raise result['error'][0], result['error'][1], result['error'][2]
+    return result['value']
+
+
+class PhaseTimer:
+    """
+    Times the phases of an investment cycle against their budgets.
+
+    timeouts -- The most seconds any one call to LendingClub can take, for each phase
+    budgets  -- The most seconds each phase can take, across all its calls
+    """
+
+    def __init__(self, timeouts=None, budgets=None, clock=time.time, logger=None):
+        self.timeouts = timeouts or {}
+        self.budgets = budgets or {}
+        self.clock = clock
+        self.logger = logger
+
+        self.name = None
+        self.started = None
+        self.durations = {}  # How long each phase took, the last time it ran
+        self.timings = {}    # How long each phase has taken since take_timings() was last called
+        self.overruns = {}   # How many times each phase went over its budget
+
+    def start(self, name):
+        """
+        Start timing a phase (and stop timing the last one)
+        """
+        self.end()
+        self.name = name
+        self.started = self.clock()
+
+    def end(self):
+        """
+        Stop timing the current phase, and report it if it went over its budget
+        """
+        if self.name is None:
+            return
+
+        name = self.name
+        elapsed = self.clock() - self.started
+        self.name = None
+        self.durations[name] = elapsed
+        self.timings[name] = self.timings.get(name, 0) + elapsed
+
+        budget = self.budgets.get(name)
+        if budget is not None and elapsed > budget:
+            self.overruns[name] = self.overruns.get(name, 0) + 1
+            if self.logger:
+                self.logger.warning('The {0} phase took {1:.1f} seconds, over its budget of {2} seconds'.format(name, elapsed, budget))
+
+    def take_timings(self):
+        """
+        Return the seconds each phase has taken since the last call (i.e. over one cycle), and start over
+        """
+        timings = self.timings
+        self.timings = {}
+        return timings
+
+    def remaining(self):
+        """
+        Seconds left in the current phase's budget, or None if it doesn't have one
+        """
+        if self.name is None or self.budgets.get(self.name) is None:
+            return None
+        return self.budgets[self.name] - (self.clock() - self.started)
+
+    def get_timeout(self):
+        """
+        How long the next call to LendingClub can take: the phase's timeout,
+        or what's left of its budget, whichever is less
+        """
+        if self.name is None:
+            return None
+
+        timeout = self.timeouts.get(self.name)
+        remaining = self.remaining()
+        if remaining is not None:
+            if remaining <= 0:
+                raise PhaseTimeoutError('The {0} phase used up its budget of {1} seconds'.format(self.name, self.budgets[self.name]))
+            if timeout is None or remaining < timeout:
+                timeout = remaining
+        return timeout
+
+    def status(self):
+        """
+        Return a dict with the last duration and number of overruns for each phase
+        """
+        return dict([(name, {
+            'duration': self.durations.get(name),
+            'budget': self.budgets.get(name),
+            'overruns': self.overruns.get(name, 0)
+        }) for name in PHASES])
+
+
+class PhaseTimeoutError(Exception):
+
+    def __init__(self, value, thread=None):
+        self.value = value
+        self.thread = thread  # The call that was given up on, which is still running
+
+    def __str__(self):
+        return repr(self.value)
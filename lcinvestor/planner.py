@@ -0,0 +1,276 @@
+#!/usr/bin/env python
+
+#
+# Evaluates a grid of investment settings against a snapshot of the loan listings
+#
+
+"""
+The MIT License (MIT)
+
+Copyright (c) 2013 Jeremy Gillick
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+import copy
+import json
+import time
+import yaml
+import itertools
+import multiprocessing
+from lendingclub.filters import Filter, SavedFilter
+from lcinvestor import util
+from lcinvestor import market
+from lcinvestor.inventory import LoanInventory
+
+GRADES = 'ABCDEFG'
+
+# The settings combinations to try. Any of these can be changed with a YAML grid file.
+# Grades are 'All' or the letters of the grades to include, i.e. 'BCD'
+default_grid = {
+    'min_cash': None,  # Defaults to your min_cash setting
+    'min_percent': [0, 8, 12, 16],
+    'max_percent': [10, 14, 18, 22, 26],
+    'max_per_note': [25, 50, 100],
+    'grades': ['All', 'AB', 'BC', 'BCD', 'CDE', 'DEFG']
+}
+
+# The order of the settings in each combination
+KEYS = ['grades', 'min_cash', 'min_percent', 'max_percent', 'max_per_note']
+
+# Set in each worker process, so the snapshot is only sent once per process
+_inventory = None
+_filters = None
+_cash = None
+_matching = None
+
+
+def normalize_loans(loans):
+    """
+    Convert the numbers LendingClub sends as strings, like loanRate ('20.31') and loanGUID,
+    so the snapshot loans can be compared and sorted
+    """
+    for loan in loans:
+        loan['loan_id'] = int(loan.get('loan_id', loan.get('loanGUID')))
+        loan['loanRate'] = float(loan['loanRate'])
+        loan['loanAmountRequested'] = int(float(loan['loanAmountRequested']))
+        loan['loanUnfundedAmount'] = int(float(loan['loanUnfundedAmount']))
+        loan['loanLength'] = int(loan.get('loanLength', 36))
+    return loans
+
+
+def capture_snapshot(lc, cash=None, page_size=100):
+    """
+    Fetch all the loans listed on LendingClub, and the cash available to invest
+    """
+    loans = []
+    while True:
+        results = lc.search(start_index=len(loans), limit=page_size)
+        loans.extend(results['loans'])
+        if len(results['loans']) == 0 or len(loans) >= results['totalRecords']:
+            break
+
+    if cash is None:
+        cash = lc.get_investable_balance()
+
+    return {
+        'captured': int(time.time()),
+        'cash': cash,
+        'loans': normalize_loans(loans)
+    }
+
+
+def save_snapshot(snapshot, file_path):
+    f = open(file_path, 'w')
+    f.write(json.dumps(snapshot))
+    f.close()
+
+
+def load_snapshot(file_path):
+    f = open(file_path, 'r')
+    snapshot = json.loads(f.read())
+    f.close()
+
+    if type(snapshot) is not dict or 'loans' not in snapshot:
+        raise PlannerError('\'{0}\' is not a listing snapshot'.format(file_path))
+    normalize_loans(snapshot['loans'])
+    return snapshot
+
+
+def load_grid_file(file_path=None, settings=None):
+    """
+    Return the grid of settings to try, with the values from the YAML grid file, if there is one.
+    Anything without values is filled in from the settings object.
+    """
+    grid = copy.deepcopy(default_grid)
+    if file_path is not None:
+        saved = yaml.load(open(file_path).read())
+        if type(saved) is not dict:
+            raise PlannerError('The grid file \'{0}\' is not a dictionary of settings'.format(file_path))
+        for key, values in saved.iteritems():
+            if key not in default_grid:
+                raise PlannerError('\'{0}\' is not a setting that can be planned'.format(key))
+            grid[key] = values
+
+    for key in KEYS:
+        if grid[key] is None and settings is not None:
+            grid[key] = settings[key]
+        if type(grid[key]) is not list:
+            grid[key] = [grid[key]]
+    return grid
+
+
+def get_combinations(grid):
+    """
+    Return a list of settings dicts, for every combination of values in the grid.
+    Combinations that can never invest (min_percent over max_percent) are left out.
+    """
+    combinations = []
+    for values in itertools.product(*[grid[key] for key in KEYS]):
+        combination = dict(zip(KEYS, values))
+        if combination['min_percent'] and combination['max_percent'] and combination['min_percent'] > combination['max_percent']:
+            continue
+        combinations.append(combination)
+    return combinations
+
+
+def get_filter_values(filters, grades):
+    """
+    Return a filter dict with the grades replaced, i.e. 'BCD' or 'All'
+    """
+    values = {}
+    if filters and type(filters) is not SavedFilter:
+        values = copy.deepcopy(dict(filters))
+
+    values['grades'] = {'All': grades == 'All'}
+    for grade in GRADES:
+        values['grades'][grade] = grades != 'All' and grade in grades
+    return values
+
+
+def init_worker(loans, filters, cash):
+    """
+    Give the worker process the snapshot loans, the base filters and the cash to invest
+    """
+    global _inventory, _filters, _cash, _matching
+    _inventory = LoanInventory.from_loans(loans)
+    _filters = filters
+    _cash = cash
+    _matching = {}
+
+
+def evaluate(combination):
+    """
+    Find the portfolio the investor would pick with these settings, the same way it does in
+    attempt_to_invest(), and return the combination with the results added.
+    """
+    cash = _cash
+
+    # The inventory rows that pass the filters, for these grades
+    grades = combination['grades']
+    if grades not in _matching:
+        filters = Filter(get_filter_values(_filters, grades))
+        _matching[grades] = _inventory.select(filters)
+    rows = _matching[grades]
+
+    portfolio = False
+    if cash > 0 and cash >= combination['min_cash']:
+        for amount in util.cash_ladder(cash, combination['min_cash']):
+            portfolio = market.build_portfolio(_inventory, amount,
+                max_per_note=combination['max_per_note'],
+                min_percent=combination['min_percent'],
+                max_percent=combination['max_percent'],
+                rows=rows)
+            if portfolio:
+                break
+
+    result = dict(combination)
+    result['invested'] = 0
+    result['rate'] = None
+    result['notes'] = 0
+    if portfolio:
+        result['invested'] = sum([loan['invest_amount'] for loan in portfolio['loan_fractions']])
+        result['rate'] = portfolio['percentage']
+        result['notes'] = portfolio['numberOfLoans']
+    result['unfilled'] = cash - result['invested']
+    return result
+
+
+def plan(snapshot, grid, filters=None, cash=None, processes=None):
+    """
+    Evaluate every combination of settings in the grid against the snapshot, across a pool
+    of processes (one per core, by default), and return the results, best first.
+    """
+    if cash is None:
+        cash = snapshot['cash']
+
+    combinations = get_combinations(grid)
+    base_filters = get_filter_values(filters, 'All')
+
+    if processes is None:
+        processes = multiprocessing.cpu_count()
+
+    if processes <= 1 or len(combinations) < 2:
+        init_worker(snapshot['loans'], base_filters, cash)
+        results = map(evaluate, combinations)
+    else:
+        pool = multiprocessing.Pool(processes, init_worker, (snapshot['loans'], base_filters, cash))
+        try:
+            # Combinations are grouped by grades, so each chunk filters the loans once
+            chunksize = max(1, len(combinations) / (processes * 4))
+            results = pool.map(evaluate, combinations, chunksize)
+        finally:
+            pool.close()
+            pool.join()
+
+    results.sort(key=lambda r: (r['invested'], r['rate']), reverse=True)
+    return results
+
+
+def get_report(results, limit=20):
+    """
+    Return the best results as a printable table
+    """
+    lines = ['{0:>9} {1:>6} {2:>6} {3:>9} {4:>7} {5:>10} {6:>6} {7:>6} {8:>10}'.format(
+        'min_cash', 'min %', 'max %', 'per note', 'grades', 'invested', 'rate', 'notes', 'unfilled')]
+
+    for r in results[:limit]:
+        lines.append('{0:>9} {1:>6} {2:>6} {3:>9} {4:>7} {5:>10} {6:>6} {7:>6} {8:>10}'.format(
+            '${0:,.0f}'.format(r['min_cash']),
+            r['min_percent'] or 0,
+            r['max_percent'] or '-',
+            '${0}'.format(r['max_per_note']),
+            r['grades'],
+            '${0:,.0f}'.format(r['invested']),
+            '{0:.2f}%'.format(r['rate']) if r['rate'] is not None else '-',
+            r['notes'],
+            '${0:,.0f}'.format(r['unfilled'])))
+
+    if len(results) > limit:
+        lines.append('... and {0} more'.format(len(results) - limit))
+    return '\n'.join(lines)
+
+
+class PlannerError(Exception):
+
+    def __init__(self, value):
+        self.value = value
+
+    def __str__(self):
+        return repr(self.value)
@@ -0,0 +1,189 @@
+#!/usr/bin/env python
+
+#
+# A compact investment portfolio, with the loan fractions stored in parallel arrays
+#
+
+"""
+The MIT License (MIT)
+
+Copyright (c) 2013 Jeremy Gillick
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+from array import array
+
+# Sub-grades are stored as a small number: A1 = 0, A2 = 1 ... G5 = 34
+GRADE_LETTERS = 'ABCDEFG'
+NO_GRADE = 255
+
+# The grade keys on a LendingClub portfolio dict
+GRADE_KEYS = ['a', 'aa', 'b', 'c', 'd', 'e', 'f', 'g']
+
+
+def grade_to_code(grade):
+    """
+    Convert a sub-grade, like 'B3', to its number
+    """
+    if not grade or grade[0] not in GRADE_LETTERS:
+        return NO_GRADE
+    sub_grade = int(grade[1]) if len(grade) > 1 and grade[1].isdigit() else 1
+    return (GRADE_LETTERS.index(grade[0]) * 5) + (sub_grade - 1)
+
+
+def code_to_grade(code):
+    """
+    Convert a sub-grade number back to its name, like 'B3'
+    """
+    if code == NO_GRADE:
+        return None
+    return '{0}{1}'.format(GRADE_LETTERS[code / 5], (code % 5) + 1)
+
+
+class Portfolio(object):
+    """
+    An investment portfolio. Instead of a dict for each loan fraction, the loan IDs, order IDs,
+    amounts, grades and rates are kept in parallel arrays. The LendingClub dict format is only
+    built when it's asked for, with to_dict().
+    """
+
+    __slots__ = ('percentage', 'loan_ids', 'order_ids', 'amounts', 'grades', 'rates')
+
+    def __init__(self, percentage=0.0):
+        self.percentage = percentage
+        self.loan_ids = array('l')
+        self.order_ids = array('l')
+        self.amounts = array('l')
+        self.grades = array('B')
+        self.rates = array('f')
+
+    @classmethod
+    def from_dict(cls, portfolio):
+        """
+        Create a portfolio from the dict returned by LendingClub.build_portfolio()
+        """
+        compact = cls(portfolio['percentage'])
+        for fraction in portfolio['loan_fractions']:
+            compact.add(fraction['loan_id'], fraction.get('invest_amount', fraction['loanFractionAmount']),
+                grade=fraction.get('loanGrade'),
+                rate=fraction.get('loanRate', 0.0),
+                order_id=fraction.get('orderId', 0))
+        return compact
+
+    @classmethod
+    def load(cls, data):
+        """
+        Create a portfolio from what dump() returned, or a LendingClub portfolio dict
+        (like the ones saved in older last_investment files)
+        """
+        if 'loan_fractions' in data:
+            return cls.from_dict(data)
+
+        compact = cls(data['percentage'])
+        compact.loan_ids.extend(data['loan_ids'])
+        compact.order_ids.extend(data['order_ids'])
+        compact.amounts.extend(data['amounts'])
+        compact.grades.extend([grade_to_code(grade) for grade in data['grades']])
+        compact.rates.extend(data['rates'])
+        return compact
+
+    def add(self, loan_id, amount, grade=None, rate=0.0, order_id=0):
+        """
+        Add a loan fraction. LendingClub sends the rate as a string, like '15.88'.
+        """
+        self.loan_ids.append(int(loan_id))
+        self.order_ids.append(int(order_id or 0))
+        self.amounts.append(int(float(amount)))
+        self.grades.append(grade_to_code(grade))
+        self.rates.append(float(rate or 0))
+
+    def set_order_id(self, order_id):
+        """
+        Set the order ID on every loan fraction, once the order has been placed
+        """
+        self.order_ids = array('l', [int(order_id)] * len(self))
+
+    def __len__(self):
+        return len(self.loan_ids)
+
+    def get_invested(self):
+        """
+        The total amount invested across all loans
+        """
+        return sum(self.amounts)
+
+    def get_fractions(self):
+        """
+        Return a list of the (loan ID, amount) of each loan fraction
+        """
+        return zip(self.loan_ids, self.amounts)
+
+    def get_grade_percents(self):
+        """
+        Return a dict of the percent invested in each grade letter, i.e. {'B': 60.0, 'C': 40.0}
+        """
+        totals = {}
+        for i in xrange(len(self.amounts)):
+            if self.grades[i] != NO_GRADE:
+                letter = GRADE_LETTERS[self.grades[i] / 5]
+                totals[letter] = totals.get(letter, 0) + self.amounts[i]
+
+        invested = float(self.get_invested())
+        if invested == 0:
+            return {}
+        return dict([(letter, (amount / invested) * 100) for letter, amount in totals.iteritems()])
+
+    def dump(self):
+        """
+        Return the portfolio as a dict of lists, for saving as JSON
+        """
+        return {
+            'percentage': self.percentage,
+            'loan_ids': self.loan_ids.tolist(),
+            'order_ids': self.order_ids.tolist(),
+            'amounts': self.amounts.tolist(),
+            'grades': [code_to_grade(code) for code in self.grades],
+            'rates': [round(rate, 2) for rate in self.rates]
+        }
+
+    def to_dict(self):
+        """
+        Return the portfolio in the format of LendingClub.build_portfolio()
+        """
+        portfolio = {
+            'percentage': self.percentage,
+            'numberOfLoans': len(self),
+            'loan_fractions': []
+        }
+        for key in GRADE_KEYS:
+            portfolio[key] = 0.0
+        for letter, percent in self.get_grade_percents().iteritems():
+            portfolio[letter.lower()] = percent
+
+        for i in xrange(len(self)):
+            portfolio['loan_fractions'].append({
+                'loan_id': self.loan_ids[i],
+                'orderId': self.order_ids[i],
+                'loanGrade': code_to_grade(self.grades[i]),
+                'loanRate': round(self.rates[i], 2),
+                'loanFractionAmount': self.amounts[i],
+                'invest_amount': self.amounts[i]
+            })
+        return portfolio
@@ -0,0 +1,244 @@
+#!/usr/bin/env python
+
+#
+# Profiles investment cycles, with cProfile and a stack sampler, to find where their time goes
+#
+
+"""
+The MIT License (MIT)
+
+Copyright (c) 2013 Jeremy Gillick
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+
+import os
+import sys
+import time
+import pstats
+import cProfile
+import threading
+
+
+def get_frame_name(code):
+    """
+    Return the name a function is shown with in the collapsed stacks
+    """
+    return '{0} ({1}:{2})'.format(code.co_name, os.path.basename(code.co_filename), code.co_firstlineno)
+
+
+def get_stack(frame, stop_at=None):
+    """
+    Return the names of the functions on a stack, outermost first, from the frame up to
+    (not including) the first one running the stop_at code
+    """
+    stack = []
+    while frame is not None and frame.f_code is not stop_at:
+        stack.append(get_frame_name(frame.f_code))
+        frame = frame.f_back
+    stack.reverse()
+    return stack
+
+
+def run_profiled(profiler, fn, args, kwargs):
+    """
+    Call fn for the profiler's cycle, with its own cProfile profile if it's on another thread
+    """
+    ident = threading.current_thread().ident
+    profile = profiler.start_call(ident)
+    if profile is None:
+        return fn(*args, **kwargs)
+    try:
+        return profile.runcall(fn, *args, **kwargs)
+    finally:
+        profiler.end_call(ident, profile)
+
+
+class StackSampler(threading.Thread):
+    """
+    Samples the stack of a thread every interval seconds and counts each stack it sees.
+    While the thread waits on calls running on other threads, their stacks are counted instead,
+    under the waiting thread's stack.
+    """
+
+    def __init__(self, thread_id, interval):
+        threading.Thread.__init__(self, name='lcinvestor-sampler')
+        self.daemon = True
+        self.thread_id = thread_id
+        self.interval = interval
+        self.calls = set()  # The IDs of the threads running calls for the sampled thread
+        self.counts = {}    # Stack (a tuple of function names) to the number of samples it was seen in
+        self.samples = 0
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            self.sample()
+
+    def sample(self):
+        frames = sys._current_frames()
+        frame = frames.get(self.thread_id)
+        if frame is None:
+            return
+        stack = get_stack(frame)
+        calls = [frames[ident] for ident in list(self.calls) if ident in frames]
+
+        self.samples += 1
+        if len(calls) == 0:
+            self.counts[tuple(stack)] = self.counts.get(tuple(stack), 0) + 1
+        for call in calls:
+            key = tuple(stack + get_stack(call, stop_at=run_profiled.__code__)[1:])  # Without profile.runcall()
+            self.counts[key] = self.counts.get(key, 0) + 1
+
+    def get_collapsed(self):
+        """
+        Return the stacks in the collapsed format flame graph tools read (flamegraph.pl, speedscope),
+        one 'outer;inner;innermost count' line for each
+        """
+        return ''.join(['{0} {1}\n'.format(';'.join(stack), count) for stack, count in sorted(self.counts.items())])
+
+
+class CycleProfiler:
+    """
+    Profiles the next few investment cycles. For each one, the cProfile stats (for pstats or
+    snakeviz) and the stacks sampled while it ran, collapsed for flame graphs, are written to
+    the directory, named after when the cycle started and how it ended.
+
+    Calls the cycle makes on other threads (see call_with_timeout) are only profiled if they're
+    made through wrap().
+    """
+
+    interval = 0.005  # Seconds between stack samples
+
+    def __init__(self, directory, cycles=1):
+        self.directory = directory
+        self.remaining = cycles
+        self.profiled = 0
+        self.written = []  # The files written so far, in order
+
+        self.lock = threading.Lock()
+        self.started = None
+        self.profile = None
+        self.sampler = None
+        self.calls = []  # The profiles of this cycle's finished calls on other threads
+
+    def start(self):
+        """
+        Start profiling the cycle that's running on this thread
+        """
+        self.started = time.time()
+        self.calls = []
+        self.sampler = StackSampler(threading.current_thread().ident, self.interval)
+        self.sampler.start()
+        self.profile = cProfile.Profile()
+        self.profile.enable()
+
+    def is_running(self):
+        return self.profile is not None
+
+    def wrap(self, fn):
+        """
+        Return fn, profiled as part of the cycle when it's called on another thread
+        """
+        if not self.is_running():
+            return fn
+
+        def profiled(*args, **kwargs):
+            return run_profiled(self, fn, args, kwargs)
+        return profiled
+
+    def start_call(self, ident):
+        """
+        Start profiling a call on the thread with this ID. Returns its profile, or None if the call
+        is on the cycle's own thread (which is already profiled) or the cycle is over.
+        """
+        self.lock.acquire()
+        try:
+            if not self.is_running() or ident == self.sampler.thread_id:
+                return None
+            self.sampler.calls.add(ident)
+            return cProfile.Profile()
+        finally:
+            self.lock.release()
+
+    def end_call(self, ident, profile):
+        self.lock.acquire()
+        try:
+            if self.is_running():
+                self.sampler.calls.discard(ident)
+                self.calls.append(profile)
+        finally:
+            self.lock.release()
+
+    def stop(self, label):
+        """
+        Stop profiling the cycle and write its files, named after the time it started and label.
+        Returns the paths of the files written.
+        """
+        self.profile.disable()
+        self.sampler.stopped.set()
+        self.sampler.join()
+
+        # Calls still running (that timed out) aren't part of the cycle any more
+        self.lock.acquire()
+        try:
+            profiles = [self.profile] + self.calls
+            self.profile = None
+        finally:
+            self.lock.release()
+
+        self.profiled += 1
+        self.remaining -= 1
+        if not os.path.exists(self.directory):
+            os.makedirs(self.directory)
+        name = '{0}-{1}-{2}'.format(time.strftime('%Y%m%d-%H%M%S', time.localtime(self.started)), self.profiled, label)
+        paths = []
+
+        # Python 2's pstats can't load a profile that didn't see any calls
+        stats = None
+        for profile in profiles:
+            profile.create_stats()
+            if not profile.stats:
+                continue
+            if stats is None:
+                stats = pstats.Stats(profile)
+            else:
+                stats.add(profile)
+        if stats is not None:
+            paths.append(os.path.join(self.directory, name + '.pstats'))
+            stats.dump_stats(paths[-1])
+
+        paths.append(os.path.join(self.directory, name + '.collapsed'))
+        f = open(paths[-1], 'w')
+        f.write(self.sampler.get_collapsed())
+        f.close()
+
+        self.written.extend(paths)
+        return paths
+
+    def status(self):
+        """
+        Return a dict describing the profiler, for monitoring
+        """
+        return {
+            'remaining': self.remaining,
+            'running': self.is_running(),
+            'written': self.written[-2:]
+        }
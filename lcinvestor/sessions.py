@@ -0,0 +1,166 @@
+#!/usr/bin/env python
+
+#
+# Keeps the LendingClub session between runs, encrypted, so --run-once doesn't log in every time
+#
+
+"""
+The MIT License (MIT)
+
+Copyright (c) 2013 Jeremy Gillick
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+
+import os
+import json
+import time
+import keyring
+import requests
+
+# The session is encrypted with Fernet (AES with an HMAC), from the cryptography package.
+# Without it, sessions can't be saved.
+try:
+    from cryptography.fernet import Fernet, InvalidToken
+except ImportError:
+    Fernet = None
+
+# Where the encryption key is kept, in the system keyring
+KEYRING_NAME = 'LendingClub'
+KEYRING_ACCOUNT = 'lcinvestor-session-key'
+
+
+def get_session_state(session):
+    """
+    Return the cookies and headers of a logged in lendingclub.session.Session, as a dict
+    that can be saved as JSON, or None if it hasn't logged in
+    """
+    http = session._Session__session  # Its requests.Session, which holds the cookies
+    if http is None:
+        return None
+
+    cookies = [{
+        'name': cookie.name,
+        'value': cookie.value,
+        'domain': cookie.domain,
+        'path': cookie.path,
+        'secure': cookie.secure,
+        'expires': cookie.expires
+    } for cookie in http.cookies]
+    return {
+        'email': session.email,
+        'base_url': session.base_url,
+        'last_request_time': session.last_request_time,
+        'headers': dict(http.headers),
+        'cookies': cookies
+    }
+
+
+def set_session_state(session, saved, password):
+    """
+    Load the cookies and headers from get_session_state() into a lendingclub.session.Session
+    """
+    http = requests.Session()
+    http.headers = saved['headers']
+    for cookie in saved['cookies']:
+        http.cookies.set(cookie['name'], cookie['value'], domain=cookie['domain'], path=cookie['path'],
+            secure=cookie['secure'], expires=cookie['expires'])
+
+    # What Session.authenticate() would have set, so it can log in again by itself if it needs to
+    session.email = saved['email']
+    session._Session__pass = password
+    session._Session__session = http
+    session.last_request_time = saved['last_request_time']
+
+
+def get_key():
+    """
+    Return the session encryption key from the keyring, creating it the first time
+    """
+    key = keyring.get_password(KEYRING_NAME, KEYRING_ACCOUNT)
+    if key is None:
+        key = Fernet.generate_key()
+        keyring.set_password(KEYRING_NAME, KEYRING_ACCOUNT, key)
+    return str(key)
+
+
+class SessionStore:
+    """
+    Saves the cookies of a logged in LendingClub session to a file, encrypted, and restores
+    them into a new session. Only sessions that haven't reached LendingClub's session timeout
+    are restored, and LendingClub can still have ended them, so check before using one.
+    """
+
+    def __init__(self, file_path, key=None):
+        if Fernet is None:
+            raise SessionStoreError('Saving the session needs the cryptography package (pip install cryptography)')
+        self.file_path = file_path
+        self.fernet = Fernet(key if key is not None else get_key())
+
+    def save(self, session):
+        """
+        Save a logged in lendingclub.session.Session
+        """
+        saved = get_session_state(session)
+        if saved is None:
+            return False
+
+        # Only readable by you, and replaced in one step so a run that's cut off doesn't leave half a file
+        temp_path = self.file_path + '.tmp'
+        fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0600)
+        f = os.fdopen(fd, 'w')
+        f.write(self.fernet.encrypt(json.dumps(saved)))
+        f.close()
+        os.rename(temp_path, self.file_path)
+        return True
+
+    def restore(self, session, email, password):
+        """
+        Load the saved session for this email into a lendingclub.session.Session.
+        Returns False if there isn't one, it's for another account or site, or it has timed out.
+        """
+        try:
+            f = open(self.file_path, 'r')
+            token = f.read()
+            f.close()
+            saved = json.loads(self.fernet.decrypt(token))
+        except (IOError, ValueError, InvalidToken):
+            return False
+
+        if saved.get('email') != email or saved.get('base_url') != session.base_url:
+            return False
+        if time.time() - saved['last_request_time'] >= session.session_timeout * 60:
+            return False
+
+        set_session_state(session, saved, password)
+        return True
+
+    def clear(self):
+        if os.path.exists(self.file_path):
+            os.remove(self.file_path)
+
+
+class SessionStoreError(Exception):
+
+    def __init__(self, value):
+        self.value = value
+
+    def __str__(self):
+        return repr(self.value)
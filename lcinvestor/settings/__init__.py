@@ -32,6 +32,51 @@ import json
 import copy
 from lendingclub.filters import Filter, SavedFilter, SavedFilterError
 from lcinvestor import util
+from lcinvestor.ladder import get_settings_key
+
+
+class CompiledFilter(Filter):
+    """
+    A copy of a Filter that builds its search string once, instead of from a template on every
+    search, and doesn't normalize its values on every read. Setting a value builds it again.
+    """
+
+    payload = None
+
+    def __init__(self, filters):
+        Filter.__init__(self)
+        for key, value in filters.iteritems():
+            dict.__setitem__(self, key, copy.deepcopy(value))
+        self.payload = None
+
+    def __getitem__(self, key):
+        return dict.__getitem__(self, key)
+
+    def __setitem__(self, key, value):
+        Filter.__setitem__(self, key, value)
+        self.payload = None
+
+    def search_string(self):
+        if self.payload is None:
+            self.payload = Filter.search_string(self)
+        return self.payload
+
+
+class SettingsSnapshot(object):
+    """
+    The settings an investment cycle runs with, compiled from Settings by get_snapshot() and read-only,
+    so a reload while a cycle runs doesn't change them part way through.
+    """
+
+    __slots__ = ['profile', 'key', 'min_cash', 'max_per_note', 'min_percent', 'max_percent', 'portfolio',
+                 'filter_id', 'filters', 'frequency', 'listing_release_hours']
+
+    def __init__(self, **values):
+        for name in self.__slots__:
+            object.__setattr__(self, name, values.get(name))
+
+    def __setattr__(self, name, value):
+        raise AttributeError('The settings snapshot can not be changed, change the Settings instead')
 
 
 class Settings():
@@ -51,7 +96,9 @@ class Settings():
 
 
     investing_json = None  # A dictionary representing the loaded investing JSON file
+    investing_json_path = None  # The file investing_json was loaded from (None for the default file)
     profile_loaded = False # True if a investing profile has been loaded from the investing JSON
+    profile_email = None  # The profile that was last selected
 
 
     # Auth settings
@@ -72,15 +119,38 @@ class Settings():
     }
     investing = {}
 
+    # The settings compiled for investment cycles, until they change (see get_snapshot)
+    snapshot = None
+
     # If the investing settings have been updated
     # False: The settings are still set to the defaults
     # True: The settings have been updated by the user or file
     is_dirty = False
 
     # Default user settings
-    user_settings = {
-        'frequency': 60
+    default_user_settings = {
+        'frequency': 60,
+        'circuit_threshold': 3,  # Failures in a row before a circuit opens
+        'circuit_cooldown': 15,  # Minutes an open circuit waits before trying again
+        'log_max_size': 10,  # Megabytes the daemon log can grow to before it's rotated
+        'log_rotate_hours': 24,  # Hours before the daemon log is rotated
+        'log_backups': 7,  # Rotated daemon logs to keep
+        'log_levels': {},  # Log level per module, i.e. {'investor.lendingclub': 'WARNING'}
+        'phase_timeouts': {'site': 30, 'auth': 30, 'balance': 30, 'search': 60, 'order': 120},  # Seconds for any one call
+        'phase_budgets': {'site': 600, 'auth': 60, 'balance': 60, 'search': 300, 'order': 180},  # Seconds for each phase
+        'listing_release_hours': [6, 10, 14, 18],  # Hours of the day (Pacific time) LendingClub lists new loans
+        'portfolio_cache_size': 128,  # Portfolio searches to remember between listing releases
+        'portfolio_cache_minutes': 240,  # Minutes a portfolio search is remembered, at most
+        'cash_watch': True,  # Check for cash more often in the hours it tends to arrive, and less often outside them
+        'cash_watch_fast_minutes': 5,
+        'cash_watch_slow_minutes': 240,
+        'warm_up_seconds': 30,  # Seconds before each scheduled cycle to log in and load the saved filter
+        'memory_check_cycles': 0,  # Report on what memory grew every this many cycles (0 to turn off)
+        'memory_report_top': 10,
+        'order_retries': 2,  # Times to send an order again, once the account's orders show it didn't go through
+        'order_retry_seconds': 5
     }
+    user_settings = {}
 
     def __init__(self, investor, investing_file=None, settings_dir=None, logger=False, verbose=False):
         """
@@ -88,7 +158,9 @@ class Settings():
               saving settings to the cache file.
         settings_dir: The directory that will be used to save the user and investment settings files
         """
+        self.auth = copy.deepcopy(self.auth)
         self.investing = self.get_default_investing_settings()
+        self.user_settings = copy.deepcopy(self.default_user_settings)
         self.is_dirty = False
         self.investor = investor
         self.settings_dir = settings_dir
@@ -135,6 +207,7 @@ class Settings():
         """
         Add a setting
         """
+        self.snapshot = None
         if key in self.investing:
             self.investing[key] = value
             self.is_dirty = True
@@ -143,6 +216,69 @@ class Settings():
         elif key in self.auth:
             self.auth[key] = value
 
+    def get_snapshot(self):
+        """
+        Return the SettingsSnapshot for the next investment cycle. It's compiled again after the settings
+        change through this class (settings[key] = value, reload() or the prompts), or if a saved filter
+        couldn't be loaded from LendingClub last time.
+        """
+        if self.snapshot is not None and (self.snapshot.filters is not None or not self.snapshot.filter_id):
+            return self.snapshot
+
+        filters = self['filters']  # Loads a saved filter from LendingClub
+        if filters and type(filters) is not SavedFilter:
+            filters = CompiledFilter(filters)
+
+        self.snapshot = SettingsSnapshot(
+            profile=self.profile_email or 'none',
+            key=get_settings_key(self),
+            min_cash=self['min_cash'],
+            max_per_note=self['max_per_note'],
+            min_percent=self['min_percent'],
+            max_percent=self['max_percent'],
+            portfolio=self['portfolio'] or None,
+            filter_id=self['filter_id'],
+            filters=filters or None,
+            frequency=self['frequency'],
+            listing_release_hours=tuple(self['listing_release_hours'] or []))
+        return self.snapshot
+
+    def get_handoff(self):
+        """
+        Return the settings in memory (but not the email and password) as a dict that can be saved as JSON,
+        for the process this investor restarts as (see take_over)
+        """
+        investing = self.investing.copy()
+        if type(investing.get('filters')) is SavedFilter:
+            investing['filters'] = None  # Loaded again by filter_id
+        elif investing.get('filters'):
+            investing['filters'] = dict(investing['filters'])
+
+        return {
+            'investing': investing,
+            'user_settings': self.user_settings,
+            'investing_json': self.investing_json,
+            'investing_json_path': self.investing_json_path,
+            'profile_email': self.profile_email,
+            'profile_loaded': self.profile_loaded,
+            'is_dirty': self.is_dirty
+        }
+
+    def take_over(self, saved):
+        """
+        Use the settings from get_handoff()
+        """
+        self.snapshot = None
+        self.investing = saved['investing']
+        if self.investing.get('filters'):
+            self.investing['filters'] = Filter(filters=self.investing['filters'])
+        self.user_settings = saved['user_settings']
+        self.investing_json = saved['investing_json']
+        self.investing_json_path = saved['investing_json_path']
+        self.profile_email = saved['profile_email']
+        self.profile_loaded = saved['profile_loaded']
+        self.is_dirty = saved['is_dirty']
+
     def get_default_investing_settings(self):
         """
         Return the default investing settings dict
@@ -167,8 +303,16 @@ class Settings():
             default_file = os.path.join(this_path, 'settings.yaml')
             shutil.copy2(default_file, file_path)
 
-        # Read file
-        self.user_settings = yaml.load(open(file_path).read())
+        # Read file, filling in defaults for anything it doesn't set
+        self.snapshot = None
+        self.user_settings = copy.deepcopy(self.default_user_settings)
+        saved = yaml.load(open(file_path).read())
+        if type(saved) is dict:
+            for key, value in saved.iteritems():
+                if type(value) is dict and type(self.user_settings.get(key)) is dict:
+                    self.user_settings[key].update(value)
+                else:
+                    self.user_settings[key] = value
         return self.user_settings
 
     def process_json(self, jsonStr):
@@ -344,6 +488,16 @@ class Settings():
         Load the JSON settings file into investing_json dict
         """
         self.investing_json = self.read_investment_settings_file(file_path)
+        self.investing_json_path = file_path
+
+    def reload(self):
+        """
+        Reload the user settings and the investing profile from their files
+        """
+        self.get_user_settings()
+        self.load_investment_settings_file(self.investing_json_path)
+        if self.profile_loaded:
+            self.select_profile(self.profile_email)
 
 
     def select_profile(self, profile_email=None):
@@ -358,6 +512,7 @@ class Settings():
 
         # Reset investing settings from defaults
         self.investing = self.get_default_investing_settings()
+        self.snapshot = None
 
         # Get profile email from auth
         if profile_email is None:
@@ -366,6 +521,7 @@ class Settings():
             profile_email = self.auth['email']
 
         self.logger.debug('Select investing profile: {0}'.format(profile_email))
+        self.profile_email = profile_email
 
         # Get profile
         profile = None
@@ -550,6 +706,7 @@ class Settings():
             self.get_filter_settings()
 
         # Review summary
+        self.snapshot = None
         self.confirm_settings()
         return True
 
@@ -0,0 +1,552 @@
+#!/usr/bin/env python
+
+#
+# Runs the investor against a synthetic loan market, on simulated time
+#
+
+"""
+The MIT License (MIT)
+
+Copyright (c) 2013 Jeremy Gillick
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+import copy
+import time
+import yaml
+import random
+import logging
+from lendingclub import LendingClubError
+from lendingclub.filters import SavedFilter
+from lcinvestor import util
+from lcinvestor import market
+from lcinvestor.clock import Clock
+from lcinvestor.history import CycleHistory
+from lcinvestor.inventory import LoanInventory
+
+DAY = 86400
+
+# The default synthetic market. Any of these can be changed with a YAML market file.
+default_market = {
+    'seed': None,                 # Random seed, to repeat a simulation exactly
+    'cash': 0,                    # Cash in the account when the simulation starts
+    'initial_listings': 1000,     # Loans already listed when the simulation starts
+    'listings_per_day': 600,      # Average number of new loans listed each day
+    'release_hours': [6, 10, 14, 18],  # Hours of the day (Pacific time) new loans are released (empty to list them continuously)
+    'grades': {'A': 18, 'B': 30, 'C': 27, 'D': 14, 'E': 7, 'F': 3, 'G': 1},  # Relative share of each grade
+    'rates': {
+        'A': [5.3, 8.2],
+        'B': [9.4, 12.6],
+        'C': [13.3, 16.0],
+        'D': [16.9, 19.5],
+        'E': [19.9, 22.9],
+        'F': [23.4, 25.8],
+        'G': [25.9, 26.1]
+    },
+    'term_60_percent': 30,        # Percent of loans with a 60 month term
+    'loan_amount': [1000, 35000], # Range of loan amounts requested
+    'purposes': ['debt_consolidation', 'credit_card', 'home_improvement', 'major_purchase', 'small_business', 'other'],
+    'funding_hours': 48,          # Average time it takes other investors to fully fund a loan
+    'listing_days': 14,           # Loans are pulled if they aren't funded after this many days
+    'deposits_per_month': 1,      # Average number of deposits into the account each month
+    'deposit_amount': [500, 2000],  # Range of deposit amounts
+    'payment_percent': 3.0,       # Percent of the invested principal paid back each month
+    'payment_hour': 12,           # Average hour of the day that payments arrive
+    'payment_hour_stddev': 2,     # Standard deviation of the payment time, in hours
+    'payment_weekdays': [0, 1, 2, 3, 4, 5, 6]  # Days of the week that payments arrive on (0 is Monday)
+}
+
+
+def load_market_file(file_path=None):
+    """
+    Return the market config, with the values from the YAML market file, if there is one
+    """
+    config = copy.deepcopy(default_market)
+    if file_path is not None:
+        saved = yaml.load(open(file_path).read())
+        if type(saved) is not dict:
+            raise SimulationError('The market file \'{0}\' is not a dictionary of settings'.format(file_path))
+        config.update(saved)
+    return config
+
+
+class SimulatedClock(Clock):
+    """
+    A clock that runs on simulated time. Sleeping and waiting move time forward instantly.
+    on_end() is called once time passes the end timestamp.
+    """
+
+    def __init__(self, start=None, end=None, on_end=None):
+        self.now = start if start is not None else time.time()
+        self.end = end
+        self.on_end = on_end
+        self.ended = False
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.advance(seconds)
+
+    def wait(self, event, timeout):
+        if not event.is_set():
+            self.advance(timeout)
+        return event.is_set()
+
+    def advance(self, seconds):
+        """
+        Move time forward
+        """
+        self.now += max(0, seconds)
+        if self.end is not None and self.now >= self.end and not self.ended:
+            self.ended = True
+            if self.on_end is not None:
+                self.on_end()
+
+
+class SyntheticMarket:
+    """
+    A loan market that lists loans, funds them over time and deposits cash into the account,
+    all drawn from the distributions in the market config.
+    Everything happens lazily, when update() catches the market up to the clock.
+    """
+
+    def __init__(self, config=None, clock=None):
+        self.config = config if config is not None else copy.deepcopy(default_market)
+        self.clock = clock if clock is not None else SimulatedClock()
+        self.random = random.Random(self.config['seed'])
+        self.now = self.clock.time()
+
+        self.listings = []
+        self.inventory = LoanInventory()  # The listed loans, as the investor would see them
+        self.next_loan_id = 1
+        self.cash = float(self.config['cash'])
+        self.outstanding = 0.0  # Invested principal that has not been paid back
+
+        # Totals for the report
+        self.deposited = 0.0
+        self.paid = 0.0
+        self.invested = 0.0
+        self.invested_rate = 0.0  # Sum of rate * amount, for the average rate
+        self.notes = 0
+        self.orders = 0
+        self.unfilled = 0.0  # Amount ordered for loans that were already funded
+        self.cash_seconds = 0.0  # Integral of idle cash over time
+
+        # Grade weights
+        self.grades = sorted(self.config['grades'].keys())
+        self.grade_total = float(sum([self.config['grades'][g] for g in self.grades]))
+
+        # Schedule the first events
+        for i in xrange(self.config['initial_listings']):
+            self.add_listing(self.now - self.random.uniform(0, self.config['funding_hours'] * 3600))
+        self.next_listing = self.get_next_listing_time(self.now)
+        self.next_deposit = self.get_next_deposit_time(self.now)
+        self.next_payment = self.get_next_payment_time(self.now)
+
+    def get_next_listing_time(self, after):
+        """
+        When the next loan (or batch of loans, if there are release hours) is listed
+        """
+        hours = self.config['release_hours']
+        if not hours:
+            rate = self.config['listings_per_day'] / float(DAY)
+            return after + self.random.expovariate(rate) if rate > 0 else None
+
+        offset = util.get_pacific_offset(after)
+        day_start = after - ((after + offset) % DAY)
+        for day in [day_start, day_start + DAY]:
+            for hour in sorted(hours):
+                at = day + (hour * 3600)
+                if at > after:
+                    return at
+        return None
+
+    def get_next_deposit_time(self, after):
+        rate = self.config['deposits_per_month'] / (30.0 * DAY)
+        return after + self.random.expovariate(rate) if rate > 0 else None
+
+    def get_next_payment_time(self, after):
+        day_start = after - (after % DAY)
+        hour = self.random.gauss(self.config['payment_hour'], self.config['payment_hour_stddev'])
+        at = day_start + (min(max(hour, 0), 23.99) * 3600)
+        if at <= after:
+            at += DAY
+        if self.config['payment_weekdays']:
+            while time.gmtime(at).tm_wday not in self.config['payment_weekdays']:
+                at += DAY
+        return at
+
+    def add_listing(self, listed):
+        """
+        List a new loan, at the listed timestamp
+        """
+        pick = self.random.uniform(0, self.grade_total)
+        for grade in self.grades:
+            pick -= self.config['grades'][grade]
+            if pick <= 0:
+                break
+        low, high = self.config['rates'][grade]
+        low_amount, high_amount = self.config['loan_amount']
+        amount = int(self.random.uniform(low_amount, high_amount))
+
+        self.listings.append({
+            'loan_id': self.next_loan_id,
+            'loanGrade': '{0}{1}'.format(grade, self.random.randint(1, 5)),
+            'loanRate': round(self.random.uniform(low, high), 2),
+            'loanLength': 60 if self.random.uniform(0, 100) < self.config['term_60_percent'] else 36,
+            'loanAmountRequested': float(amount - (amount % 25)),
+            'purpose': self.random.choice(self.config['purposes']),
+            'listed': listed,
+            'funding_seconds': self.random.expovariate(1.0 / (self.config['funding_hours'] * 3600)),
+            'ours': 0.0
+        })
+        self.next_loan_id += 1
+
+    def get_unfunded(self, listing):
+        """
+        How much of the loan is left to fund, after other investors (and us) have invested
+        """
+        elapsed = self.now - listing['listed']
+        if elapsed >= listing['funding_seconds'] or elapsed >= self.config['listing_days'] * DAY:
+            return 0.0
+        others = listing['loanAmountRequested'] * (elapsed / listing['funding_seconds'])
+        unfunded = listing['loanAmountRequested'] - others - listing['ours']
+        return max(0.0, unfunded - (unfunded % 25))
+
+    def update(self):
+        """
+        Catch the market up to the clock, in the order things happened
+        """
+        now = self.clock.time()
+        while True:
+            events = [t for t in [self.next_listing, self.next_deposit, self.next_payment] if t is not None and t <= now]
+            if len(events) == 0:
+                break
+            at = min(events)
+            self.cash_seconds += self.cash * (at - self.now)
+            self.now = at
+
+            if at == self.next_listing:
+                if self.config['release_hours']:
+                    count = int(round(self.config['listings_per_day'] / float(len(self.config['release_hours']))))
+                else:
+                    count = 1
+                for i in xrange(count):
+                    self.add_listing(at)
+                self.next_listing = self.get_next_listing_time(at)
+
+            elif at == self.next_deposit:
+                low, high = self.config['deposit_amount']
+                amount = round(self.random.uniform(low, high), 2)
+                self.deposited += amount
+                self.cash += amount
+                self.next_deposit = self.get_next_deposit_time(at)
+
+            elif at == self.next_payment:
+                days = len(self.config['payment_weekdays'] or []) or 7
+                amount = round(self.outstanding * (self.config['payment_percent'] / 100.0) / 30 * (7.0 / days), 2)
+                self.outstanding -= amount
+                self.paid += amount
+                self.cash += amount
+                self.next_payment = self.get_next_payment_time(at)
+
+        self.cash_seconds += self.cash * (now - self.now)
+        self.now = now
+
+    def get_loans(self):
+        """
+        Return the loans that are still listed, in the format of LendingClub.search() results
+        """
+        loans = []
+        listed = []
+        for listing in self.listings:
+            unfunded = self.get_unfunded(listing)
+            if unfunded >= 25:
+                listed.append(listing)
+                loan = {
+                    'loanUnfundedAmount': unfunded,
+                    'alreadyInvestedIn': listing['ours'] > 0
+                }
+                for key in ['loan_id', 'loanGrade', 'loanRate', 'loanLength', 'loanAmountRequested', 'purpose']:
+                    loan[key] = listing[key]
+                loan['loanGUID'] = loan['loan_id']
+                loans.append(loan)
+
+        # Drop loans that are fully funded or expired
+        self.listings = listed
+        return loans
+
+    def get_inventory(self):
+        """
+        Return the inventory of listed loans, brought up to date with the changes since it was last read
+        """
+        self.inventory.sync(self.get_loans())
+        return self.inventory
+
+    def invest(self, loans):
+        """
+        Invest in a list of {'loan_id': ..., 'invest_amount': ...} dicts.
+        Loans that have been fully funded since they were found are skipped.
+        Returns the amount invested.
+        """
+        total = sum([loan['invest_amount'] for loan in loans])
+        if total > self.cash:
+            raise LendingClubError('Not enough cash in your account for this order')
+
+        listings = dict([(l['loan_id'], l) for l in self.listings])
+        invested = 0
+        for loan in loans:
+            listing = listings.get(loan['loan_id'])
+            amount = loan['invest_amount']
+            if listing is None or self.get_unfunded(listing) < amount:
+                self.unfilled += amount
+                continue
+
+            listing['ours'] += amount
+            invested += amount
+            self.invested_rate += listing['loanRate'] * amount
+            self.notes += 1
+
+        if invested == 0:
+            raise LendingClubError('None of the loans in this order are still available')
+
+        self.cash -= invested
+        self.outstanding += invested
+        self.invested += invested
+        self.orders += 1
+        return invested
+
+
+class SimulatedLendingClub:
+    """
+    Stands in for the LendingClub client, with the same methods the investor calls
+    """
+
+    def __init__(self, market):
+        self.market = market
+        self.calls = {}
+        self.portfolios = []
+        self.notes = []  # The most recent notes, newest first
+
+    def count(self, name):
+        self.calls[name] = self.calls.get(name, 0) + 1
+
+    def set_logger(self, logger):
+        pass
+
+    def authenticate(self, email=None, password=None):
+        self.count('authenticate')
+        return True
+
+    def is_site_available(self):
+        self.count('is_site_available')
+        return True
+
+    def get_cash_balance(self):
+        self.count('get_cash_balance')
+        self.market.update()
+        return round(self.market.cash, 2)
+
+    def get_investable_balance(self):
+        self.count('get_investable_balance')
+        self.market.update()
+        cash = int(self.market.cash)
+        return cash - (cash % 25)
+
+    def get_portfolio_list(self, names_only=False):
+        if names_only:
+            return list(self.portfolios)
+        return [{'portfolioName': name} for name in self.portfolios]
+
+    def get_saved_filters(self):
+        return []
+
+    def search(self, filters=None, start_index=0, limit=100):
+        self.count('search')
+        self.market.update()
+        inventory = self.market.get_inventory()
+        loans = [inventory.get_loan(row) for row in inventory.select(filters)]
+        return {
+            'totalRecords': len(loans),
+            'loans': loans[start_index:start_index + limit]
+        }
+
+    def build_portfolio(self, cash, max_per_note=25, min_percent=0, max_percent=20, filters=None, automatically_invest=False, do_not_clear_staging=False):
+        self.count('build_portfolio')
+        self.market.update()
+        return market.build_portfolio(self.market.get_inventory(), cash, max_per_note, min_percent, max_percent, filters)
+
+    def my_notes(self, start_index=0, limit=100, get_all=False, sort_by='loanId', sort_dir='asc'):
+        self.count('my_notes')
+        notes = sorted(self.notes, key=lambda note: note[sort_by], reverse=(sort_dir == 'desc'))
+        return {'loans': notes[start_index:start_index + limit], 'total': len(notes), 'result': 'success'}
+
+    def start_order(self):
+        return SimulatedOrder(self)
+
+
+class SimulatedOrder:
+    """
+    Stands in for lendingclub.Order
+    """
+
+    def __init__(self, lc):
+        self.lc = lc
+        self.loans = {}
+        self.order_id = 0
+
+    def add(self, loan_id, amount):
+        self.loans[loan_id] = amount
+
+    def add_batch(self, loans, batch_amount=None):
+        for loan in loans:
+            if type(loan) is dict:
+                self.add(loan['loan_id'], batch_amount or loan['invest_amount'])
+            else:
+                self.add(loan, batch_amount)
+
+    def execute(self, portfolio_name=None):
+        self.lc.count('order')
+        self.lc.market.update()
+        self.lc.market.invest([{'loan_id': loan_id, 'invest_amount': amount} for loan_id, amount in self.loans.iteritems()])
+
+        if portfolio_name and portfolio_name not in self.lc.portfolios:
+            self.lc.portfolios.append(portfolio_name)
+
+        # Only the last page of notes is kept, for checking orders (loans that were funded first are included)
+        self.order_id = self.lc.market.orders
+        notes = [{'loanId': loan_id, 'orderId': self.order_id, 'noteAmount': amount} for loan_id, amount in self.loans.iteritems()]
+        self.lc.notes = (notes + self.lc.notes)[:100]
+        return self.order_id
+
+
+class Simulation:
+    """
+    Runs the investment loop against a synthetic market for a number of simulated days
+    and reports on how well the cash was kept invested.
+    """
+
+    def __init__(self, investor, days=30, frequency=None):
+        self.investor = investor
+        self.lc = investor.lc
+        self.market = investor.lc.market
+        self.clock = investor.clock
+        self.days = days
+        self.frequency = frequency
+        self.elapsed = None
+
+    def run(self):
+        """
+        Run the simulation and return the results dict
+        """
+        settings = self.investor.settings
+        if self.frequency is not None:
+            settings.user_settings['frequency'] = self.frequency
+        settings.user_settings['listing_release_hours'] = self.market.config['release_hours']
+
+        # Saved filters live on LendingClub, so they can't be applied to simulated loans
+        if type(settings['filters']) is SavedFilter or settings['filter_id']:
+            self.investor.logger.warning('Saved filters can\'t be simulated, the simulation will invest in any loan')
+            settings.investing['filter_id'] = None
+            settings.investing['filters'] = False
+
+        # Only show errors, unless we're verbose
+        logger = logging.getLogger('investor')
+        level = logger.level
+        if not self.investor.verbose:
+            logger.setLevel(logging.ERROR)
+
+        self.market.update()
+        self.start = self.clock.time()
+        self.clock.end = self.start + (self.days * DAY)
+        self.clock.on_end = self.investor.stop
+        self.investor.simulated = True
+        if self.investor.history is None:
+            self.investor.history = CycleHistory(':memory:')
+
+        started = time.time()
+        try:
+            self.investor.investment_loop()
+        finally:
+            self.elapsed = time.time() - started
+            logger.setLevel(level)
+
+        self.market.update()
+        return self.get_results()
+
+    def get_results(self):
+        """
+        Return a dict of the simulation results
+        """
+        market = self.market
+        seconds = max(self.clock.time() - self.start, 1)
+        cycles = int(sum([totals.get('cycles', 0) for totals in self.investor.history.get_stats()['accounts'].values()]))
+        cash_in = market.config['cash'] + market.deposited + market.paid
+
+        return {
+            'days': seconds / float(DAY),
+            'elapsed': self.elapsed,
+            'cycles': cycles,
+            'cycles_per_second': cycles / self.elapsed if self.elapsed else None,
+            'searches': self.lc.calls.get('build_portfolio', 0),
+            'cached_searches': self.investor.portfolio_cache.hits,
+            'listing_checks': self.lc.calls.get('search', 0),
+            'orders': market.orders,
+            'notes': market.notes,
+            'deposited': market.deposited,
+            'paid': market.paid,
+            'invested': market.invested,
+            'unfilled': market.unfilled,
+            'average_rate': market.invested_rate / market.invested if market.invested else None,
+            'ending_cash': market.cash,
+            'average_cash': market.cash_seconds / seconds,
+            'average_wait_hours': (market.cash_seconds / cash_in) / 3600 if cash_in else 0.0
+        }
+
+    def get_report(self, results=None):
+        """
+        Return the results as a printable report
+        """
+        r = results if results is not None else self.get_results()
+
+        lines = [
+            'Simulated {0:.1f} days in {1:.2f} seconds ({2} cycles, {3:.0f} cycles/second)'.format(r['days'], r['elapsed'], r['cycles'], r['cycles_per_second'] or 0),
+            'Searches: {0} ({1} more from the cache, {2} listing checks), orders: {3}, notes: {4}'.format(r['searches'], r['cached_searches'], r['listing_checks'], r['orders'], r['notes']),
+            'Cash in: ${0:,.2f} deposited, ${1:,.2f} in payments'.format(r['deposited'], r['paid']),
+            'Invested: ${0:,.2f}'.format(r['invested'])
+        ]
+        if r['average_rate'] is not None:
+            lines[-1] += ' at an average rate of {0:.2f}%'.format(r['average_rate'])
+        if r['unfilled'] > 0:
+            lines.append('Missed: ${0:,.2f} ordered in loans that were funded before the order went through'.format(r['unfilled']))
+        lines.append('Cash drag: ${0:,.2f} sat idle on average, each dollar waited {1:.1f} hours to be invested'.format(r['average_cash'], r['average_wait_hours']))
+        lines.append('Ending cash: ${0:,.2f}'.format(r['ending_cash']))
+
+        return '\n'.join(lines)
+
+
+class SimulationError(Exception):
+
+    def __init__(self, value):
+        self.value = value
+
+    def __str__(self):
+        return repr(self.value)
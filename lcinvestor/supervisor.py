@@ -0,0 +1,561 @@
+#!/usr/bin/env python
+
+#
+# Runs many LendingClub accounts across a pool of worker processes
+#
+
+"""
+The MIT License (MIT)
+
+Copyright (c) 2013 Jeremy Gillick
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+import os
+import re
+import time
+import signal
+import yaml
+import Queue
+import bisect
+import hashlib
+import keyring
+import threading
+import multiprocessing
+from lcinvestor import util
+from lcinvestor import control
+from lcinvestor import AutoInvestor
+from lcinvestor.clock import Clock
+from lcinvestor.phases import next_deadline
+from lcinvestor.settings import Settings
+
+
+def hash_key(key):
+    """
+    Hash a key to a position on the ring
+    """
+    return int(hashlib.md5(str(key)).hexdigest()[:8], 16)
+
+
+class HashRing:
+    """
+    Consistent hashing of keys (accounts) to nodes (workers). Each node is placed on the ring
+    many times, so keys spread evenly and only the keys of a node that is added or removed move.
+    """
+
+    def __init__(self, nodes=None, replicas=100):
+        self.replicas = replicas
+        self.ring = []  # Sorted (hash, node) tuples
+        self.hashes = []
+        for node in nodes or []:
+            self.add(node)
+
+    def add(self, node):
+        for i in xrange(self.replicas):
+            bisect.insort(self.ring, (hash_key('{0}:{1}'.format(node, i)), node))
+        self.hashes = [h for h, n in self.ring]
+
+    def remove(self, node):
+        self.ring = [(h, n) for h, n in self.ring if n != node]
+        self.hashes = [h for h, n in self.ring]
+
+    def get_node(self, key):
+        """
+        Return the node that owns this key
+        """
+        if len(self.ring) == 0:
+            return None
+        i = bisect.bisect(self.hashes, hash_key(key)) % len(self.ring)
+        return self.ring[i][1]
+
+
+def load_fleet_file(file_path):
+    """
+    Load the accounts from a YAML fleet file and return them as a dict, by email.
+    i.e.
+        accounts:
+          - email: you@email.com
+            config: ./investing.json   # Optional, defaults to the saved profile for this email
+            password: mysecret         # Optional, defaults to the system keyring
+    """
+    saved = yaml.load(open(file_path).read())
+    if type(saved) is not dict or type(saved.get('accounts')) is not list:
+        raise SupervisorError('The fleet file \'{0}\' must have a list of accounts'.format(file_path))
+
+    accounts = {}
+    for account in saved['accounts']:
+        if type(account) is not dict or not account.get('email'):
+            raise SupervisorError('Each account in \'{0}\' needs an email'.format(file_path))
+        if account['email'] in accounts:
+            raise SupervisorError('{0} is in \'{1}\' more than once'.format(account['email'], file_path))
+
+        # Config files are relative to the fleet file
+        if account.get('config'):
+            account['config'] = os.path.join(os.path.dirname(os.path.abspath(file_path)), account['config'])
+        accounts[account['email']] = account
+    return accounts
+
+
+def create_investor(account):
+    """
+    Create the investor for a fleet account
+    """
+    email = account['email']
+    investor = AutoInvestor()
+
+    if account.get('config'):
+        investor.settings.load_investment_settings_file(account['config'])
+    if not investor.settings.select_profile(email):
+        raise SupervisorError('No investment settings for {0}, add a config file for it to the fleet file'.format(email))
+
+    password = account.get('password') or keyring.get_password('LendingClub', email)
+    if password is None:
+        raise SupervisorError('No password for {0} in the fleet file or the keyring (Name: LendingClub, Account: {0})'.format(email))
+
+    investor.settings['email'] = email
+    investor.settings['pass'] = password
+    use_account_files(investor, email)
+    investor.loop = True
+    return investor
+
+
+def use_account_files(investor, email):
+    """
+    Give the investor its own last investment, search stats, cash watch and order journal files, for a fleet account
+    """
+    file_name = re.sub(r'[^\w@.-]', '_', email)
+    investor.last_investment_file = 'last_investment.{0}.json'.format(file_name)
+    investor.last_investment = investor.get_last_investment()
+    investor.search_stats_file = 'search_stats.{0}.json'.format(file_name)
+    investor.cash_watch_file = 'cash_watch.{0}.json'.format(file_name)
+    investor.order_journal_file = 'orders.{0}.json'.format(file_name)
+
+
+def run_worker(worker_id, accounts, commands, results, investor_factory, log_file=None):
+    """
+    The worker process. Runs investment cycles for its accounts when the supervisor says to.
+    """
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # The supervisor decides when to stop
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)  # Not the supervisor's handler, so terminate() still works
+    util.start_logging()
+    if log_file:
+        util.log_to_file(log_file)
+    logger = util.create_logger()
+
+    investors = {}
+
+    def assign(accounts):
+        for email in investors.keys():
+            if email not in accounts:
+                del investors[email]
+        for email, account in accounts.iteritems():
+            if email not in investors:
+                try:
+                    investors[email] = investor_factory(account)
+                except Exception as e:
+                    logger.error('Worker {0} could not set up {1}: {2}'.format(worker_id, email, str(e)))
+                    results.put(('error', worker_id, email, str(e)))
+        logger.info('Worker {0} is running {1} account(s)'.format(worker_id, len(investors)))
+
+    assign(accounts)
+    while True:
+        command = commands.get()
+        if command[0] == 'stop':
+            break
+        elif command[0] == 'assign':
+            assign(command[1])
+        elif command[0] == 'warm_up':
+            investor = investors.get(command[1])
+            if investor is not None:
+                try:
+                    investor.warm_up()
+                except Exception as e:
+                    logger.exception('Warm-up for {0} failed'.format(command[1]))
+        elif command[0] == 'cycle':
+            email = command[1]
+            investor = investors.get(email)
+            started = time.time()
+            error = None
+            next_cycle = None
+            if investor is None:
+                error = 'Not set up'
+            else:
+                try:
+                    logger.info('Investment cycle for {0}'.format(email))
+                    investor.run_cycle()
+                    next_cycle = investor.get_watched_cycle()
+                except Exception as e:
+                    logger.exception('Investment cycle for {0} failed'.format(email))
+                    error = str(e)
+            results.put(('done', worker_id, email, started, time.time() - started, error, next_cycle))
+
+    util.stop_logging()
+
+
+class Worker:
+    """
+    The supervisor's record of a worker process
+    """
+
+    def __init__(self, worker_id):
+        self.id = worker_id
+        self.process = None
+        self.commands = None
+        self.accounts = {}
+        self.started = None
+        self.restarts = 0
+
+
+class Supervisor:
+    """
+    Runs the investment cycles of many accounts on a pool of worker processes.
+
+    Accounts are assigned to workers by consistent hashing, so adding or removing an account only
+    moves that account. The supervisor keeps the one schedule for every account and tells the
+    workers when to run each cycle. Workers that crash are restarted with the same accounts.
+    """
+
+    # Seconds between checks of the fleet file, and before restarting a worker that crashed
+    fleet_check_interval = 5
+    restart_delay = 5
+
+    log_file = None  # Write logs to this file, instead of the console (workers get their own files next to it)
+
+    def __init__(self, fleet_file, workers=None, investor_factory=create_investor, clock=None, app_dir=None):
+        self.fleet_file = fleet_file
+        self.worker_count = workers or multiprocessing.cpu_count()
+        self.investor_factory = investor_factory
+        self.clock = clock if clock is not None else Clock()
+        self.app_dir = app_dir if app_dir is not None else util.get_app_directory()
+        self.logger = util.create_logger()
+        self.settings = Settings(investor=None, settings_dir=self.app_dir, logger=self.logger)
+
+        self.ring = HashRing(range(self.worker_count))
+        self.workers = dict([(i, Worker(i)) for i in xrange(self.worker_count)])
+        self.results = multiprocessing.Queue()
+
+        self.accounts = {}
+        self.fleet_mtime = None
+        self.fleet_checked = 0
+        self.next_cycle = {}   # When each account's next cycle is due
+        self.in_flight = {}    # Accounts with a cycle running, and the worker running it
+        self.dispatched = {}   # When the cycles that are running were due
+        self.warmed = {}       # The cycle each account was last sent a warm-up for
+        self.last_cycle = {}   # The latency and error of each account's last cycle
+
+        self.running = False
+        self.paused = False
+        self.started = self.clock.time()
+        self.wake = threading.Event()
+        self.control_server = None
+
+    def get_period(self):
+        return self.settings['frequency'] * 60
+
+    def get_worker_log(self, worker_id):
+        if not self.log_file:
+            return None
+        base, ext = os.path.splitext(self.log_file)
+        return '{0}.worker{1}{2}'.format(base, worker_id, ext)
+
+    def load_fleet(self):
+        """
+        (Re)load the fleet file and rebalance the accounts across the workers
+        """
+        self.fleet_mtime = os.path.getmtime(self.fleet_file)
+        accounts = load_fleet_file(self.fleet_file)
+
+        added = [email for email in accounts if email not in self.accounts]
+        removed = [email for email in self.accounts if email not in accounts]
+        changed = [email for email in accounts if email in self.accounts and accounts[email] != self.accounts[email]]
+        self.accounts = accounts
+
+        # Spread the first cycle of new accounts across the period, so they don't all hit LendingClub at once
+        now = self.clock.time()
+        period = self.get_period()
+        for email in added:
+            self.next_cycle[email] = now + (hash_key(email) % 1000) / 1000.0 * period
+        for email in removed:
+            del self.next_cycle[email]
+            self.warmed.pop(email, None)
+
+        self.rebalance(changed)
+        if added or removed or changed:
+            self.logger.info('Fleet has {0} account(s): {1} added, {2} removed, {3} changed'.format(len(accounts), len(added), len(removed), len(changed)))
+
+    def rebalance(self, changed=None):
+        """
+        Assign each account to its worker, and send the new assignments to the workers that changed
+        """
+        shards = dict([(i, {}) for i in self.workers])
+        for email, account in self.accounts.iteritems():
+            shards[self.ring.get_node(email)][email] = account
+
+        for worker_id, worker in self.workers.iteritems():
+            shard = shards[worker_id]
+            moved = [email for email in (changed or []) if email in shard]
+            if shard != worker.accounts or moved:
+                if moved:
+                    # Drop changed accounts first, so the worker sets them up again
+                    worker.accounts = dict([(e, a) for e, a in worker.accounts.iteritems() if e not in moved])
+                    self.send(worker, ('assign', worker.accounts))
+                worker.accounts = shard
+                self.send(worker, ('assign', shard))
+
+    def send(self, worker, command):
+        if worker.process is not None and worker.process.is_alive():
+            worker.commands.put(command)
+
+    def start_worker(self, worker):
+        worker.commands = multiprocessing.Queue()
+        worker.process = multiprocessing.Process(target=run_worker, name='lcinvestor-worker{0}'.format(worker.id),
+            args=(worker.id, worker.accounts, worker.commands, self.results, self.investor_factory, self.get_worker_log(worker.id)))
+        worker.process.daemon = True
+        worker.process.start()
+        worker.started = self.clock.time()
+        self.logger.info('Started worker {0} (pid {1}) with {2} account(s)'.format(worker.id, worker.process.pid, len(worker.accounts)))
+
+    def check_workers(self):
+        """
+        Restart any workers that have died
+        """
+        for worker in self.workers.values():
+            if worker.process is not None and not worker.process.is_alive():
+                if self.clock.time() - worker.started < self.restart_delay:
+                    continue
+                self.logger.error('Worker {0} exited unexpectedly (exit code {1}), restarting it'.format(worker.id, worker.process.exitcode))
+
+                # Cycles that were running on it are lost
+                for email, worker_id in self.in_flight.items():
+                    if worker_id == worker.id:
+                        del self.in_flight[email]
+                        self.dispatched.pop(email, None)
+
+                worker.restarts += 1
+                self.start_worker(worker)
+
+    def check_fleet_file(self):
+        """
+        Reload the fleet file if it has changed
+        """
+        now = self.clock.time()
+        if now - self.fleet_checked < self.fleet_check_interval:
+            return
+        self.fleet_checked = now
+
+        try:
+            if os.path.getmtime(self.fleet_file) != self.fleet_mtime:
+                self.load_fleet()
+        except Exception as e:
+            self.logger.error('Could not reload the fleet file: {0}'.format(str(e)))
+
+    def collect_results(self):
+        """
+        Record the cycles the workers have finished
+        """
+        while True:
+            try:
+                result = self.results.get_nowait()
+            except Queue.Empty:
+                break
+
+            if result[0] == 'done':
+                kind, worker_id, email, started, latency, error, next_cycle = result
+                self.in_flight.pop(email, None)
+                due = self.dispatched.pop(email, None)
+
+                # How late the cycle started, waiting for the worker to get to it
+                lag = max(0.0, started - due) if due is not None else None
+                self.cycle_finished(email, latency, error, lag)
+
+                # The account's cash watcher knows when cash is likely to arrive
+                if next_cycle is not None and email in self.next_cycle:
+                    self.next_cycle[email] = next_cycle
+            elif result[0] == 'error':
+                kind, worker_id, email, error = result
+                self.cycle_finished(email, None, error, None)
+
+    def cycle_finished(self, email, latency, error, lag):
+        """
+        Record an account's cycle that finished, or an account that a worker couldn't set up
+        """
+        self.last_cycle[email] = {'latency': latency, 'error': error, 'lag': lag, 'finished': self.clock.time()}
+
+    def dispatch(self):
+        """
+        Send the cycles that are due to the workers that own those accounts
+        """
+        if self.paused:
+            return
+
+        now = self.clock.time()
+        period = self.get_period()
+        warm_up = self.settings['warm_up_seconds'] or 0
+        for email, due in self.next_cycle.iteritems():
+            if email in self.in_flight:
+                continue
+
+            # Log in ahead of the cycle, so it starts with the balance check
+            if due > now:
+                if warm_up and due - warm_up <= now and self.warmed.get(email) != due:
+                    self.send(self.workers[self.ring.get_node(email)], ('warm_up', email))
+                    self.warmed[email] = due
+                continue
+
+            worker = self.workers[self.ring.get_node(email)]
+            self.send(worker, ('cycle', email))
+            self.in_flight[email] = worker.id
+            self.dispatched[email] = due
+            self.next_cycle[email] = next_deadline(due, period, now)[0]
+
+    def run(self):
+        """
+        Start the workers and run the schedule until stopped.
+        This is used by python-runner, like AutoInvestor.run()
+        """
+        util.start_logging()
+        if self.log_file:
+            util.log_to_file(self.log_file)
+
+        self.running = True
+        self.load_fleet()
+        for worker in self.workers.values():
+            self.start_worker(worker)
+        self.start_control_server()
+
+        try:
+            while self.running:
+                self.collect_results()
+                self.check_workers()
+                self.check_fleet_file()
+                self.dispatch()
+                self.clock.wait(self.wake, 1)
+                self.wake.clear()
+        finally:
+            self.stop_control_server()
+            self.stop_workers()
+
+    def stop(self):
+        self.running = False
+        self.wake.set()
+
+    def stop_workers(self, timeout=30):
+        """
+        Ask the workers to stop, once their current cycle is done, and terminate any that don't
+        """
+        for worker in self.workers.values():
+            self.send(worker, ('stop',))
+
+        deadline = time.time() + timeout
+        for worker in self.workers.values():
+            if worker.process is not None:
+                worker.process.join(max(0, deadline - time.time()))
+                if worker.process.is_alive():
+                    self.logger.warning('Worker {0} did not stop, terminating it'.format(worker.id))
+                    worker.process.terminate()
+                    worker.process.join()
+
+    def start_control_server(self):
+        if not control.is_supported():
+            return
+        try:
+            self.control_server = control.ControlServer(self, control.get_socket_path(self.app_dir))
+            self.control_server.start()
+        except Exception as e:
+            self.control_server = None
+            self.logger.warning('Could not open the control socket: {0}'.format(str(e)))
+
+    def stop_control_server(self):
+        if self.control_server is not None:
+            self.control_server.stop()
+            self.control_server = None
+
+    def handle_command(self, command):
+        """
+        Handle a command from the control socket and return a response dict
+        """
+        if command == 'invest-now':
+            now = self.clock.time()
+            for email in self.next_cycle:
+                self.next_cycle[email] = min(self.next_cycle[email], now)
+            self.wake.set()
+            return {'result': 'success', 'message': 'Investment cycles queued for {0} account(s)'.format(len(self.next_cycle))}
+        elif command == 'pause':
+            self.paused = True
+            return {'result': 'success', 'message': 'Paused'}
+        elif command == 'resume':
+            self.paused = False
+            self.wake.set()
+            return {'result': 'success', 'message': 'Resumed'}
+        elif command == 'reload':
+            self.fleet_mtime = None
+            self.fleet_checked = 0
+            self.settings.get_user_settings()
+            self.wake.set()
+            return {'result': 'success', 'message': 'The fleet file and settings will be reloaded'}
+        elif command == 'stop':
+            self.stop()
+            return {'result': 'success', 'message': 'Stopping'}
+        elif command == 'status':
+            return {'result': 'success', 'message': 'running', 'status': self.get_status()}
+
+        return {'result': 'error', 'message': 'Unknown command \'{0}\''.format(command)}
+
+    def get_status(self):
+        """
+        Return a dict describing the fleet
+        """
+        workers = []
+        for worker in self.workers.values():
+            workers.append({
+                'id': worker.id,
+                'pid': worker.process.pid if worker.process else None,
+                'alive': worker.process is not None and worker.process.is_alive(),
+                'restarts': worker.restarts,
+                'accounts': sorted(worker.accounts.keys())
+            })
+
+        accounts = []
+        for email in sorted(self.accounts.keys()):
+            accounts.append({
+                'email': email,
+                'worker': self.ring.get_node(email),
+                'next_cycle': self.next_cycle.get(email),
+                'in_cycle': email in self.in_flight,
+                'last_cycle': self.last_cycle.get(email)
+            })
+
+        return {
+            'fleet': True,
+            'pid': os.getpid(),
+            'started': self.started,
+            'paused': self.paused,
+            'workers': workers,
+            'accounts': accounts
+        }
+
+
+class SupervisorError(Exception):
+
+    def __init__(self, value):
+        self.value = value
+
+    def __str__(self):
+        return repr(self.value)
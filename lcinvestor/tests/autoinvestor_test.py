@@ -7,6 +7,7 @@ import subprocess
 import urllib
 import traceback
 import shutil
+import tempfile
 from time import sleep
 
 sys.path.insert(0, '.')
@@ -15,6 +16,7 @@ sys.path.insert(0, '../../')
 from lcinvestor import util
 from lcinvestor import AutoInvestor
 from lcinvestor.settings import Settings
+from lcinvestor.tests.fake_lendingclub import FakeLendingClub
 
 
 class TestInvestorUtils(unittest.TestCase):
@@ -25,7 +27,11 @@ class TestInvestorUtils(unittest.TestCase):
 
     def setUp(self):
         self.count = 0
-        self.investor = AutoInvestor()
+        self.app_dir = tempfile.mkdtemp()
+        self.investor = AutoInvestor(lc=FakeLendingClub(), app_dir=self.app_dir)
+
+    def tearDown(self):
+        shutil.rmtree(self.app_dir)
 
     def assertStrictEqual(self, first, second, msg=None):
         isSame = first == second and type(first) == type(second)
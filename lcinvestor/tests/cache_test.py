@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+
+import sys
+import unittest
+
+sys.path.insert(0, '.')
+sys.path.insert(0, '../')
+sys.path.insert(0, '../../')
+from lcinvestor import util
+from lcinvestor.cache import PortfolioCache
+
+
+class TestPortfolioCache(unittest.TestCase):
+    """ Tests caching portfolio searches """
+
+    def setUp(self):
+        self.now = 0
+        self.cache = PortfolioCache(max_entries=2, max_age=100, clock=lambda: self.now)
+
+    def test_hits_and_misses(self):
+        self.assertEqual(self.cache.get(500, 1), None)
+        self.cache.put(500, 1, False)
+        self.cache.put(400, 1, {'percentage': 15})
+
+        self.assertEqual(self.cache.get(500, 1), False)
+        self.assertEqual(self.cache.get(400, 1), {'percentage': 15})
+
+        status = self.cache.status()
+        self.assertEqual(status['hits'], 2)
+        self.assertEqual(status['negative_hits'], 1)
+        self.assertEqual(status['misses'], 1)
+        self.assertAlmostEqual(status['hit_rate'], 66.67, 2)
+
+    def test_new_listing(self):
+        self.cache.put(500, 1, False)
+        self.assertEqual(self.cache.get(500, 2), None)
+        self.assertEqual(self.cache.status()['entries'], 0)
+
+        # Nothing is cached without a listing version
+        self.cache.put(500, None, False)
+        self.assertEqual(self.cache.get(500, None), None)
+
+    def test_max_age(self):
+        self.cache.put(500, 1, False)
+        self.now = 101
+        self.assertEqual(self.cache.get(500, 1), None)
+
+    def test_least_recently_used(self):
+        self.cache.put(500, 1, False)
+        self.cache.put(400, 1, False)
+        self.cache.get(500, 1)
+        self.cache.put(300, 1, False)
+
+        self.assertEqual(self.cache.get(400, 1), None)
+        self.assertEqual(self.cache.get(500, 1), False)
+        self.assertEqual(self.cache.status()['evictions'], 1)
+
+    def test_clear(self):
+        self.cache.put(500, 1, False)
+        self.cache.clear()
+        self.assertEqual(self.cache.get(500, 1), None)
+
+
+class TestReleaseSlot(unittest.TestCase):
+    """ Tests tracking when LendingClub lists new loans """
+
+    def test_release_slot(self):
+        midnight = 1420099200  # Jan 1st 2015, Pacific time
+        hours = [6, 10, 14, 18]
+        slot = util.get_release_slot(midnight, hours)
+
+        self.assertEqual(util.get_release_slot(midnight + (5 * 3600), hours), slot)
+        self.assertEqual(util.get_release_slot(midnight + (6 * 3600), hours), slot + 1)
+        self.assertEqual(util.get_release_slot(midnight + (19 * 3600), hours), slot + 4)
+        self.assertEqual(util.get_release_slot(midnight + (24 * 3600), hours), slot + 4)
+        self.assertEqual(util.get_release_slot(midnight, []), None)
+
+    def test_pacific_offset(self):
+        self.assertEqual(util.get_pacific_offset(1420099200), -8 * 3600)  # January
+        self.assertEqual(util.get_pacific_offset(1435734000), -7 * 3600)  # July
+
+
+if __name__ == '__main__':
+    unittest.main()
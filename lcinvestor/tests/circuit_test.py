@@ -0,0 +1,66 @@
+#!/usr/bin/env python
+
+import sys
+import unittest
+
+sys.path.insert(0, '.')
+sys.path.insert(0, '../')
+sys.path.insert(0, '../../')
+from lcinvestor.circuit import CircuitBreaker, CircuitOpenError, CLOSED, OPEN, HALF_OPEN
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    """ Tests the circuit breaker states """
+
+    now = 0
+
+    def setUp(self):
+        self.now = 1000
+        self.circuit = CircuitBreaker('search', threshold=2, cooldown=60, clock=lambda: self.now)
+
+    def raise_error(self):
+        raise Exception('Site is down')
+
+    def test_opens_after_threshold(self):
+        self.assertRaises(Exception, self.circuit.call, self.raise_error)
+        self.assertEqual(self.circuit.state, CLOSED)
+
+        self.assertRaises(Exception, self.circuit.call, self.raise_error)
+        self.assertEqual(self.circuit.state, OPEN)
+        self.assertEqual(self.circuit.retry_at(), 1060)
+
+    def test_open_fails_fast(self):
+        self.circuit.failure()
+        self.circuit.failure()
+
+        calls = []
+        self.assertRaises(CircuitOpenError, self.circuit.call, lambda: calls.append(1))
+        self.assertEqual(len(calls), 0)
+
+    def test_half_open_trial(self):
+        self.circuit.failure()
+        self.circuit.failure()
+
+        # Failed trial reopens for another cooldown
+        self.now = 1060
+        self.assertTrue(self.circuit.allow())
+        self.assertEqual(self.circuit.state, HALF_OPEN)
+        self.assertRaises(Exception, self.circuit.call, self.raise_error)
+        self.assertEqual(self.circuit.state, OPEN)
+        self.assertFalse(self.circuit.allow())
+
+        # Successful trial closes it
+        self.now = 1120
+        self.assertEqual(self.circuit.call(lambda: 'ok'), 'ok')
+        self.assertEqual(self.circuit.state, CLOSED)
+        self.assertEqual(self.circuit.failures, 0)
+
+    def test_success_resets_failures(self):
+        self.circuit.failure()
+        self.circuit.success()
+        self.circuit.failure()
+        self.assertEqual(self.circuit.state, CLOSED)
+
+
+if __name__ == '__main__':
+    unittest.main()
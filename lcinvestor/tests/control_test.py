@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+
+import sys
+import os
+import shutil
+import tempfile
+import unittest
+
+sys.path.insert(0, '.')
+sys.path.insert(0, '../')
+sys.path.insert(0, '../../')
+from lcinvestor import control
+
+
+class TestInvestor():
+    """ Records the commands passed to it from the control server """
+
+    def __init__(self):
+        self.commands = []
+
+    def handle_command(self, command):
+        self.commands.append(command)
+        return {'result': 'success', 'message': command}
+
+
+class TestControlSocket(unittest.TestCase):
+    """ Tests sending commands over the control socket """
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = control.get_socket_path(self.tmp_dir)
+        self.investor = TestInvestor()
+        self.server = control.ControlServer(self.investor, self.path)
+        self.server.start()
+
+    def tearDown(self):
+        self.server.stop()
+        shutil.rmtree(self.tmp_dir)
+
+    def test_send_command(self):
+        response = control.send_command(self.path, 'invest-now')
+        self.assertEqual(response['result'], 'success')
+        self.assertEqual(self.investor.commands, ['invest-now'])
+
+    def test_already_listening(self):
+        self.assertTrue(control.is_listening(self.path))
+        self.assertRaises(control.ControlError, control.ControlServer, self.investor, self.path)
+
+    def test_stop_removes_socket(self):
+        self.server.stop()
+        self.assertFalse(os.path.exists(self.path))
+        self.assertRaises(control.ControlError, control.send_command, self.path, 'pause')
+
+    def test_hand_off(self):
+        control.send_command(self.path, 'pause')
+        fd = os.dup(self.server.hand_off())  # What the new process would inherit
+        self.server.server_close()
+        self.assertTrue(os.path.exists(self.path))
+
+        # The next server answers on the same socket
+        self.server = control.ControlServer(self.investor, self.path, fd)
+        self.server.start()
+        control.send_command(self.path, 'resume')
+        self.assertEqual(self.investor.commands, ['pause', 'resume'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,311 @@
+#!/usr/bin/env python
+#
+# An in-process stand-in for the LendingClub client, for tests
+#
+
+import os
+import sys
+import json
+
+sys.path.insert(0, '.')
+sys.path.insert(0, '../')
+sys.path.insert(0, '../../')
+import lendingclub
+from lendingclub import LendingClubError
+from lendingclub.session import AuthenticationError
+from lcinvestor import market
+from lcinvestor.clock import Clock
+from lcinvestor.inventory import LoanInventory
+
+# The example responses from the lendingclub package's own tests. The fake's responses are
+# built on them, so they have the same fields and types as the real ones (i.e. loanRate is a string).
+ASSETS_DIR = os.path.join(os.path.dirname(lendingclub.__file__), 'tests', 'assets')
+
+
+def load_asset(file_name):
+    f = open(os.path.join(ASSETS_DIR, file_name), 'r')
+    asset = json.loads(f.read())
+    f.close()
+    return asset
+
+SEARCH_LOAN = load_asset('browseNotesAj_1.json')['searchresult']['loans'][0]
+MATCH_OPTION = load_asset('lendingMatchOptionsV2.json')['lmOptions'][0]
+LOAN_FRACTION = load_asset('portfolio_getPortfolio.json')['loanFractions'][0]
+
+
+def create_loans(count=100, amount=5000, rate=10.0, grade='B', term=36, start_id=1000):
+    """
+    Return a list of loans, in the format of LendingClub.search() results, with rates
+    going up by 0.1% from rate
+    """
+    loans = []
+    for i in xrange(count):
+        loans.append({
+            'loan_id': start_id + i,
+            'loanGUID': start_id + i,
+            'loanGrade': '{0}{1}'.format(grade, (i % 5) + 1),
+            'loanRate': round(rate + (i * 0.1), 2),
+            'loanLength': term,
+            'loanAmountRequested': amount,
+            'loanUnfundedAmount': amount,
+            'alreadyInvestedIn': False,
+            'purpose': 'debt_consolidation'
+        })
+    return loans
+
+
+def to_search_loan(loan):
+    """
+    Return a loan the way LendingClub.search() does: as LendingClub sends it, with the
+    loan_id the client adds from loanGUID
+    """
+    wire = dict(SEARCH_LOAN)
+    wire.update({
+        'loanGUID': str(loan['loan_id']),
+        'loanGrade': loan['loanGrade'],
+        'loanRate': '{0:.2f}'.format(loan['loanRate']),
+        'loanLength': int(loan['loanLength']),
+        'loanAmt': int(loan['loanAmountRequested']),
+        'loanAmountRequested': int(loan['loanAmountRequested']),
+        'loanUnfundedAmount': int(loan['loanUnfundedAmount']),
+        'loanAmtRemaining': int(loan['loanUnfundedAmount']),
+        'alreadyInvestedIn': bool(loan['alreadyInvestedIn']),
+        'purpose': loan['purpose']
+    })
+    wire['loan_id'] = int(wire['loanGUID'])
+    return wire
+
+
+def to_portfolio(portfolio, loans):
+    """
+    Return a portfolio from market.build_portfolio() the way LendingClub.build_portfolio() does:
+    the portfolio option LendingClub sent, with its loan fractions and the invest_amount the client adds
+    """
+    option = dict(MATCH_OPTION)
+    option.update(dict([(key, value) for key, value in portfolio.iteritems() if key != 'loan_fractions']))
+    option['loan_fractions'] = []
+    for fraction in portfolio['loan_fractions']:
+        loan = loans[fraction['loan_id']]
+        wire = dict(LOAN_FRACTION)
+        wire.update({
+            'loan_id': int(fraction['loan_id']),
+            'loanGrade': fraction['loanGrade'],
+            'loanRate': '{0:.2f}'.format(fraction['loanRate']),
+            'loanLength': int(fraction['loanLength']),
+            'loanAmountRequested': int(loan['loanAmountRequested']),
+            'loanUnfundedAmount': int(loan['loanUnfundedAmount']),
+            'alreadyInvestedIn': bool(loan['alreadyInvestedIn']),
+            'purpose': loan['purpose'],
+            'loanFractionAmount': fraction['loanFractionAmount']
+        })
+        wire['invest_amount'] = wire['loanFractionAmount']
+        option['loan_fractions'].append(wire)
+    return option
+
+
+class FakeLendingClub:
+    """
+    Stands in for the LendingClub client, with every method the investor calls, and no network.
+
+    The account (cash, listed loans, portfolios and saved filters) is kept in memory and orders
+    change it, like the real site. Searches and portfolios are returned with LendingClub's field
+    types, but the listed loans are kept as create_loans() makes them. Any method can be scripted to return other responses, and
+    to take time on the clock, i.e.:
+
+        lc = FakeLendingClub(cash=1000, loans=create_loans())
+        lc.script('authenticate', AuthenticationError('Bad password'), True)  # Fail once, then succeed
+        lc.latency['build_portfolio'] = 20  # Every search takes 20 seconds
+    """
+
+    def __init__(self, email='test@test.com', password='testpassword', cash=0, loans=None, portfolios=None, saved_filters=None, clock=None):
+        self.email = email
+        self.password = password
+        self.cash = cash
+        self.loans = loans if loans is not None else []
+        self.portfolios = list(portfolios or [])
+        self.saved_filters = list(saved_filters or [])
+        self.clock = clock if clock is not None else Clock()
+
+        self.available = True
+        self.authed = False
+        self.logger = None
+
+        self.scripts = {}  # Method name to the responses left to give
+        self.latency = {}  # Method name to the seconds each call takes
+        self.calls = []    # (method name, args) of every call, in order
+        self.staged = []   # Loans staged by the last build_portfolio, as (loan_id, amount)
+        self.orders = []   # Every order placed, as {'order_id', 'loans', 'portfolio'}
+        self.next_order_id = 1000
+
+    def script(self, name, *responses):
+        """
+        Give these responses to the next calls to a method, in order, then go back to the usual ones.
+        Exceptions are raised, functions are called with the method's arguments, and anything else is returned.
+        """
+        self.scripts.setdefault(name, []).extend(responses)
+
+    def count(self, name):
+        """
+        The number of times a method has been called
+        """
+        return len([call for call in self.calls if call[0] == name])
+
+    def call(self, name, args, respond):
+        """
+        Record a call, wait out its latency and return the next scripted response,
+        or the result of respond(*args) if there isn't one
+        """
+        self.calls.append((name, args))
+        if self.latency.get(name):
+            self.clock.sleep(self.latency[name])
+
+        response = respond
+        if self.scripts.get(name):
+            response = self.scripts[name].pop(0)
+
+        if isinstance(response, Exception):
+            raise response
+        if callable(response):
+            return response(*args)
+        return response
+
+    def set_logger(self, logger):
+        self.logger = logger
+
+    def authenticate(self, email=None, password=None):
+        return self.call('authenticate', (email, password), self.check_auth)
+
+    def check_auth(self, email, password):
+        if email != self.email or password != self.password:
+            self.authed = False
+            raise AuthenticationError('Email or password is invalid')
+        self.authed = True
+        return True
+
+    def is_site_available(self):
+        return self.call('is_site_available', (), lambda: self.available)
+
+    def get_cash_balance(self):
+        return self.call('get_cash_balance', (), lambda: round(self.cash, 2))
+
+    def get_investable_balance(self):
+        def respond():
+            cash = int(self.cash)
+            return cash - (cash % 25)
+        return self.call('get_investable_balance', (), respond)
+
+    def get_portfolio_list(self, names_only=False):
+        def respond(names_only):
+            if names_only:
+                return list(self.portfolios)
+            return [{'portfolioName': name} for name in self.portfolios]
+        return self.call('get_portfolio_list', (names_only,), respond)
+
+    def get_saved_filters(self):
+        return self.call('get_saved_filters', (), lambda: list(self.saved_filters))
+
+    def get_saved_filter(self, filter_id):
+        def respond(filter_id):
+            for saved in self.saved_filters:
+                if str(saved.id) == str(filter_id):
+                    return saved
+            raise LendingClubError('No saved filter with the ID {0}'.format(filter_id))
+        return self.call('get_saved_filter', (filter_id,), respond)
+
+    def search(self, filters=None, start_index=0, limit=100):
+        def respond(filters, start_index, limit):
+            inventory = LoanInventory.from_loans(self.loans)
+            loans = [to_search_loan(inventory.get_loan(row)) for row in inventory.select(filters)]
+            return {
+                'totalRecords': len(loans),
+                'loans': loans[start_index:start_index + limit]
+            }
+        return self.call('search', (filters, start_index, limit), respond)
+
+    def my_notes(self, start_index=0, limit=100, get_all=False, sort_by='loanId', sort_dir='asc'):
+        def respond(start_index, limit, sort_by, sort_dir):
+            notes = []
+            for order in self.orders:
+                for loan_id, amount in order['loans'].iteritems():
+                    notes.append({'loanId': loan_id, 'orderId': order['order_id'], 'noteAmount': amount, 'portfolioName': order['portfolio']})
+            notes.sort(key=lambda note: note[sort_by], reverse=(sort_dir == 'desc'))
+            return {'loans': notes[start_index:start_index + limit], 'total': len(notes), 'result': 'success'}
+        return self.call('my_notes', (start_index, limit, sort_by, sort_dir), respond)
+
+    def build_portfolio(self, cash, max_per_note=25, min_percent=0, max_percent=20, filters=None, automatically_invest=False, do_not_clear_staging=False):
+        def respond(cash, max_per_note, min_percent, max_percent, filters):
+            portfolio = market.build_portfolio(self.loans, cash, max_per_note, min_percent, max_percent, filters)
+            if not portfolio:
+                return portfolio
+            portfolio = to_portfolio(portfolio, dict([(loan['loan_id'], loan) for loan in self.loans]))
+            self.staged = [(loan['loan_id'], loan['invest_amount']) for loan in portfolio['loan_fractions']]
+            return portfolio
+        return self.call('build_portfolio', (cash, max_per_note, min_percent, max_percent, filters), respond)
+
+    def start_order(self):
+        return self.call('start_order', (), lambda: FakeOrder(self))
+
+    def place_order(self, loans, portfolio_name=None):
+        """
+        Invest in the loans ({loan_id: amount}) and return the order ID, or raise LendingClubError
+        if there isn't enough cash or a loan doesn't have room for the note
+        """
+        total = sum(loans.values())
+        if total > self.cash:
+            raise LendingClubError('Not enough cash for this order: ${0} of ${1}'.format(self.cash, total))
+
+        listed = dict([(loan['loan_id'], loan) for loan in self.loans])
+        for loan_id, amount in loans.iteritems():
+            if loan_id not in listed or listed[loan_id]['loanUnfundedAmount'] < amount:
+                raise LendingClubError('Loan {0} can not take a ${1} note'.format(loan_id, amount))
+
+        for loan_id, amount in loans.iteritems():
+            listed[loan_id]['loanUnfundedAmount'] -= amount
+            listed[loan_id]['alreadyInvestedIn'] = True
+        self.cash -= total
+        self.staged = []
+
+        if portfolio_name and portfolio_name not in self.portfolios:
+            self.portfolios.append(portfolio_name)
+
+        order_id = self.next_order_id
+        self.next_order_id += 1
+        self.orders.append({'order_id': order_id, 'loans': dict(loans), 'portfolio': portfolio_name})
+        return order_id
+
+
+class FakeOrder:
+    """
+    Stands in for lendingclub.Order
+    """
+
+    def __init__(self, lc):
+        self.lc = lc
+        self.loans = {}
+        self.order_id = 0
+
+    def add(self, loan_id, amount):
+        self.loans[loan_id] = amount
+
+    def update(self, loan_id, amount):
+        self.add(loan_id, amount)
+
+    def add_batch(self, loans, batch_amount=None):
+        for loan in loans:
+            if type(loan) is dict:
+                self.add(loan['loan_id'], batch_amount or loan['invest_amount'])
+            else:
+                self.add(loan, batch_amount)
+
+    def remove(self, loan_id):
+        self.loans.pop(loan_id, None)
+
+    def remove_all(self):
+        self.loans = {}
+
+    def execute(self, portfolio_name=None):
+        assert self.order_id == 0, 'This order has already been place. Start a new order.'
+        assert len(self.loans) > 0, 'There aren\'t any loans in your order'
+
+        self.order_id = self.lc.call('execute', (self.loans, portfolio_name), self.lc.place_order)
+        return self.order_id
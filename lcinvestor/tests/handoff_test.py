@@ -0,0 +1,118 @@
+#!/usr/bin/env python
+
+import os
+import sys
+import shutil
+import tempfile
+import threading
+import unittest
+
+sys.path.insert(0, '.')
+sys.path.insert(0, '../')
+sys.path.insert(0, '../../')
+from lcinvestor import handoff
+from lcinvestor import loadtest
+from lcinvestor.simulation import SimulatedClock
+
+
+class TestHandoff(unittest.TestCase):
+    """ Tests passing state to the process that replaces this one """
+
+    def test_read(self):
+        fds = handoff.write_handoff({'next_cycle': 1400000000}, {'pass': 'secret'})
+        state, secrets = handoff.read_handoff(fds)
+        self.assertEqual(state['next_cycle'], 1400000000)
+        self.assertEqual(secrets['pass'], 'secret')
+
+        # They're closed once read
+        for fd in fds.split(','):
+            self.assertRaises(OSError, os.fstat, int(fd))
+
+    def test_not_fds(self):
+        self.assertRaises(handoff.HandoffError, handoff.read_handoff, 'abc')
+        self.assertRaises(handoff.HandoffError, handoff.read_handoff, '9999,9998')
+
+
+class TestTakeOver(unittest.TestCase):
+    """ Tests an investor carrying on from one that restarted, against the load test's stub site """
+
+    def setUp(self):
+        self.app_dir = tempfile.mkdtemp()
+        self.account = loadtest.StubAccount('test@loadtest.local', 'lump', 60)
+        self.stub = loadtest.StubLendingClub([self.account])
+        self.server = loadtest.StubServer(self.stub)
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+        self.investors = []
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        for investor in self.investors:
+            if investor.history is not None:
+                investor.history.close()
+        shutil.rmtree(self.app_dir)
+
+    def create_investor(self):
+        investor = loadtest.create_investor({
+            'email': self.account.email,
+            'password': loadtest.PASSWORD,
+            'profile': 'balanced',
+            'url': self.server.get_url(),
+            'app_dir': self.app_dir,
+            'frequency': 1
+        })
+        investor.clock = SimulatedClock()  # Don't wait before each order
+        investor.loop = True
+        self.investors.append(investor)
+        return investor
+
+    def hand_off(self, investor):
+        """
+        Hand off the investor's state to a new one, like a restart
+        """
+        fds = handoff.write_handoff(*investor.get_handoff())
+        state, secrets = handoff.read_handoff(fds)
+
+        new_investor = self.create_investor()
+        new_investor.settings.auth['pass'] = None
+        new_investor.take_over(state, secrets)
+        return new_investor
+
+    def test_takes_over(self):
+        investor = self.create_investor()
+        investor.run_cycle()
+        self.assertEqual(investor.last_outcome, 'invested')
+
+        investor.next_cycle = investor.clock.time() + 30
+        investor.circuits['search'].failure(Exception('Timed out'))
+        investor.portfolio_cache.put((100, 'key'), 'version', False)
+        investor.settings['min_cash'] = 50
+        investor.warm_up()
+
+        new_investor = self.hand_off(investor)
+        self.assertTrue(new_investor.resumed)
+        self.assertEqual(new_investor.next_cycle, investor.next_cycle)
+        self.assertEqual(new_investor.circuits['search'].failures, 1)
+        self.assertEqual(new_investor.portfolio_cache.get((100, 'key'), 'version'), False)
+        self.assertEqual(new_investor.inventory.loans(), investor.inventory.loans())
+        self.assertEqual(new_investor.settings['min_cash'], 50)
+        self.assertEqual(new_investor.settings['pass'], loadtest.PASSWORD)
+
+        # It uses the session the warm-up logged in with
+        new_investor.run_cycle()
+        self.assertEqual(new_investor.last_outcome, 'low_cash')
+        self.assertEqual(self.stub.counts['logins'], 2)
+
+    def test_restart_command(self):
+        investor = self.create_investor()
+        self.assertEqual(investor.handle_command('restart')['result'], 'error')
+
+        investor.restart_command = ['lcinvestor']
+        self.assertEqual(investor.handle_command('restart')['result'], 'success')
+        self.assertTrue(investor.restart_requested)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+
+import sys
+import time
+import unittest
+
+sys.path.insert(0, '.')
+sys.path.insert(0, '../')
+sys.path.insert(0, '../../')
+from lcinvestor.history import CycleHistory, get_bucket, get_bucket_seconds, get_percentile, get_report
+
+HOUR = 3600
+
+
+class TestCycleHistory(unittest.TestCase):
+    """ Tests recording cycles and reporting on them """
+
+    def setUp(self):
+        self.history = CycleHistory(':memory:')
+
+    def test_idle_cash(self):
+        self.history.record_cycle('a', 0, 2, 'low_cash', cash=10)
+        self.history.record_cycle('a', HOUR, 2, 'no_match', cash=500, attempts=3)
+        self.history.record_cycle('a', 2 * HOUR, 8, 'invested', cash=500, invested=475, attempts=2, cached=1)
+        self.history.record_cycle('a', 3 * HOUR, 2, 'low_cash', cash=25)
+
+        totals = self.history.get_stats()['accounts']['a']
+        self.assertEqual(totals['cycles'], 4)
+        self.assertEqual(totals['invested'], 475)
+
+        # $10 then $500 sat idle for an hour each, then $25 after investing
+        self.assertEqual(totals['idle_cash_seconds'], (10 + 500 + 25) * HOUR)
+        self.assertEqual(totals['idle_seconds'], 2 * HOUR)
+
+        self.assertEqual(totals['attempts:2'], 1)
+        self.assertEqual(totals['searches'], 4)
+        self.assertEqual(totals['cached_searches'], 1)
+
+    def test_failures(self):
+        self.history.record_cycle('a', 0, 1, 'error', phase='authenticating', error='Bad password')
+        self.history.record_cycle('a', HOUR, 1, 'error', phase='authenticating', error='Bad password')
+        self.history.record_cycle('b', HOUR, 1, 'blocked')
+
+        stats = self.history.get_stats()
+        self.assertEqual(stats['accounts']['a']['outcome:error'], 2)
+        self.assertEqual(stats['accounts']['a']['failed:authenticating'], 2)
+        self.assertEqual(stats['accounts']['b']['outcome:blocked'], 1)
+
+        # Just one account
+        self.assertEqual(self.history.get_stats(account='b')['accounts'].keys(), ['b'])
+
+    def test_percentiles(self):
+        for i in range(100):
+            self.history.record_cycle('a', i * HOUR, i + 1, 'low_cash', phases={'search': 0.5})
+
+        phases = self.history.get_stats()['phases']
+        self.assertEqual(phases['cycle']['count'], 100)
+        self.assertTrue(50 <= phases['cycle']['p50'] <= 55)
+        self.assertTrue(95 <= phases['cycle']['p95'] <= 105)
+        self.assertTrue(99 <= phases['cycle']['p99'] <= 109)
+        self.assertTrue(0.5 <= phases['search']['p99'] <= 0.55)
+
+    def test_since(self):
+        self.history.record_cycle('a', 0, 1, 'low_cash')
+        self.history.record_cycle('a', 10 * 86400, 1, 'invested', invested=100, attempts=1)
+
+        totals = self.history.get_stats(since=5 * 86400)['accounts']['a']
+        self.assertEqual(totals['cycles'], 1)
+        self.assertEqual(totals['first'], 10 * 86400)
+
+    def test_buckets(self):
+        self.assertEqual(get_bucket(0), 0)
+        for seconds in [0.002, 0.5, 3, 120]:
+            bucket = get_bucket(seconds)
+            self.assertTrue(get_bucket_seconds(bucket - 1) < seconds <= get_bucket_seconds(bucket) * 1.0000001)
+        self.assertEqual(get_percentile({}, 50), None)
+
+    def test_months_of_cycles(self):
+        # 3 accounts, every 15 minutes for 90 days
+        for i in range(90 * 96):
+            for account in ['a', 'b', 'c']:
+                self.history.record_cycle(account, i * 900, 1 + (i % 10), 'low_cash', cash=100, phases={'auth': 0.4, 'balance': 0.2})
+
+        started = time.time()
+        stats = self.history.get_stats()
+        self.assertTrue(time.time() - started < 0.5)
+        self.assertEqual(stats['accounts']['c']['cycles'], 90 * 96)
+        self.assertTrue('Latency' in get_report(stats))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+
+import sys
+import random
+import unittest
+
+sys.path.insert(0, '.')
+sys.path.insert(0, '../')
+sys.path.insert(0, '../../')
+from lendingclub.filters import Filter
+from lcinvestor import market
+from lcinvestor.inventory import LoanInventory
+from lcinvestor.tests.simulation_test import create_loan
+
+
+class TestLoanInventory(unittest.TestCase):
+    """ Tests the columnar loan inventory """
+
+    def setUp(self):
+        self.loans = [create_loan(i, 'ABCDEFG'[i % 7] + str(i % 5 + 1), 6.0 + i, unfunded=1000 - (i * 50)) for i in range(10)]
+        self.inventory = LoanInventory.from_loans(self.loans)
+
+    def test_from_loans(self):
+        self.assertEqual(len(self.inventory), 10)
+        self.assertEqual(self.inventory.get_loan(3), self.loans[3])
+        self.assertEqual(self.inventory.version, 1)
+
+    def test_sync_diff(self):
+        loans = [dict(loan) for loan in self.loans[2:]]
+        loans[0]['loanUnfundedAmount'] = 100.0
+        loans.append(create_loan(20, 'B1', 10.0))
+
+        self.assertEqual(self.inventory.sync(loans), (1, 1, 2))
+        self.assertEqual(len(self.inventory), 9)
+        self.assertEqual(self.inventory.version, 2)
+        self.assertFalse(0 in self.inventory)
+
+        # Rows still line up with their loans after removing
+        for loan in loans:
+            self.assertEqual(self.inventory.get_loan(self.inventory.index[loan['loan_id']]), loan)
+
+        # Nothing changed
+        self.assertEqual(self.inventory.sync(loans), (0, 0, 0))
+        self.assertEqual(self.inventory.version, 2)
+
+    def test_lendingclub_types(self):
+        """ Search results as LendingClub sends them, with the rate as a string """
+        loan = {'loan_id': 12345, 'loanGUID': u'12345', 'loanGrade': u'D5', 'loanRate': u'20.31', 'loanLength': 36,
+                'loanAmountRequested': 14000, 'loanUnfundedAmount': 1550, 'alreadyInvestedIn': False, 'purpose': u'other'}
+        inventory = LoanInventory.from_loans([loan])
+        self.assertEqual(inventory.get_loan(0)['loanRate'], 20.31)
+        self.assertEqual(inventory.get_loan(0)['loanUnfundedAmount'], 1550)
+
+        # The same loan again isn't a change
+        self.assertEqual(inventory.sync([dict(loan, loanUnfundedAmount=u'1550')]), (0, 0, 0))
+        self.assertEqual(inventory.sync([dict(loan, loanUnfundedAmount=1025)]), (0, 1, 0))
+
+    def test_partial_sync(self):
+        self.assertEqual(self.inventory.sync(self.loans[:2], complete=False), (0, 0, 0))
+        self.assertEqual(len(self.inventory), 10)
+
+    def test_select_matches_filters(self):
+        rand = random.Random(1)
+        for i in range(50):
+            grades = dict([(g, rand.random() < 0.5) for g in 'ABCDEFG'])
+            grades['All'] = rand.random() < 0.2
+            filters = Filter({
+                'grades': grades,
+                'term': {'Year3': True, 'Year5': rand.random() < 0.5},
+                'funding_progress': rand.choice([0, 10, 30]),
+                'exclude_existing': True
+            })
+            expected = [loan['loan_id'] for loan in self.loans if market.matches(filters, loan)]
+            selected = [self.inventory.loan_ids[row] for row in self.inventory.select(filters)]
+            self.assertEqual(sorted(selected), sorted(expected))
+
+    def test_build_portfolio(self):
+        self.assertEqual(market.build_portfolio(self.inventory, 100, max_per_note=25, min_percent=8, max_percent=12),
+            market.build_portfolio(self.loans, 100, max_per_note=25, min_percent=8, max_percent=12))
+
+
+if __name__ == '__main__':
+    unittest.main()
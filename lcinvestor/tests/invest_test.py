@@ -0,0 +1,386 @@
+#!/usr/bin/env python
+
+import sys
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+sys.path.insert(0, '.')
+sys.path.insert(0, '../')
+sys.path.insert(0, '../../')
+from lendingclub import LendingClubError
+from lendingclub.session import AuthenticationError
+from lcinvestor import AutoInvestor
+from lcinvestor.clock import Clock
+from lcinvestor.phases import PhaseTimeoutError
+from lcinvestor.simulation import SimulatedClock
+from lcinvestor.tests import autoinvestor_test
+from lcinvestor.tests.fake_lendingclub import FakeLendingClub, create_loans
+
+
+class TestAttemptToInvest(unittest.TestCase):
+    """ Tests investment cycles end to end, against the fake LendingClub client """
+
+    def setUp(self):
+        self.app_dir = tempfile.mkdtemp()
+        self.clock = SimulatedClock(start=1400000000)
+        self.lc = FakeLendingClub(cash=1000, loans=create_loans(), clock=self.clock)
+        self.investor = self.create_investor(self.lc)
+
+    def tearDown(self):
+        if self.investor.history is not None:
+            self.investor.history.close()
+        shutil.rmtree(self.app_dir)
+
+    def create_investor(self, lc, **kwargs):
+        investor = AutoInvestor(lc=lc, clock=self.clock, app_dir=self.app_dir, **kwargs)
+        investor.settings.auth['email'] = lc.email
+        investor.settings.auth['pass'] = lc.password
+        investor.settings.investing['min_cash'] = 500
+        investor.settings.investing['min_percent'] = 10
+        investor.settings.investing['max_percent'] = 20
+        investor.settings.investing['filters'] = False
+        return investor
+
+    def test_invests(self):
+        self.investor.run_once()
+
+        self.assertEqual(self.investor.last_outcome, 'invested')
+        self.assertEqual(len(self.lc.orders), 1)
+        self.assertEqual(sum(self.lc.orders[0]['loans'].values()), 1000)
+        self.assertEqual(self.lc.cash, 0)
+
+        # The order is saved and recorded
+        last = self.investor.get_last_investment()
+        self.assertEqual(last['order_id'], self.lc.orders[0]['order_id'])
+        totals = self.investor.history.get_stats()['accounts'][self.lc.email]
+        self.assertEqual(totals['outcome:invested'], 1)
+        self.assertEqual(totals['invested'], 1000)
+
+    def test_low_cash(self):
+        self.lc.cash = 100
+        self.investor.run_once()
+
+        self.assertEqual(self.investor.last_outcome, 'low_cash')
+        self.assertEqual(self.lc.count('build_portfolio'), 0)
+        self.assertEqual(self.lc.orders, [])
+
+    def test_auth_failure(self):
+        self.lc.script('authenticate', AuthenticationError('Email or password is invalid'))
+        self.investor.run_once()
+
+        self.assertEqual(self.investor.last_outcome, 'error')
+        self.assertEqual(self.lc.count('get_investable_balance'), 0)
+        self.assertEqual(self.investor.circuits['auth'].failures, 1)
+
+        # It works the next time
+        self.investor.run_once()
+        self.assertEqual(self.investor.last_outcome, 'invested')
+
+    def test_auth_connection_error(self):
+        # Not a LendingClubError, so it doesn't have a value
+        self.lc.script('authenticate', IOError('Connection reset by peer'))
+        self.investor.loop = True
+        self.investor.run_cycle()
+
+        self.assertEqual(self.investor.last_outcome, 'error')
+        self.assertEqual(self.investor.circuits['auth'].failures, 1)
+
+    def test_no_match(self):
+        self.investor.settings.investing['min_percent'] = 30
+        self.investor.settings.investing['max_percent'] = 40
+        self.investor.run_once()
+
+        self.assertEqual(self.investor.last_outcome, 'no_match')
+        searches = self.lc.count('build_portfolio')
+        self.assertTrue(searches > 1)
+
+        # The same listing isn't searched again
+        self.investor.run_once()
+        self.assertEqual(self.investor.last_outcome, 'unchanged')
+        self.assertEqual(self.lc.count('build_portfolio'), searches)
+
+        # Until new loans are listed
+        self.lc.loans.extend(create_loans(50, rate=30.0, start_id=5000))
+        self.investor.run_once()
+        self.assertEqual(self.investor.last_outcome, 'invested')
+
+    def test_search_error(self):
+        self.investor.logger = autoinvestor_test.TestLogger()
+        self.lc.script('build_portfolio', LendingClubError('Unable to build a portfolio'))
+        self.investor.run_once()
+
+        # The next amount on the ladder is searched for
+        self.assertEqual(self.investor.last_outcome, 'invested')
+        self.assertEqual(self.investor.logger.warnings, ['Portfolio search for $1000 failed: Unable to build a portfolio'])
+
+    def test_too_few_loans(self):
+        # $1000 takes 40 notes of $25, and the $500 minimum 20, but only 10 loans are listed
+        self.lc.loans = create_loans(10)
+        self.investor.run_once()
+
+        self.assertEqual(self.investor.last_outcome, 'no_match')
+        self.assertEqual(self.lc.count('build_portfolio'), 0)
+
+    def test_searched_with_enough_loans(self):
+        # Only amounts 30 loans can take are searched for
+        self.lc.loans = create_loans(30)
+        self.investor.run_once()
+
+        self.assertEqual(self.investor.last_outcome, 'invested')
+        self.assertEqual([args[0] for name, args in self.lc.calls if name == 'build_portfolio'], [750])
+
+    def test_order_failure(self):
+        self.lc.script('execute', *[LendingClubError('The order could not be placed')] * 3)
+        self.investor.run_once()
+
+        self.assertEqual(self.investor.last_outcome, 'error')
+        self.assertEqual(self.lc.count('execute'), 3)
+        self.assertEqual(self.investor.circuits['order'].failures, 3)
+        self.assertEqual(self.lc.orders, [])
+        self.assertEqual(self.lc.cash, 1000)
+        self.assertEqual(self.investor.get_order_journal().get_pending(), [])
+
+    def test_circuit_cooldown(self):
+        self.lc.script('execute', *[LendingClubError('The order could not be placed')] * 3)
+        self.investor.run_once()
+
+        # The circuit cools down on the investor's clock
+        circuit = self.investor.circuits['order']
+        self.assertEqual(circuit.state, 'open')
+        self.assertFalse(circuit.allow())
+        self.clock.advance(circuit.cooldown)
+        self.assertTrue(circuit.allow())
+
+    def test_order_retried(self):
+        self.lc.script('execute', LendingClubError('The order could not be placed'))
+        self.investor.run_once()
+
+        # It didn't go through, so it's sent again
+        self.assertEqual(self.investor.last_outcome, 'invested')
+        self.assertEqual(self.lc.count('execute'), 2)
+        self.assertEqual(len(self.lc.orders), 1)
+
+    def test_order_went_through(self):
+        def place_then_fail(loans, portfolio_name):
+            self.lc.place_order(loans, portfolio_name)
+            raise LendingClubError('No order ID was found when placing the order.')
+        self.lc.script('execute', place_then_fail)
+        self.investor.run_once()
+
+        # It went through, so it isn't sent again
+        self.assertEqual(self.investor.last_outcome, 'invested')
+        self.assertEqual(self.lc.count('execute'), 1)
+        self.assertEqual(len(self.lc.orders), 1)
+        self.assertEqual(self.investor.get_last_investment()['order_id'], self.lc.orders[0]['order_id'])
+
+    def test_unsettled_order(self):
+        self.lc.script('execute', LendingClubError('The order could not be placed'))
+        self.lc.script('my_notes', LendingClubError('Not available'), LendingClubError('Not available'))
+        self.investor.run_once()
+        self.assertEqual(self.investor.last_outcome, 'error')
+        self.assertEqual(len(self.investor.get_order_journal().get_pending()), 1)
+
+        # Nothing is invested until it's known if the order went through
+        searches = self.lc.count('build_portfolio')
+        self.investor.run_once()
+        self.assertEqual(self.investor.last_outcome, 'error')
+        self.assertEqual(self.lc.count('build_portfolio'), searches)
+
+        # It didn't, so the next cycle invests
+        self.investor.run_once()
+        self.assertEqual(self.investor.last_outcome, 'invested')
+        self.assertEqual(len(self.lc.orders), 1)
+
+    def test_order_from_stopped_process(self):
+        def place_then_stop(loans, portfolio_name):
+            self.lc.place_order(loans, portfolio_name)
+            raise KeyboardInterrupt()
+        self.lc.script('execute', place_then_stop)
+        self.assertRaises(KeyboardInterrupt, self.investor.run_once)
+
+        # The next process finds the order went through, and doesn't invest the cash again
+        self.investor.history.close()
+        self.lc.cash += 100
+        self.investor = self.create_investor(self.lc)
+        self.investor.run_once()
+        self.assertEqual(self.investor.last_outcome, 'low_cash')
+        self.assertEqual(len(self.lc.orders), 1)
+        self.assertEqual(self.investor.get_last_investment()['order_id'], self.lc.orders[0]['order_id'])
+
+    def test_stopped(self):
+        self.investor.stop()
+        self.investor.run_once()
+        self.assertEqual(self.lc.count('build_portfolio'), 0)
+        self.assertEqual(self.lc.orders, [])
+
+    def test_stopped_before_order(self):
+        # Stopped during the last chance to cancel
+        self.clock.end = self.clock.time() + 1
+        self.clock.on_end = self.investor.stop
+        self.investor.run_once()
+
+        self.assertEqual(self.investor.last_outcome, 'stopped')
+        self.assertEqual(self.lc.count('execute'), 0)
+        self.assertEqual(self.lc.orders, [])
+
+    def test_stopped_during_order(self):
+        def stop_then_fail(loans, portfolio_name):
+            self.investor.stop()
+            raise LendingClubError('The order could not be placed')
+        self.lc.script('execute', stop_then_fail)
+        self.investor.run_once()
+
+        # It's checked, but not sent again
+        self.assertEqual(self.investor.last_outcome, 'error')
+        self.assertEqual(self.lc.count('execute'), 1)
+        self.assertEqual(self.lc.count('my_notes'), 1)
+        self.assertEqual(self.investor.get_order_journal().get_pending(), [])
+
+    def test_sleep_interrupted(self):
+        investor = AutoInvestor(lc=self.lc, clock=Clock(), app_dir=self.app_dir)
+        threading.Timer(0.1, investor.stop).start()
+        started = time.time()
+        self.assertTrue(investor.sleep(30))
+        self.assertTrue(time.time() - started < 5)
+        self.assertFalse(self.investor.sleep(1))
+
+    def test_waits_for_abandoned_call(self):
+        investor = AutoInvestor(lc=self.lc, clock=Clock(), app_dir=self.app_dir)
+        investor.phase_timer.timeouts['search'] = 0.1
+        investor.set_phase('Searching', timed='search')
+        self.assertRaises(PhaseTimeoutError, investor.timed, time.sleep, 0.5)
+
+        # The next call isn't made while the one that timed out still has the session
+        calls = []
+        self.assertRaises(PhaseTimeoutError, investor.timed, calls.append, 1)
+        self.assertEqual(calls, [])
+
+        investor.phase_timer.timeouts['search'] = 2
+        investor.timed(calls.append, 2)
+        self.assertEqual(calls, [2])
+        self.assertEqual(investor.abandoned_call, None)
+
+    def test_profiled(self):
+        self.investor.profile_cycles(1)
+        self.investor.run_once()
+
+        files = sorted(os.listdir(os.path.join(self.app_dir, 'profiles')))
+        self.assertEqual([os.path.splitext(name)[1] for name in files], ['.collapsed', '.pstats'])
+        self.assertTrue(files[0].endswith('-invested.collapsed'))
+        self.assertEqual(self.investor.profiler, None)
+
+        # Only the cycles asked for
+        self.investor.run_once()
+        self.assertEqual(len(os.listdir(os.path.join(self.app_dir, 'profiles'))), 2)
+
+    def test_profile_command(self):
+        self.assertEqual(self.investor.handle_command('profile 3')['result'], 'success')
+        self.assertEqual(self.investor.profiler.remaining, 3)
+        self.assertEqual(self.investor.handle_command('profile 0')['result'], 'success')
+        self.assertEqual(self.investor.profiler, None)
+        self.assertEqual(self.investor.handle_command('profile many')['result'], 'error')
+
+    def test_settings_changed_mid_cycle(self):
+        self.investor.settings.investing['min_percent'] = 30
+        self.investor.settings.investing['max_percent'] = 40
+
+        # Settings changed during the first search don't apply until the next cycle
+        def change_settings(*args):
+            self.investor.settings['max_per_note'] = 50
+            return False
+        self.lc.script('build_portfolio', change_settings)
+        self.investor.run_once()
+
+        searches = [args for name, args in self.lc.calls if name == 'build_portfolio']
+        self.assertTrue(len(searches) > 1)
+        self.assertEqual(set([args[1] for args in searches]), set([25]))
+        self.assertEqual(self.investor.settings.get_snapshot().max_per_note, 50)
+
+    def test_warm_up(self):
+        self.investor.loop = True
+        self.assertTrue(self.investor.warm_up())
+        self.assertEqual(self.lc.count('authenticate'), 1)
+
+        # The cycle starts with the balance check
+        self.clock.sleep(30)
+        self.investor.run_cycle()
+        self.assertEqual(self.investor.last_outcome, 'invested')
+        self.assertEqual(self.lc.count('authenticate'), 1)
+        self.assertEqual(self.lc.count('is_site_available'), 1)
+
+        # A warm-up is only good for one cycle
+        self.investor.run_cycle()
+        self.assertEqual(self.lc.count('authenticate'), 2)
+
+    def test_warm_up_too_old(self):
+        self.investor.loop = True
+        self.investor.warm_up()
+        self.clock.sleep(self.investor.settings['warm_up_seconds'] + self.investor.warm_up_grace + 1)
+        self.investor.run_cycle()
+        self.assertEqual(self.lc.count('authenticate'), 2)
+
+    def test_warm_up_failed(self):
+        self.lc.script('authenticate', AuthenticationError('Email or password is invalid'))
+        self.investor.loop = True
+        self.assertFalse(self.investor.warm_up())
+
+        # The cycle logs in itself
+        self.investor.run_cycle()
+        self.assertEqual(self.investor.last_outcome, 'invested')
+        self.assertEqual(self.lc.count('authenticate'), 2)
+
+    def test_warm_up_time(self):
+        self.investor.next_cycle = self.clock.time() + 100
+        self.assertEqual(self.investor.get_warm_up_time(), self.clock.time() + 70)
+        self.investor.warmed_for = self.investor.next_cycle
+        self.assertEqual(self.investor.get_warm_up_time(), None)
+
+        self.investor.settings['warm_up_seconds'] = 0
+        self.investor.warmed_for = None
+        self.assertEqual(self.investor.get_warm_up_time(), None)
+
+    def test_search_over_budget(self):
+        self.investor.settings.investing['min_percent'] = 30
+        self.investor.settings.investing['max_percent'] = 40
+        self.investor.phase_timer.budgets['search'] = 300
+        self.lc.latency['build_portfolio'] = 400
+
+        # The first search uses up the budget, so the rest of the ladder is skipped
+        self.investor.run_once()
+        self.assertEqual(self.lc.count('build_portfolio'), 1)
+        self.assertEqual(self.investor.phase_timer.overruns['search'], 1)
+
+    def test_not_auto_executed(self):
+        investor = self.create_investor(self.lc, auto_execute=False)
+        investor.run_once()
+
+        self.assertEqual(investor.last_outcome, 'staged')
+        self.assertEqual(self.lc.orders, [])
+        self.assertEqual(sum([amount for loan_id, amount in self.lc.staged]), 1000)
+
+    def test_portfolio(self):
+        self.investor.settings.investing['portfolio'] = 'Reinvested'
+        self.investor.run_once()
+
+        self.assertEqual(self.lc.orders[0]['portfolio'], 'Reinvested')
+        self.assertEqual(self.lc.get_portfolio_list(names_only=True), ['Reinvested'])
+
+    def test_separate_accounts(self):
+        other_lc = FakeLendingClub('other@test.com', 'otherpassword', cash=1000, loans=create_loans(), clock=self.clock)
+        other = self.create_investor(other_lc)
+
+        # Each investor logs into its own account
+        self.investor.run_once()
+        other.run_once()
+        self.assertEqual(self.investor.last_outcome, 'invested')
+        self.assertEqual(other.last_outcome, 'invested')
+        self.assertEqual(len(other_lc.orders), 1)
+        other.history.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+
+import sys
+import unittest
+
+sys.path.insert(0, '.')
+sys.path.insert(0, '../')
+sys.path.insert(0, '../../')
+from lcinvestor.ladder import SearchStats
+
+
+class TestSearchStats(unittest.TestCase):
+    """ Tests ordering the cash ladder from past searches """
+
+    def test_no_history(self):
+        stats = SearchStats()
+        self.assertEqual(stats.get_chance(1000), 0.5)
+        self.assertEqual(stats.get_ladder(1000, 500), [1000, 875, 750, 625, 500])
+
+    def test_likely_amount_first(self):
+        stats = SearchStats()
+        for i in range(3):
+            stats.record(1000, False)
+            stats.record(875, False)
+            stats.record(750, True)
+
+        self.assertTrue(stats.get_chance(750) > 0.5)
+        self.assertTrue(stats.get_chance(900) < 0.5)
+        self.assertEqual(stats.get_ladder(1000, 500), [750, 625, 500, 875, 1000])
+
+    def test_found_amount_added(self):
+        stats = SearchStats()
+        stats.record(1200, False)
+        stats.record(800, True)
+
+        # $800 isn't on the usual ladder, but it found a portfolio last time
+        self.assertEqual(stats.get_ladder(1200, 500)[0], 800)
+
+        # Not when it's more than the cash
+        self.assertFalse(800 in stats.get_ladder(700, 500))
+
+    def test_recent_only(self):
+        stats = SearchStats()
+        for i in range(SearchStats.max_outcomes + 10):
+            stats.record(i, True)
+        self.assertEqual(len(stats.outcomes), SearchStats.max_outcomes)
+        self.assertEqual(stats.outcomes[0], [10, True])
+
+    def test_listing_version(self):
+        stats = SearchStats()
+        version = stats.update_listing([1, 2, 3])
+
+        # The same loans, in any order, keep it
+        self.assertEqual(stats.update_listing([3, 2, 1]), version)
+
+        # New, funded and removed loans change it
+        funded = stats.update_listing([3, 1])
+        self.assertNotEqual(funded, version)
+        self.assertNotEqual(stats.update_listing([1, 3, 4]), funded)
+
+    def test_to_dict(self):
+        stats = SearchStats('abc')
+        stats.record(500, True)
+        loaded = SearchStats.from_dict(stats.to_dict())
+        self.assertEqual(loaded.key, 'abc')
+        self.assertEqual(loaded.outcomes, [[500, True]])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+
+import sys
+import shutil
+import tempfile
+import threading
+import unittest
+
+sys.path.insert(0, '.')
+sys.path.insert(0, '../')
+sys.path.insert(0, '../../')
+from lendingclub.filters import Filter, FilterByLoanID
+from lcinvestor import loadtest
+from lcinvestor.simulation import SimulatedClock
+
+
+class TestParseFilter(unittest.TestCase):
+    """ Tests reading back the filter search strings the investor sends the site """
+
+    def test_default(self):
+        self.assertEqual(loadtest.parse_filter('default'), None)
+
+    def test_grades(self):
+        filters = loadtest.parse_filter(loadtest.get_filters('AB').search_string())
+        self.assertEqual(filters['grades']['A'], True)
+        self.assertEqual(filters['grades']['C'], False)
+        self.assertEqual(filters['exclude_existing'], False)
+
+    def test_all_grades(self):
+        filters = loadtest.parse_filter(Filter().search_string())
+        self.assertEqual(filters['grades']['All'], True)
+
+    def test_loan_id(self):
+        filters = loadtest.parse_filter(FilterByLoanID(1234).search_string())
+        self.assertEqual(str(filters['loan_id']), '1234')
+
+
+class TestStubAccount(unittest.TestCase):
+    """ Tests the cash flow patterns of the stub site's accounts """
+
+    def test_deposits(self):
+        account = loadtest.StubAccount('test@test.com', 'payday', 60)
+        self.assertEqual(account.get_cash(account.started), 0)
+        self.assertEqual(account.get_cash(account.started + 600), 1000)
+        account.invested = 400
+        self.assertEqual(account.get_cash(account.started + 1200), 1600)
+
+
+class TestStubSite(unittest.TestCase):
+    """ Tests the real investor against the stub site """
+
+    def setUp(self):
+        self.app_dir = tempfile.mkdtemp()
+        self.account = loadtest.StubAccount('test@loadtest.local', 'lump', 60)
+        self.stub = loadtest.StubLendingClub([self.account])
+        self.server = loadtest.StubServer(self.stub)
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+
+        self.investor = loadtest.create_investor({
+            'email': self.account.email,
+            'password': loadtest.PASSWORD,
+            'profile': 'balanced',
+            'url': self.server.get_url(),
+            'app_dir': self.app_dir,
+            'frequency': 1
+        })
+        self.investor.clock = SimulatedClock()  # Don't wait before each order
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.investor.history.close()
+        shutil.rmtree(self.app_dir)
+
+    def test_invests(self):
+        self.investor.run_once()
+        self.assertEqual(self.investor.last_outcome, 'invested')
+        self.assertEqual(self.stub.counts['orders'], 1)
+        self.assertEqual(self.stub.counts['invested'], self.account.invested)
+        self.assertTrue(self.account.get_cash(self.account.started) < 250)
+
+        # There's nothing left to invest the next time
+        self.investor.run_once()
+        self.assertEqual(self.investor.last_outcome, 'low_cash')
+        self.assertEqual(self.stub.counts['orders'], 1)
+
+    def test_lendingclub_types(self):
+        """ Loans come back as they do from LendingClub, with the rate as a string """
+        self.investor.run_once()
+        loan = self.investor.lc.search()['loans'][0]
+        self.assertEqual(type(loan['loanRate']), unicode)
+        self.assertEqual(loan['loan_id'], int(loan['loanGUID']))
+
+        portfolio = self.investor.lc.build_portfolio(100, max_per_note=25, max_percent=30)
+        self.assertEqual(type(portfolio['loan_fractions'][0]['loanRate']), unicode)
+        self.assertEqual(portfolio['loan_fractions'][0]['invest_amount'], 25)
+
+    def test_wrong_password(self):
+        self.investor.settings['pass'] = 'wrong'
+        self.investor.run_once()
+        self.assertEqual(self.investor.last_outcome, 'error')
+        self.assertEqual(self.stub.counts['failed_logins'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
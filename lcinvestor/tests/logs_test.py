@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+
+import sys
+import os
+import json
+import Queue
+import shutil
+import logging
+import tempfile
+import unittest
+
+sys.path.insert(0, '.')
+sys.path.insert(0, '../')
+sys.path.insert(0, '../../')
+from lcinvestor import logs
+
+
+class TestLogPipeline(unittest.TestCase):
+    """ Tests the queued logging pipeline """
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.log_file = os.path.join(self.tmp_dir, 'test.log')
+
+        self.queue = Queue.Queue()
+        self.listener = logs.QueueListener(self.queue)
+        self.listener.start()
+
+        self.logger = logging.getLogger('investor_test')
+        self.logger.setLevel(logging.DEBUG)
+        self.logger.propagate = False
+        self.queue_handler = logs.QueueHandler(self.queue)
+        self.logger.addHandler(self.queue_handler)
+
+    def tearDown(self):
+        self.listener.stop()
+        self.logger.removeHandler(self.queue_handler)
+        shutil.rmtree(self.tmp_dir)
+
+    def add_file(self, max_bytes=0, interval=0):
+        handler = logs.RotatingFileHandler(self.log_file, max_bytes=max_bytes, interval=interval, backup_count=3)
+        handler.setFormatter(logs.JSONFormatter())
+        self.listener.add_handler(handler)
+        return handler
+
+    def read_lines(self, path):
+        f = open(path, 'r')
+        lines = [json.loads(line) for line in f.read().splitlines()]
+        f.close()
+        return lines
+
+    def test_json_lines(self):
+        self.add_file()
+        self.logger.info('Invested $%d', 100)
+        try:
+            raise Exception('Oops')
+        except Exception:
+            self.logger.exception('Failed')
+        self.listener.stop()
+
+        lines = self.read_lines(self.log_file)
+        self.assertEqual(len(lines), 2)
+        self.assertEqual(lines[0]['message'], 'Invested $100')
+        self.assertEqual(lines[0]['level'], 'INFO')
+        self.assertEqual(lines[0]['logger'], 'investor_test')
+        self.assertTrue('Oops' in lines[1]['exception'])
+
+    def test_rotate_by_size(self):
+        self.add_file(max_bytes=500)
+        for i in range(20):
+            self.logger.info('Message number {0}'.format(i))
+        self.listener.stop()
+
+        self.assertTrue(os.path.exists(self.log_file + '.1'))
+        self.assertTrue(os.path.getsize(self.log_file) <= 500)
+
+    def test_rotate_by_time(self):
+        handler = self.add_file(interval=3600)
+        self.logger.info('Before')
+        self.listener.stop()
+
+        handler.rollover_at = 0
+        self.listener.start()
+        self.logger.info('After')
+        self.listener.stop()
+
+        self.assertEqual(self.read_lines(self.log_file + '.1')[0]['message'], 'Before')
+        self.assertEqual(self.read_lines(self.log_file)[0]['message'], 'After')
+
+    def test_set_levels(self):
+        logs.set_levels({'investor_test.child': 'warning'})
+        self.assertEqual(logging.getLogger('investor_test.child').level, logging.WARNING)
+        self.assertRaises(ValueError, logs.set_levels, {'investor_test': 'LOUD'})
+
+
+if __name__ == '__main__':
+    unittest.main()
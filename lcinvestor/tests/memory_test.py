@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+sys.path.insert(0, '.')
+sys.path.insert(0, '../')
+sys.path.insert(0, '../../')
+from lcinvestor.memory import MemorySnapshot, MemoryMonitor, LeakCheck
+
+
+class Held:
+    pass
+
+
+class TestMemoryMonitor(unittest.TestCase):
+    """ Tests measuring and reporting the memory held """
+
+    def setUp(self):
+        self.app_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.app_dir)
+
+    def test_growth(self):
+        before = MemorySnapshot(0)
+        held = [Held() for i in range(500)]
+        after = MemorySnapshot(1)
+
+        self.assertTrue(after.get_size() > before.get_size())
+        self.assertTrue(any(['Held' in line or 'memory_test' in line for line in after.get_growth(before)]))
+
+    def test_report(self):
+        report_file = os.path.join(self.app_dir, 'memory.log')
+        monitor = MemoryMonitor(every=2, report_file=report_file)
+        for i in range(5):
+            monitor.cycle_done()
+
+        self.assertEqual(monitor.status()['checks'], 2)
+        self.assertTrue('cycles 2 to 4' in open(report_file).read())
+
+    def test_off(self):
+        monitor = MemoryMonitor(every=0)
+        monitor.cycle_done()
+        self.assertEqual(monitor.last, None)
+
+
+class TestLeakCheck(unittest.TestCase):
+    """ Tests running many simulated cycles and watching the memory held """
+
+    def test_no_leak(self):
+        results = LeakCheck(cycles=1000, samples=5).run()
+        self.assertFalse(results['leaking'], '\n'.join(results['top']))
+
+    def test_finds_leak(self):
+        check = LeakCheck(cycles=1000, samples=5)
+        investor = check.investor
+        leaked = []
+        run_cycle = investor.run_cycle
+
+        def leaky_cycle():
+            run_cycle()
+            leaked.append([Held() for i in range(5)])
+
+        investor.run_cycle = leaky_cycle
+        self.assertTrue(check.run()['leaking'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+
+import sys
+import time
+import unittest
+
+sys.path.insert(0, '.')
+sys.path.insert(0, '../')
+sys.path.insert(0, '../../')
+from lcinvestor.phases import PhaseTimer, PhaseTimeoutError, call_with_timeout, next_deadline
+
+
+class TestDeadlines(unittest.TestCase):
+    """ Tests the drift-free cycle schedule """
+
+    def test_next_deadline(self):
+        self.assertEqual(next_deadline(100, 60, 50), (100, 0))
+        self.assertEqual(next_deadline(100, 60, 130), (160, 1))
+
+        # A long cycle skips the deadlines it ran past, but stays on schedule
+        self.assertEqual(next_deadline(100, 60, 290), (340, 4))
+
+
+class TestPhaseTimer(unittest.TestCase):
+    """ Tests phase timeouts and budgets """
+
+    def setUp(self):
+        self.now = 0
+        self.timer = PhaseTimer(timeouts={'search': 30}, budgets={'search': 100}, clock=lambda: self.now)
+
+    def test_timeout_within_budget(self):
+        self.timer.start('search')
+        self.assertEqual(self.timer.get_timeout(), 30)
+
+        self.now = 80
+        self.assertEqual(self.timer.get_timeout(), 20)
+
+        self.now = 100
+        self.assertRaises(PhaseTimeoutError, self.timer.get_timeout)
+
+    def test_overruns(self):
+        self.timer.start('search')
+        self.now = 50
+        self.timer.end()
+        self.assertEqual(self.timer.status()['search']['overruns'], 0)
+
+        self.timer.start('search')
+        self.now = 200
+        self.timer.start('order')
+        self.assertEqual(self.timer.status()['search']['overruns'], 1)
+        self.assertEqual(self.timer.status()['search']['duration'], 150)
+
+    def test_no_limits(self):
+        self.timer.start('auth')
+        self.assertEqual(self.timer.get_timeout(), None)
+        self.assertEqual(self.timer.remaining(), None)
+
+
+class TestCallWithTimeout(unittest.TestCase):
+    """ Tests giving up on slow calls """
+
+    def test_result(self):
+        self.assertEqual(call_with_timeout(lambda x: x * 2, 1, 21), 42)
+        self.assertEqual(call_with_timeout(lambda x: x * 2, None, 21), 42)
+
+    def test_error(self):
+        def raise_error():
+            raise ValueError('Oops')
+        self.assertRaises(ValueError, call_with_timeout, raise_error, 1)
+
+    def test_timeout(self):
+        started = time.time()
+        self.assertRaises(PhaseTimeoutError, call_with_timeout, time.sleep, 0.1, 2)
+        self.assertTrue(time.time() - started < 1)
+
+    def test_timeout_thread(self):
+        try:
+            call_with_timeout(time.sleep, 0.05, 0.2)
+            self.fail('The call didn\'t time out')
+        except PhaseTimeoutError as e:
+            self.assertTrue(e.thread.is_alive())
+            e.thread.join(1)
+            self.assertFalse(e.thread.is_alive())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+
+import os
+import sys
+import json
+import shutil
+import tempfile
+import unittest
+
+sys.path.insert(0, '.')
+sys.path.insert(0, '../')
+sys.path.insert(0, '../../')
+from lcinvestor import util
+from lcinvestor import planner
+from lcinvestor.tests.simulation_test import create_loan
+
+
+class TestPlanner(unittest.TestCase):
+    """ Tests evaluating a grid of settings against a listing snapshot """
+
+    def setUp(self):
+        self.snapshot = {
+            'cash': 100,
+            'loans': [
+                create_loan(1, 'A1', 6.0),
+                create_loan(2, 'B2', 10.0),
+                create_loan(3, 'C3', 14.0),
+                create_loan(4, 'D4', 18.0)
+            ]
+        }
+        self.grid = {
+            'grades': ['All', 'AB'],
+            'min_cash': [25, 100],
+            'min_percent': [0, 12],
+            'max_percent': [10, 20],
+            'max_per_note': [25]
+        }
+
+    def test_cash_ladder(self):
+        self.assertEqual(list(util.cash_ladder(1000, 500)), [1000, 875, 750, 625, 500])
+        self.assertEqual(list(util.cash_ladder(510, 500)), [510])
+        self.assertEqual(list(util.cash_ladder(400, 500)), [])
+
+    def test_combinations(self):
+        self.assertEqual(len(planner.get_combinations(self.grid)), 12)
+        self.grid['min_percent'] = [15]
+        self.assertEqual(len(planner.get_combinations(self.grid)), 4)
+
+    def test_plan(self):
+        results = planner.plan(self.snapshot, self.grid, processes=1)
+        self.assertEqual(len(results), 12)
+
+        # All the cash, at the highest rate under 20%
+        best = results[0]
+        self.assertEqual(best['grades'], 'All')
+        self.assertEqual(best['invested'], 100)
+        self.assertEqual(best['rate'], 12.0)
+        self.assertEqual(best['unfilled'], 0)
+
+        # Only A and B loans, with a 12% minimum, never invests
+        result = [r for r in results if r['grades'] == 'AB' and r['min_percent'] == 12][0]
+        self.assertEqual(result['invested'], 0)
+        self.assertEqual(result['unfilled'], 100)
+
+        # Walks down the cash ladder to find a portfolio of 2 A and B loans
+        result = [r for r in results if r['grades'] == 'AB' and r['min_cash'] == 25 and r['min_percent'] == 0 and r['max_percent'] == 20][0]
+        self.assertEqual(result['invested'], 50)
+        self.assertEqual(result['unfilled'], 50)
+
+    def test_lendingclub_snapshot(self):
+        """ A snapshot saved from LendingClub's search results, with the rates as strings """
+        loans = []
+        for loan in self.snapshot['loans']:
+            loans.append(dict(loan, loanGUID=str(loan['loan_id']), loanRate='{0:.2f}'.format(loan['loanRate'])))
+            del loans[-1]['loan_id']
+
+        temp_dir = tempfile.mkdtemp()
+        try:
+            file_path = os.path.join(temp_dir, 'snapshot.json')
+            f = open(file_path, 'w')
+            f.write(json.dumps({'cash': 100, 'loans': loans}))
+            f.close()
+
+            snapshot = planner.load_snapshot(file_path)
+        finally:
+            shutil.rmtree(temp_dir)
+
+        self.assertEqual(snapshot['loans'][1]['loan_id'], 2)
+        self.assertEqual(snapshot['loans'][1]['loanRate'], 10.0)
+        self.assertEqual(planner.plan(snapshot, self.grid, processes=1),
+            planner.plan(self.snapshot, self.grid, processes=1))
+
+    def test_process_pool(self):
+        self.assertEqual(planner.plan(self.snapshot, self.grid, processes=2),
+            planner.plan(self.snapshot, self.grid, processes=1))
+
+    def test_grid_defaults(self):
+        grid = planner.load_grid_file(settings={'min_cash': 500})
+        self.assertEqual(grid['min_cash'], [500])
+        self.assertEqual(grid['max_per_note'], planner.default_grid['max_per_note'])
+
+
+if __name__ == '__main__':
+    unittest.main()
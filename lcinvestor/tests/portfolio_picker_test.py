@@ -10,8 +10,8 @@ sys.path.insert(0, '.')
 sys.path.insert(0, '../')
 sys.path.insert(0, '../../')
 import lcinvestor
-from lcinvestor.settings import Settings
 from lcinvestor import util
+from lcinvestor.tests.fake_lendingclub import FakeLendingClub
 
 
 """
@@ -20,9 +20,9 @@ Setup
 base_dir = os.path.dirname(os.path.realpath(__file__))
 app_dir = os.path.join(base_dir, '.folio_picker_test')
 
-settings = Settings(settings_dir=app_dir)
-investor = lcinvestor.AutoInvestor(settings=settings, verbose=True)
-investor.lc.get_portfolio_list = lambda names_only: ['apple', 'bar', 'foo']
+lc = FakeLendingClub(portfolios=['apple', 'bar', 'foo'])
+investor = lcinvestor.AutoInvestor(verbose=True, lc=lc, app_dir=app_dir)
+settings = investor.settings
 
 """
 With default option
@@ -50,7 +50,7 @@ while True:
 No options
 """
 print '\nWithout any options'
-investor.lc.get_portfolio_list = lambda names_only: []
+lc.portfolios = []
 while True:
     chosen = settings.portfolio_picker()
     print 'You chose: {0}\n'.format(chosen)
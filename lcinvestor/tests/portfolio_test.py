@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+
+import sys
+import json
+import unittest
+
+sys.path.insert(0, '.')
+sys.path.insert(0, '../')
+sys.path.insert(0, '../../')
+from lcinvestor.portfolio import Portfolio, grade_to_code, code_to_grade
+
+
+class TestPortfolio(unittest.TestCase):
+    """ Tests the compact portfolio """
+
+    def setUp(self):
+        self.wire = {
+            'percentage': 15.5,
+            'numberOfLoans': 3,
+            'a': 0.0, 'aa': 0.0, 'b': 50.0, 'c': 25.0, 'd': 25.0, 'e': 0.0, 'f': 0.0, 'g': 0.0,
+            'loan_fractions': [
+                {'loan_id': 101, 'orderId': 7, 'loanGrade': 'B3', 'loanRate': 11.5, 'loanFractionAmount': 50, 'invest_amount': 50},
+                {'loan_id': 102, 'orderId': 7, 'loanGrade': 'C1', 'loanRate': 14.0, 'loanFractionAmount': 25, 'invest_amount': 25},
+                {'loan_id': 103, 'orderId': 7, 'loanGrade': 'D5', 'loanRate': 19.25, 'loanFractionAmount': 25, 'invest_amount': 25}
+            ]
+        }
+
+    def test_grade_codes(self):
+        for grade in ['A1', 'B3', 'G5']:
+            self.assertEqual(code_to_grade(grade_to_code(grade)), grade)
+        self.assertEqual(code_to_grade(grade_to_code(None)), None)
+
+    def test_from_dict(self):
+        portfolio = Portfolio.from_dict(self.wire)
+        self.assertEqual(len(portfolio), 3)
+        self.assertEqual(portfolio.get_invested(), 100)
+        self.assertEqual(portfolio.get_fractions(), [(101, 50), (102, 25), (103, 25)])
+        self.assertEqual(portfolio.get_grade_percents(), {'B': 50.0, 'C': 25.0, 'D': 25.0})
+        self.assertRaises(AttributeError, setattr, portfolio, 'extra', True)
+
+    def test_from_lendingclub(self):
+        """ The fractions as LendingClub sends them: string rates and loanFractionAmount """
+        portfolio = Portfolio.from_dict({
+            'percentage': 17.34,
+            'loan_fractions': [
+                {'loan_id': 12345, 'loanGrade': 'C4', 'loanRate': u'15.88', 'loanFractionAmount': 25,
+                    'loanUnfundedAmount': 1825, 'loanAmountRequested': 21750, 'loanLength': 60},
+                {'loan_id': 23456, 'loanGrade': 'E4', 'loanRate': u'22.20', 'loanFractionAmount': 25,
+                    'loanUnfundedAmount': 4600, 'loanAmountRequested': 20000, 'loanLength': 60, 'invest_amount': 25}
+            ]
+        })
+        self.assertEqual(portfolio.get_fractions(), [(12345, 25), (23456, 25)])
+        self.assertEqual(portfolio.dump()['rates'], [15.88, 22.2])
+        self.assertEqual(portfolio.get_grade_percents(), {'C': 50.0, 'E': 50.0})
+
+    def test_to_dict(self):
+        wire = Portfolio.from_dict(self.wire).to_dict()
+        self.assertEqual(wire['numberOfLoans'], 3)
+        self.assertEqual(wire['b'], 50.0)
+        self.assertEqual(wire['loan_fractions'][2]['loanGrade'], 'D5')
+        self.assertEqual(wire['loan_fractions'][2]['loanRate'], 19.25)
+        self.assertEqual(wire['loan_fractions'][0]['invest_amount'], 50)
+
+    def test_dump_and_load(self):
+        portfolio = Portfolio.from_dict(self.wire)
+        loaded = Portfolio.load(json.loads(json.dumps(portfolio.dump())))
+        self.assertEqual(loaded.to_dict(), portfolio.to_dict())
+
+        # Older files saved the whole LendingClub dict
+        self.assertEqual(Portfolio.load(self.wire).get_fractions(), portfolio.get_fractions())
+
+    def test_set_order_id(self):
+        portfolio = Portfolio.from_dict(self.wire)
+        portfolio.set_order_id(99)
+        self.assertEqual(portfolio.dump()['order_ids'], [99, 99, 99])
+
+
+if __name__ == '__main__':
+    unittest.main()
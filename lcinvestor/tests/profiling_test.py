@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+
+import os
+import sys
+import time
+import pstats
+import shutil
+import tempfile
+import threading
+import unittest
+
+sys.path.insert(0, '.')
+sys.path.insert(0, '../')
+sys.path.insert(0, '../../')
+from lcinvestor.profiling import CycleProfiler
+
+
+def busy(seconds):
+    end = time.time() + seconds
+    while time.time() < end:
+        pass
+
+
+def call_on_thread(fn):
+    thread = threading.Thread(target=fn)
+    thread.start()
+    thread.join()
+
+
+class TestCycleProfiler(unittest.TestCase):
+    """ Tests profiling investment cycles """
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.profiler = CycleProfiler(os.path.join(self.dir, 'profiles'), cycles=2)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_written(self):
+        self.profiler.start()
+        busy(0.05)
+        paths = self.profiler.stop('invested')
+
+        self.assertEqual([os.path.splitext(path)[1] for path in paths], ['.pstats', '.collapsed'])
+        self.assertTrue(paths[0].endswith('-1-invested.pstats'))
+        self.assertEqual(self.profiler.remaining, 1)
+        self.assertFalse(self.profiler.is_running())
+
+        functions = [name for filename, line, name in pstats.Stats(paths[0]).stats.keys()]
+        self.assertTrue('busy' in functions)
+        self.assertTrue('busy (profiling_test.py:18)' in open(paths[1]).read())
+
+    def test_calls_on_other_threads(self):
+        def fetch():
+            busy(0.05)
+
+        self.profiler.start()
+        call_on_thread(self.profiler.wrap(fetch))
+        paths = self.profiler.stop('invested')
+
+        # The call is profiled, and its stacks are under the stack that waited for it
+        functions = [name for filename, line, name in pstats.Stats(paths[0]).stats.keys()]
+        self.assertTrue('fetch' in functions)
+        stacks = [line for line in open(paths[1]) if 'fetch' in line]
+        self.assertTrue(len(stacks) > 0)
+        for stack in stacks:
+            self.assertTrue('call_on_thread (profiling_test.py:24);' in stack)
+            self.assertFalse('run_profiled' in stack or 'runcall' in stack)
+
+    def test_off(self):
+        fetch = lambda: None
+        self.assertTrue(self.profiler.wrap(fetch) is fetch)
+
+
+if __name__ == '__main__':
+    unittest.main()
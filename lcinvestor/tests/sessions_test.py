@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+
+import os
+import sys
+import shutil
+import tempfile
+import threading
+import unittest
+
+sys.path.insert(0, '.')
+sys.path.insert(0, '../')
+sys.path.insert(0, '../../')
+from lcinvestor import loadtest
+from lcinvestor.sessions import Fernet, SessionStore
+from lcinvestor.simulation import SimulatedClock
+
+
+@unittest.skipIf(Fernet is None, 'the cryptography package is not installed')
+class TestSessionStore(unittest.TestCase):
+    """ Tests reusing the LendingClub session between --run-once runs, against the load test's stub site """
+
+    def setUp(self):
+        self.app_dir = tempfile.mkdtemp()
+        self.key = Fernet.generate_key()
+        self.account = loadtest.StubAccount('test@loadtest.local', 'lump', 60)
+        self.stub = loadtest.StubLendingClub([self.account])
+        self.server = loadtest.StubServer(self.stub)
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+        self.investors = []
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        for investor in self.investors:
+            investor.history.close()
+        shutil.rmtree(self.app_dir)
+
+    def run_once(self, key=None):
+        """
+        Run an investor for the account once, like a new --run-once process
+        """
+        investor = loadtest.create_investor({
+            'email': self.account.email,
+            'password': loadtest.PASSWORD,
+            'profile': 'balanced',
+            'url': self.server.get_url(),
+            'app_dir': self.app_dir,
+            'frequency': 1
+        })
+        investor.clock = SimulatedClock()  # Don't wait before each order
+        investor.keep_session = True
+        investor.session_store = SessionStore(os.path.join(self.app_dir, 'session.dat'), key or self.key)
+        self.investors.append(investor)
+        investor.run_once()
+        return investor
+
+    def test_reused(self):
+        self.assertEqual(self.run_once().last_outcome, 'invested')
+        self.assertEqual(self.stub.counts['logins'], 1)
+
+        # The next run doesn't log in
+        self.assertEqual(self.run_once().last_outcome, 'low_cash')
+        self.assertEqual(self.stub.counts['logins'], 1)
+
+    def test_encrypted(self):
+        self.run_once()
+        saved = open(os.path.join(self.app_dir, 'session.dat')).read()
+        self.assertFalse(self.account.session in saved)
+
+        # Another key can't read it
+        self.run_once(key=Fernet.generate_key())
+        self.assertEqual(self.stub.counts['logins'], 2)
+
+    def test_ended_session(self):
+        self.run_once()
+
+        # LendingClub ended the session, so the next run logs in
+        self.stub.sessions = {}
+        self.assertEqual(self.run_once().last_outcome, 'low_cash')
+        self.assertEqual(self.stub.counts['logins'], 2)
+
+    def test_timed_out(self):
+        investor = self.run_once()
+        investor.lc.session.last_request_time -= investor.lc.session.session_timeout * 60
+        investor.save_session()
+
+        self.run_once()
+        self.assertEqual(self.stub.counts['logins'], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
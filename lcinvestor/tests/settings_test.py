@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+
+import sys
+import shutil
+import tempfile
+import unittest
+
+sys.path.insert(0, '.')
+sys.path.insert(0, '../')
+sys.path.insert(0, '../../')
+from lendingclub.filters import Filter
+from lcinvestor.settings import Settings, CompiledFilter
+from lcinvestor.tests.fake_lendingclub import FakeLendingClub
+
+
+class FakeInvestor:
+    def __init__(self):
+        self.lc = FakeLendingClub()
+
+
+class TestSettingsSnapshot(unittest.TestCase):
+    """ Tests compiling the settings investment cycles run with """
+
+    def setUp(self):
+        self.app_dir = tempfile.mkdtemp()
+        self.settings = Settings(FakeInvestor(), settings_dir=self.app_dir)
+
+    def tearDown(self):
+        shutil.rmtree(self.app_dir)
+
+    def test_compiled_once(self):
+        snapshot = self.settings.get_snapshot()
+        self.assertEqual(snapshot.min_cash, 500)
+        self.assertEqual(snapshot.frequency, 60)
+        self.assertTrue(self.settings.get_snapshot() is snapshot)
+
+    def test_read_only(self):
+        snapshot = self.settings.get_snapshot()
+        self.assertRaises(AttributeError, setattr, snapshot, 'min_cash', 25)
+
+    def test_changed(self):
+        snapshot = self.settings.get_snapshot()
+        self.settings['min_cash'] = 1000
+
+        # The old snapshot keeps its values, the next one has the new ones
+        self.assertEqual(snapshot.min_cash, 500)
+        self.assertEqual(self.settings.get_snapshot().min_cash, 1000)
+
+        snapshot = self.settings.get_snapshot()
+        self.settings.reload()
+        self.assertFalse(self.settings.get_snapshot() is snapshot)
+
+    def test_no_filters(self):
+        self.settings.investing['filters'] = False
+        self.settings.investing['portfolio'] = ''
+        snapshot = self.settings.get_snapshot()
+        self.assertEqual(snapshot.filters, None)
+        self.assertEqual(snapshot.portfolio, None)
+
+    def test_saved_filter_retried(self):
+        self.settings.investing['filter_id'] = 123
+        snapshot = self.settings.get_snapshot()
+        self.assertEqual(snapshot.filters, None)
+
+        # It couldn't be loaded, so the next cycle tries again
+        self.assertFalse(self.settings.get_snapshot() is snapshot)
+
+
+class TestCompiledFilter(unittest.TestCase):
+    """ Tests filters that build their search string once """
+
+    def test_search_string(self):
+        filters = Filter({'grades': {'All': False, 'B': True}})
+        filters['funding_progress'] = 60
+        compiled = CompiledFilter(filters)
+        self.assertEqual(compiled.search_string(), filters.search_string())
+        self.assertEqual(compiled['funding_progress'], 60)
+
+        # It's a copy
+        filters['funding_progress'] = 0
+        self.assertEqual(compiled['funding_progress'], 60)
+
+    def test_changed(self):
+        compiled = CompiledFilter(Filter())
+        before = compiled.search_string()
+        compiled['funding_progress'] = 60
+        self.assertNotEqual(compiled.search_string(), before)
+
+
+if __name__ == '__main__':
+    unittest.main()
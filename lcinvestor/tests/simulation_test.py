@@ -0,0 +1,139 @@
+#!/usr/bin/env python
+
+import sys
+import copy
+import shutil
+import tempfile
+import unittest
+
+sys.path.insert(0, '.')
+sys.path.insert(0, '../')
+sys.path.insert(0, '../../')
+from lendingclub.filters import Filter
+from lcinvestor import AutoInvestor
+from lcinvestor import market
+from lcinvestor import simulation
+
+
+def create_loan(loan_id, grade, rate, unfunded=1000):
+    return {
+        'loan_id': loan_id,
+        'loanGUID': loan_id,
+        'loanGrade': grade,
+        'loanRate': rate,
+        'loanLength': 36,
+        'loanAmountRequested': 1000.0,
+        'loanUnfundedAmount': float(unfunded),
+        'alreadyInvestedIn': False,
+        'purpose': 'other'
+    }
+
+
+class TestBuildPortfolio(unittest.TestCase):
+    """ Tests building portfolios from loan listings """
+
+    def setUp(self):
+        self.loans = [
+            create_loan(1, 'A1', 6.0),
+            create_loan(2, 'B2', 10.0),
+            create_loan(3, 'C3', 14.0),
+            create_loan(4, 'D4', 18.0),
+            create_loan(5, 'E5', 22.0)
+        ]
+
+    def test_highest_rate_in_range(self):
+        portfolio = market.build_portfolio(self.loans, 50, max_per_note=25, min_percent=10, max_percent=17)
+        self.assertEqual(portfolio['numberOfLoans'], 2)
+        self.assertEqual(portfolio['percentage'], 16.0)
+        self.assertEqual([l['loan_id'] for l in portfolio['loan_fractions']], [3, 4])
+        self.assertEqual(portfolio['c'], 50.0)
+        self.assertEqual(portfolio['d'], 50.0)
+
+    def test_spread_by_max_per_note(self):
+        portfolio = market.build_portfolio(self.loans, 100, max_per_note=50, min_percent=0, max_percent=30)
+        self.assertEqual(portfolio['numberOfLoans'], 2)
+        self.assertEqual([l['invest_amount'] for l in portfolio['loan_fractions']], [50, 50])
+
+    def test_no_match(self):
+        self.assertFalse(market.build_portfolio(self.loans, 50, min_percent=20.5, max_percent=21))
+        self.assertFalse(market.build_portfolio(self.loans, 500, max_per_note=25, min_percent=0, max_percent=30))
+
+    def test_filters(self):
+        filters = Filter({'grades': {'All': False, 'A': False, 'B': True, 'C': False, 'D': True, 'E': False, 'F': False, 'G': False}})
+        portfolio = market.build_portfolio(self.loans, 50, min_percent=0, max_percent=30, filters=filters)
+        self.assertEqual([l['loan_id'] for l in portfolio['loan_fractions']], [2, 4])
+
+
+class TestSimulation(unittest.TestCase):
+    """ Tests running the investor against a synthetic market """
+
+    def setUp(self):
+        self.app_dir = tempfile.mkdtemp()
+        self.investors = []
+
+    def tearDown(self):
+        for investor in self.investors:
+            if investor.history is not None:
+                investor.history.close()
+        shutil.rmtree(self.app_dir)
+
+    def create_simulation(self, **config):
+        market_config = copy.deepcopy(simulation.default_market)
+        market_config.update({'seed': 1, 'cash': 1000, 'deposits_per_month': 4})
+        market_config.update(config)
+
+        synthetic = simulation.SyntheticMarket(market_config, clock=simulation.SimulatedClock(start=1400000000))
+        investor = AutoInvestor(lc=simulation.SimulatedLendingClub(synthetic), clock=synthetic.clock, app_dir=tempfile.mkdtemp(dir=self.app_dir))
+        self.investors.append(investor)
+        investor.settings.investing['min_cash'] = 500
+        investor.settings.investing['min_percent'] = 10
+        investor.settings.investing['max_percent'] = 20
+        investor.settings.investing['filters'] = False
+        investor.settings.user_settings['frequency'] = 60
+        return simulation.Simulation(investor, days=14)
+
+    def test_invests_inflows(self):
+        sim = self.create_simulation()
+        results = sim.run()
+
+        self.assertEqual(results['cycles'], 14 * 24)
+        self.assertTrue(results['orders'] > 0)
+        self.assertTrue(results['ending_cash'] < 500)
+        self.assertTrue(10 <= results['average_rate'] <= 20)
+        self.assertAlmostEqual(results['invested'] + results['ending_cash'],
+            1000 + results['deposited'] + results['paid'], places=2)
+
+    def test_history(self):
+        sim = self.create_simulation()
+        results = sim.run()
+
+        totals = sim.investor.history.get_stats()['accounts']['none']
+        self.assertEqual(totals['cycles'], results['cycles'])
+        self.assertEqual(totals['outcome:invested'], results['orders'])
+        self.assertAlmostEqual(totals['invested'], results['invested'], places=2)
+
+    def test_repeatable(self):
+        self.assertEqual(self.create_simulation().run()['invested'], self.create_simulation().run()['invested'])
+
+    def test_skip_unchanged_listing(self):
+        sim = self.create_simulation(initial_listings=60, listings_per_day=0)
+        investor = sim.investor
+        investor.simulated = True
+        investor.settings.investing['min_percent'] = 30
+        investor.settings.investing['max_percent'] = 40
+
+        # Nothing matches, so the second cycle doesn't search again
+        investor.attempt_to_invest()
+        searches = sim.lc.calls['build_portfolio']
+        self.assertTrue(searches > 0)
+        investor.attempt_to_invest()
+        self.assertEqual(sim.lc.calls['build_portfolio'], searches)
+
+        # Until new loans are listed
+        sim.market.add_listing(sim.clock.time())
+        investor.attempt_to_invest()
+        self.assertTrue(sim.lc.calls['build_portfolio'] > searches)
+
+
+if __name__ == '__main__':
+    unittest.main()
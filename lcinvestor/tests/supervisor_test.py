@@ -0,0 +1,222 @@
+#!/usr/bin/env python
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+import unittest
+
+sys.path.insert(0, '.')
+sys.path.insert(0, '../')
+sys.path.insert(0, '../../')
+from lcinvestor import AutoInvestor
+from lcinvestor.simulation import SimulatedClock
+from lcinvestor.supervisor import HashRing, Supervisor, SupervisorError, load_fleet_file, use_account_files
+from lcinvestor.tests.fake_lendingclub import FakeLendingClub, create_loans
+
+
+class FakeInvestor:
+
+    def __init__(self, account):
+        self.account = account
+
+    def run_cycle(self):
+        if self.account.get('fail'):
+            raise Exception('Cycle failed')
+
+    def get_watched_cycle(self):
+        return None
+
+    def warm_up(self):
+        return True
+
+
+class TestAccountFiles(unittest.TestCase):
+    """ Tests fleet accounts that share an app directory """
+
+    def setUp(self):
+        self.app_dir = tempfile.mkdtemp()
+        self.clock = SimulatedClock(start=1400000000)
+        self.investors = []
+
+    def tearDown(self):
+        for investor in self.investors:
+            if investor.history is not None:
+                investor.history.close()
+        shutil.rmtree(self.app_dir)
+
+    def create_investor(self, lc):
+        investor = AutoInvestor(lc=lc, clock=self.clock, app_dir=self.app_dir)
+        investor.settings.auth['email'] = lc.email
+        investor.settings.auth['pass'] = lc.password
+        investor.settings.investing['min_cash'] = 500
+        investor.settings.investing['min_percent'] = 10
+        investor.settings.investing['max_percent'] = 20
+        investor.settings.investing['filters'] = False
+        use_account_files(investor, lc.email)
+        self.investors.append(investor)
+        return investor
+
+    def test_own_orders(self):
+        first_lc = FakeLendingClub('first@test.com', cash=1000, loans=create_loans(), clock=self.clock)
+        second_lc = FakeLendingClub('second@test.com', cash=1000, loans=create_loans(), clock=self.clock)
+        first = self.create_investor(first_lc)
+        second = self.create_investor(second_lc)
+
+        # The second account's order goes through, but its worker stops before it's recorded
+        def place_then_stop(loans, portfolio_name):
+            second_lc.place_order(loans, portfolio_name)
+            raise KeyboardInterrupt()
+        second_lc.script('execute', place_then_stop)
+        self.assertRaises(KeyboardInterrupt, second.run_once)
+
+        # The first account doesn't settle it, against its own orders
+        first.run_once()
+        self.assertEqual(first.last_outcome, 'invested')
+        self.assertEqual(first_lc.count('my_notes'), 0)
+        self.assertEqual(first.get_order_journal().get_pending(), [])
+
+        # So the second account finds it went through, and records it
+        second = self.create_investor(second_lc)
+        second.run_once()
+        self.assertEqual(len(second_lc.orders), 1)
+        self.assertEqual(second.get_last_investment()['order_id'], second_lc.orders[0]['order_id'])
+
+
+class TestHashRing(unittest.TestCase):
+    """ Tests assigning accounts to workers """
+
+    def setUp(self):
+        self.keys = ['user{0}@email.com'.format(i) for i in range(1000)]
+
+    def test_spread(self):
+        ring = HashRing(range(4))
+        counts = {}
+        for key in self.keys:
+            node = ring.get_node(key)
+            counts[node] = counts.get(node, 0) + 1
+        self.assertEqual(sorted(counts.keys()), [0, 1, 2, 3])
+        for count in counts.values():
+            self.assertTrue(150 < count < 350)
+
+    def test_minimal_movement(self):
+        ring = HashRing(range(4))
+        before = dict([(key, ring.get_node(key)) for key in self.keys])
+
+        # Only the keys taken by the new node move
+        ring.add(4)
+        for key in self.keys:
+            node = ring.get_node(key)
+            self.assertTrue(node == before[key] or node == 4)
+
+        ring.remove(4)
+        self.assertEqual(dict([(key, ring.get_node(key)) for key in self.keys]), before)
+
+    def test_empty(self):
+        self.assertEqual(HashRing().get_node('user@email.com'), None)
+
+
+class TestSupervisor(unittest.TestCase):
+    """ Tests running accounts on worker processes """
+
+    def setUp(self):
+        self.app_dir = tempfile.mkdtemp()
+        self.fleet_file = os.path.join(self.app_dir, 'fleet.yaml')
+        self.write_fleet(['a@email.com', 'b@email.com', 'c@email.com'])
+        self.supervisor = Supervisor(self.fleet_file, workers=2, investor_factory=FakeInvestor, app_dir=self.app_dir)
+
+    def tearDown(self):
+        self.supervisor.stop_workers(timeout=5)
+        shutil.rmtree(self.app_dir)
+
+    def write_fleet(self, emails, fail=None):
+        with open(self.fleet_file, 'w') as f:
+            f.write('accounts:\n')
+            for email in emails:
+                f.write('  - email: {0}\n'.format(email))
+                if email == fail:
+                    f.write('    fail: true\n')
+
+    def wait_for_cycles(self, timeout=10):
+        stop_at = time.time() + timeout
+        while time.time() < stop_at:
+            self.supervisor.collect_results()
+            if len(self.supervisor.in_flight) == 0:
+                return True
+            time.sleep(0.05)
+        return False
+
+    def test_load_fleet_file(self):
+        self.assertEqual(sorted(load_fleet_file(self.fleet_file).keys()), ['a@email.com', 'b@email.com', 'c@email.com'])
+
+        self.write_fleet(['a@email.com', 'a@email.com'])
+        self.assertRaises(SupervisorError, load_fleet_file, self.fleet_file)
+
+    def test_rebalance(self):
+        self.supervisor.load_fleet()
+        assigned = {}
+        for worker in self.supervisor.workers.values():
+            for email in worker.accounts:
+                assigned[email] = worker.id
+        self.assertEqual(sorted(assigned.keys()), ['a@email.com', 'b@email.com', 'c@email.com'])
+
+        # Adding an account doesn't move the others
+        self.write_fleet(['a@email.com', 'b@email.com', 'c@email.com', 'd@email.com'])
+        self.supervisor.load_fleet()
+        for worker in self.supervisor.workers.values():
+            for email in worker.accounts:
+                self.assertEqual(assigned.get(email, worker.id), worker.id)
+        self.assertTrue('d@email.com' in self.supervisor.next_cycle)
+
+    def test_cycles(self):
+        self.write_fleet(['a@email.com', 'b@email.com', 'c@email.com'], fail='c@email.com')
+        self.supervisor.load_fleet()
+        for worker in self.supervisor.workers.values():
+            self.supervisor.start_worker(worker)
+
+        for email in self.supervisor.next_cycle:
+            self.supervisor.next_cycle[email] = 0
+        self.supervisor.dispatch()
+        self.assertEqual(len(self.supervisor.in_flight), 3)
+        self.assertTrue(self.wait_for_cycles())
+
+        self.assertEqual(self.supervisor.last_cycle['a@email.com']['error'], None)
+        self.assertEqual(self.supervisor.last_cycle['c@email.com']['error'], 'Cycle failed')
+        for due in self.supervisor.next_cycle.values():
+            self.assertTrue(due > time.time())
+
+    def test_warm_up(self):
+        self.supervisor.load_fleet()
+        now = time.time()
+        for email in self.supervisor.next_cycle:
+            self.supervisor.next_cycle[email] = now + 10
+
+        # Each account is warmed up once ahead of its cycle, which isn't due yet
+        self.supervisor.dispatch()
+        self.assertEqual(self.supervisor.warmed, dict([(email, now + 10) for email in self.supervisor.next_cycle]))
+        self.assertEqual(self.supervisor.in_flight, {})
+
+        self.supervisor.next_cycle['a@email.com'] = now + 600
+        self.supervisor.dispatch()
+        self.assertEqual(self.supervisor.warmed['a@email.com'], now + 10)
+
+    def test_restart_crashed_worker(self):
+        self.supervisor.restart_delay = 0
+        self.supervisor.load_fleet()
+        for worker in self.supervisor.workers.values():
+            self.supervisor.start_worker(worker)
+
+        worker = self.supervisor.workers[0]
+        pid = worker.process.pid
+        worker.process.terminate()
+        worker.process.join()
+
+        self.supervisor.check_workers()
+        self.assertNotEqual(worker.process.pid, pid)
+        self.assertTrue(worker.process.is_alive())
+        self.assertEqual(worker.restarts, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+
+import sys
+import calendar
+import unittest
+
+sys.path.insert(0, '.')
+sys.path.insert(0, '../')
+sys.path.insert(0, '../../')
+from lcinvestor.watcher import CashWatcher, get_week_hour
+
+HOUR = 3600
+DAY = 86400
+MONDAY = calendar.timegm((2024, 1, 15, 8, 0, 0))  # Midnight, Pacific time
+
+
+class TestCashWatcher(unittest.TestCase):
+    """ Tests learning when cash arrives, and when to check for it """
+
+    def setUp(self):
+        # Payments land between 9am and 10am on weekdays, checked every hour
+        self.watcher = CashWatcher()
+        cash = 0
+        for day in range(14):
+            for hour in range(24):
+                if day % 7 < 5 and hour == 10:
+                    cash += 50
+                self.watcher.observe(MONDAY + (day * DAY) + (hour * HOUR), cash)
+
+    def test_week_hour(self):
+        self.assertEqual(get_week_hour(MONDAY), 0)
+        self.assertEqual(get_week_hour(MONDAY + (2 * DAY) + (9 * HOUR) + 1800), 57)
+
+    def test_windows(self):
+        self.assertEqual(self.watcher.inflows, 10)
+        self.assertEqual(self.watcher.get_windows(), [9, 33, 57, 81, 105])
+        self.assertEqual(self.watcher.status()['windows'][0], 'Mon 09:00')
+
+    def test_spent(self):
+        self.watcher.spent(500)
+        self.watcher.observe(MONDAY + (14 * DAY), 0)
+        self.assertEqual(self.watcher.inflows, 10)
+
+    def test_next_check(self):
+        monday = MONDAY + (14 * DAY)
+
+        # Every 5 minutes in the window
+        self.assertEqual(self.watcher.get_next_check(monday + (9 * HOUR), HOUR, 300, 4 * HOUR), monday + (9 * HOUR) + 300)
+
+        # The usual hour outside it, up to the start of the window
+        self.assertEqual(self.watcher.get_next_check(monday + (3 * HOUR), HOUR, 300, 4 * HOUR), monday + (4 * HOUR))
+        self.assertEqual(self.watcher.get_next_check(monday + (8 * HOUR) + 1800, HOUR, 300, 4 * HOUR), monday + (9 * HOUR))
+
+        # Every 4 hours on the weekend
+        saturday = monday + (5 * DAY)
+        self.assertEqual(self.watcher.get_next_check(saturday, HOUR, 300, 4 * HOUR), saturday + (4 * HOUR))
+
+    def test_not_learned(self):
+        watcher = CashWatcher()
+        watcher.observe(MONDAY, 0)
+        watcher.observe(MONDAY + HOUR, 100)
+        self.assertEqual(watcher.get_windows(), [])
+        self.assertEqual(watcher.get_next_check(MONDAY + HOUR, HOUR, 300, 4 * HOUR), None)
+
+    def test_to_dict(self):
+        loaded = CashWatcher.from_dict(self.watcher.to_dict())
+        self.assertEqual(loaded.get_windows(), self.watcher.get_windows())
+        self.assertEqual(loaded.last_cash, self.watcher.last_cash)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -30,10 +30,18 @@ THE SOFTWARE.
 
 import re
 import os
+import time
+import Queue
+import calendar
+import atexit
 import logging
 import getpass
+from lcinvestor import logs
 
 logger = None
+log_listener = None  # Writes the logs in a background thread
+console_handler = None
+file_handler = None
 
 
 def get_app_directory():
@@ -52,9 +60,10 @@ def get_app_directory():
 
 def create_logger(verbose=False):
     """
-    Initialize a logger for the autoinvestor
+    Initialize a logger for the autoinvestor.
+    Records are put on a queue and written to the console by a background thread.
     """
-    global logger
+    global logger, log_listener, console_handler
 
     if logger is None:
         logger = logging.getLogger('investor')
@@ -63,17 +72,77 @@ def create_logger(verbose=False):
         else:
             logger.setLevel(logging.INFO)
 
-        logHandler = logging.StreamHandler()
+        console_handler = logging.StreamHandler()
         if verbose:
-            logHandler.setFormatter(logging.Formatter('%(levelname)s:\t%(asctime)s - %(message)s (line #%(lineno)d)', '%m-%d %H:%M'))
+            console_handler.setFormatter(logging.Formatter('%(levelname)s:\t%(asctime)s - %(message)s (line #%(lineno)d)', '%m-%d %H:%M'))
         else:
-            logHandler.setFormatter(logging.Formatter('%(levelname)s: %(asctime)s - %(message)s', '%Y-%m-%d %H:%M'))
+            console_handler.setFormatter(logging.Formatter('%(levelname)s: %(asctime)s - %(message)s', '%Y-%m-%d %H:%M'))
+
+        log_queue = Queue.Queue()
+        log_listener = logs.QueueListener(log_queue, console_handler)
+        log_listener.start()
+        atexit.register(stop_logging)
 
-        logger.addHandler(logHandler)
+        logger.addHandler(logs.QueueHandler(log_queue))
 
     return logger
 
 
+def start_logging():
+    """
+    Make sure the logging thread is running in this process.
+    Call this after forking (i.e. in the daemon), since threads don't survive a fork.
+    """
+    if log_listener is None or log_listener.is_running():
+        return
+
+    # Start fresh, the old queue's locks could have been held during the fork
+    log_queue = Queue.Queue()
+    for handler in logger.handlers:
+        if isinstance(handler, logs.QueueHandler):
+            handler.queue = log_queue
+    log_listener.queue = log_queue
+    log_listener.start()
+
+
+def stop_logging():
+    """
+    Write all the queued log records and stop the logging thread
+    """
+    if log_listener is not None:
+        log_listener.stop()
+
+
+def log_to_file(file_path, max_bytes=0, interval=0, backup_count=0, console=False):
+    """
+    Write logs, as JSON lines, to a file that is rotated by size and time.
+        max_bytes -- Rotate when the file is larger than this (0 for no size limit)
+        interval -- Rotate after this many seconds (0 for no time limit)
+        backup_count -- How many rotated files to keep
+        console -- Keep writing to the console as well
+    """
+    global file_handler
+
+    if file_handler is not None:
+        log_listener.remove_handler(file_handler)
+
+    file_handler = logs.RotatingFileHandler(file_path, max_bytes=max_bytes, interval=interval, backup_count=backup_count)
+    file_handler.setFormatter(logs.JSONFormatter())
+    log_listener.add_handler(file_handler)
+
+    if not console:
+        log_listener.remove_handler(console_handler)
+
+
+def set_log_levels(levels):
+    """
+    Set the log level per module, from a dict of logger names and levels.
+    i.e. {'investor.lendingclub': 'WARNING'}
+    """
+    if levels:
+        logs.set_levels(levels)
+
+
 def set_logger(loggerObj):
     global logger
     logger = loggerObj
@@ -206,6 +275,91 @@ def nearest_25(num):
     return int(num)
 
 
+def cash_ladder(cash, min_cash, max_steps=10):
+    """
+    Yield the amounts of cash to search for a portfolio with, starting with all of it
+    and working down to min_cash, in up to 5 steps (and no more than max_steps in total).
+    Stop iterating once a portfolio is found.
+
+    Examples:
+    ---------
+
+        >>> list(cash_ladder(1000, 500))
+        [1000, 875, 750, 625, 500]
+        >>> list(cash_ladder(600, 500))
+        [600, 575, 550, 525, 500]
+    """
+    decrement = None
+    steps = 0
+    while cash >= min_cash and steps < max_steps:
+        steps += 1
+        yield cash
+
+        # Create decrement value that will search up to 5 more times
+        if decrement is None:
+            delta = cash - min_cash
+
+            if delta < 25:
+                break
+            elif delta <= 100:
+                decrement = 25
+            else:
+                decrement = delta / 4
+
+        # Just to be safe, shouldn't decrement in $10 increments
+        if decrement < 10:
+            break
+
+        # We are at our lowest
+        if cash <= min_cash:
+            break
+
+        # New amount to search for
+        cash -= decrement
+        if cash < min_cash:
+            cash = min_cash
+        else:
+            cash = nearest_25(cash)
+
+
+def get_pacific_offset(timestamp):
+    """
+    Return the seconds to add to a UTC timestamp to get US Pacific time (LendingClub's time zone)
+    Daylight time runs from 2am on the second Sunday in March to 2am on the first Sunday in November.
+    """
+    year = time.gmtime(timestamp).tm_year
+    march = 8 + (6 - calendar.weekday(year, 3, 1)) % 7
+    november = 1 + (6 - calendar.weekday(year, 11, 1)) % 7
+
+    daylight_start = calendar.timegm((year, 3, march, 10, 0, 0))  # 2am PST
+    daylight_end = calendar.timegm((year, 11, november, 9, 0, 0))  # 2am PDT
+    if daylight_start <= timestamp < daylight_end:
+        return -7 * 3600
+    return -8 * 3600
+
+
+def get_release_slot(timestamp, hours):
+    """
+    Return a number that goes up each time LendingClub lists new loans, at these hours of the day (Pacific time).
+    None if there are no release hours.
+
+    Examples:
+    ---------
+
+        >>> get_release_slot(1420099200, [6, 10, 14, 18])  # 12am, Jan 1st 2015 (Pacific)
+        65744
+        >>> get_release_slot(1420099200 + (7 * 3600), [6, 10, 14, 18])  # 7am
+        65745
+    """
+    if not hours:
+        return None
+
+    local = timestamp + get_pacific_offset(timestamp)
+    day = int(local // 86400)
+    hour = (local % 86400) / 3600.0
+    return (day * len(hours)) + len([h for h in hours if h <= hour])
+
+
 def currency_to_float(cashValue):
     """
     Converts a currency value, with or without symbols, to a floating point number,
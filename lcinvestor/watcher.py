@@ -0,0 +1,175 @@
+#!/usr/bin/env python
+
+#
+# Learns when cash tends to arrive, to check the balance more often then
+#
+
+"""
+The MIT License (MIT)
+
+Copyright (c) 2013 Jeremy Gillick
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+import math
+from lcinvestor import util
+
+HOUR = 3600
+WEEK_HOURS = 168
+DAY_NAMES = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
+
+
+def get_week_hour(timestamp):
+    """
+    Return the hour of the week (0 is Monday at midnight, Pacific time) of a UTC timestamp
+    """
+    local = timestamp + util.get_pacific_offset(timestamp)
+    return (int(local // HOUR) + 72) % WEEK_HOURS  # The epoch was on a Thursday
+
+
+def get_week_hour_name(week_hour):
+    return '{0} {1:02d}:00'.format(DAY_NAMES[week_hour // 24], week_hour % 24)
+
+
+class CashWatcher:
+    """
+    Learns the hours of the week that cash (note payments, transfers) tends to arrive in,
+    from how the investable balance goes up between checks.
+
+    Each increase is counted against the hours since the last check, spread evenly across them.
+    Older increases count for less, halving every half_life seconds. The busiest hours, that
+    together hold window_share of all the increases, are the windows cash arrives in.
+    """
+
+    min_inflows = 3        # Increases needed before the windows are trusted
+    half_life = 28 * 86400
+    window_share = 0.9
+
+    def __init__(self, weights=None, inflows=0, updated=None, last_cash=None, last_seen=None):
+        self.weights = weights or [0.0] * WEEK_HOURS  # For each hour of the week
+        self.inflows = inflows
+        self.updated = updated      # When the weights were last decayed
+        self.last_cash = last_cash  # The investable cash after the last check
+        self.last_seen = last_seen  # When the last check was
+
+    def observe(self, timestamp, cash):
+        """
+        Record the investable cash at a balance check
+        """
+        if self.last_seen is not None and self.last_cash is not None and cash > self.last_cash:
+            self.add_inflow(self.last_seen, timestamp)
+        self.last_cash = cash
+        self.last_seen = timestamp
+
+    def spent(self, amount):
+        """
+        Record cash that was invested since the last check, so it isn't mistaken for an inflow later
+        """
+        if self.last_cash is not None:
+            self.last_cash = max(0, self.last_cash - amount)
+
+    def add_inflow(self, start, end):
+        """
+        Count cash that arrived sometime between two checks
+        """
+        self.decay(end)
+
+        hours = max(1, min(int(math.ceil((end - start) / float(HOUR))), WEEK_HOURS))
+        first = end - (hours * HOUR)
+        for i in xrange(hours):
+            week_hour = get_week_hour(first + ((i + 1) * HOUR) - 1)
+            self.weights[week_hour] += 1.0 / hours
+        self.inflows += 1
+
+    def decay(self, timestamp):
+        if self.updated is not None and timestamp > self.updated:
+            factor = 0.5 ** ((timestamp - self.updated) / float(self.half_life))
+            self.weights = [w * factor for w in self.weights]
+        self.updated = timestamp
+
+    def is_learned(self):
+        return self.inflows >= self.min_inflows
+
+    def get_windows(self):
+        """
+        Return the hours of the week that cash tends to arrive in
+        """
+        total = sum(self.weights)
+        if not self.is_learned() or total <= 0:
+            return []
+
+        windows = []
+        covered = 0
+        for week_hour in sorted(xrange(WEEK_HOURS), key=lambda h: self.weights[h], reverse=True):
+            if covered >= total * self.window_share:
+                break
+            windows.append(week_hour)
+            covered += self.weights[week_hour]
+        return sorted(windows)
+
+    def get_next_check(self, now, period, fast, slow):
+        """
+        Return when to check the balance next: in fast seconds during a window, otherwise in
+        period seconds, or slow seconds on days without any windows (i.e. weekends), or at the
+        start of the next window, whichever comes first.
+        None until enough inflows have been seen to know the windows.
+        """
+        windows = set(self.get_windows())
+        if len(windows) == 0:
+            return None
+
+        week_hour = get_week_hour(now)
+        if week_hour in windows:
+            return now + fast
+
+        day = week_hour - (week_hour % 24)
+        if len(windows.intersection(range(day, day + 24))) == 0:
+            period = max(period, slow)
+
+        hour_start = now - (now % HOUR)
+        for i in xrange(1, int(math.ceil(period / float(HOUR))) + 1):
+            at = hour_start + (i * HOUR)
+            if at >= now + period:
+                break
+            if get_week_hour(at) in windows:
+                return at
+        return now + period
+
+    def status(self):
+        return {
+            'inflows': self.inflows,
+            'windows': [get_week_hour_name(h) for h in self.get_windows()]
+        }
+
+    def to_dict(self):
+        return {
+            'weights': self.weights,
+            'inflows': self.inflows,
+            'updated': self.updated,
+            'last_cash': self.last_cash,
+            'last_seen': self.last_seen
+        }
+
+    @classmethod
+    def from_dict(cls, saved):
+        weights = saved.get('weights')
+        if weights is not None and len(weights) != WEEK_HOURS:
+            weights = None
+        return cls(weights, saved.get('inflows', 0), saved.get('updated'), saved.get('last_cash'), saved.get('last_seen'))
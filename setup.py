@@ -19,9 +19,11 @@ setup(
         "lendingclub >= 0.1.10",
         "argparse >= 1.2.1",
         "pyyaml >= 3.09",
-        "pause >= 0.1.2",
         "keyring"
     ],
+    extras_require={
+        'sessions': ['cryptography']
+    },
     platforms='osx, posix, linux, windows',
     classifiers=[
         'Development Status :: 5 - Production/Stable',